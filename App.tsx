@@ -7,17 +7,62 @@ import VisualizationPanel from './components/VisualizationPanel';
 import FeatureImportance from './components/FeatureImportance';
 import ResultsPanel from './components/ResultsPanel';
 
+const API_BASE = 'http://localhost:5000';
+
+function apiUrl(path: string, datasetId: string, params: Record<string, string> = {}) {
+  const query = new URLSearchParams({ dataset_id: datasetId, ...params });
+  return `${API_BASE}${path}?${query}`;
+}
+
+async function uploadDataset(file: File): Promise<string> {
+  const formData = new FormData();
+  formData.append('file', file);
+
+  const response = await fetch(`${API_BASE}/api/upload`, {
+    method: 'POST',
+    body: formData,
+  });
+
+  if (!response.ok) {
+    const errorData = await response.json();
+    throw new Error(errorData.error || 'Failed to upload file');
+  }
+
+  const result = await response.json();
+  return result.datasetId;
+}
+
 function App() {
   const [uploadedFile, setUploadedFile] = useState<File | null>(null);
+  const [datasetId, setDatasetId] = useState<string | null>(null);
   const [status, setStatus] = useState<{ type: 'info' | 'success' | 'warning' | 'error', message: string } | null>(null);
   const [results, setResults] = useState<any>(null);
   const [isProcessing, setIsProcessing] = useState(false);
   const [activeTab, setActiveTab] = useState<'charts' | 'importance' | 'results'>('charts');
 
-  const handleFileUpload = (file: File) => {
+  const handleFileUpload = async (file: File) => {
     setUploadedFile(file);
-    setStatus({ type: 'success', message: `File "${file.name}" uploaded successfully` });
+    setDatasetId(null);
     setResults(null);
+    setStatus({ type: 'info', message: `Uploading "${file.name}"...` });
+
+    try {
+      setDatasetId(await uploadDataset(file));
+      setStatus({ type: 'success', message: `File "${file.name}" uploaded successfully` });
+    } catch (error) {
+      console.error('Error uploading file:', error);
+      setStatus({ type: 'error', message: `Error: ${error instanceof Error ? error.message : 'Unknown error'}` });
+    }
+  };
+
+  // Dataset ID of the selected file, uploading it again if the first upload failed
+  const ensureDatasetUploaded = async (file: File) => {
+    if (datasetId) {
+      return datasetId;
+    }
+    const id = await uploadDataset(file);
+    setDatasetId(id);
+    return id;
   };
 
   const handleDetectAnomalies = async () => {
@@ -30,12 +75,11 @@ function App() {
     setStatus({ type: 'info', message: 'Detecting anomalies using Z-Score analysis...' });
 
     try {
-      const formData = new FormData();
-      formData.append('file', uploadedFile);
+      const id = await ensureDatasetUploaded(uploadedFile);
 
-      const response = await fetch('http://localhost:5000/api/detect-anomalies', {
+      // Compact mode lists only the anomalous rows instead of the full z-score matrix
+      const response = await fetch(apiUrl('/api/detect-anomalies', id, { mode: 'compact' }), {
         method: 'POST',
-        body: formData,
       });
 
       if (!response.ok) {
@@ -65,12 +109,10 @@ function App() {
     setStatus({ type: 'info', message: 'Classifying faults using Random Forest...' });
 
     try {
-      const formData = new FormData();
-      formData.append('file', uploadedFile);
+      const id = await ensureDatasetUploaded(uploadedFile);
 
-      const response = await fetch('http://localhost:5000/api/classify-faults', {
+      const response = await fetch(apiUrl('/api/classify-faults', id), {
         method: 'POST',
-        body: formData,
       });
 
       if (!response.ok) {
@@ -100,14 +142,11 @@ function App() {
     setStatus({ type: 'info', message: 'Identifying root cause sensors using feature importance...' });
 
     try {
-      // First, we need to train the model by running classification
-      const formData = new FormData();
-      formData.append('file', uploadedFile);
+      const id = await ensureDatasetUploaded(uploadedFile);
 
       // Run classification first to train the model
-      const classifyResponse = await fetch('http://localhost:5000/api/classify-faults', {
+      const classifyResponse = await fetch(apiUrl('/api/classify-faults', id), {
         method: 'POST',
-        body: formData,
       });
 
       if (!classifyResponse.ok) {
@@ -116,7 +155,7 @@ function App() {
       }
 
       // Now get root cause analysis
-      const rootCauseResponse = await fetch('http://localhost:5000/api/root-cause', {
+      const rootCauseResponse = await fetch(apiUrl('/api/root-cause', id), {
         method: 'POST',
       });
 
@@ -215,7 +254,7 @@ function App() {
         </div>
 
         {/* Content Panels */}
-        {activeTab === 'charts' && <VisualizationPanel />}
+        {activeTab === 'charts' && <VisualizationPanel datasetId={datasetId} />}
         {activeTab === 'importance' && <FeatureImportance results={results} />}
         {activeTab === 'results' && <ResultsPanel results={results} />}
       </div>
@@ -26,28 +26,39 @@ ChartJS.register(
 
 interface VisualizationData {
   classDistribution: Record<string, number>;
-  correlations: Record<string, number>;
+  // Correlation ratio (eta, 0..1) of each sensor with the class
+  correlationRatio: Record<string, number>;
   timeSeriesData: Record<string, number[]>;
   sensorStats: Record<string, any>;
   totalSamples: number;
   totalFeatures: number;
 }
 
-const VisualizationPanel: React.FC = () => {
+interface VisualizationPanelProps {
+  datasetId: string | null;
+}
+
+const VisualizationPanel: React.FC<VisualizationPanelProps> = ({ datasetId }) => {
   const [data, setData] = useState<VisualizationData | null>(null);
-  const [loading, setLoading] = useState(true);
+  const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
-    fetchVisualizationData();
-  }, []);
+    setData(null);
+    setError(null);
+    if (datasetId) {
+      fetchVisualizationData();
+    }
+  }, [datasetId]);
 
   const fetchVisualizationData = async () => {
+    if (!datasetId) return;
     try {
       setLoading(true);
       setError(null);
       
-      const response = await fetch('http://localhost:5000/api/visualization-data');
+      const query = new URLSearchParams({ dataset_id: datasetId });
+      const response = await fetch(`http://localhost:5000/api/visualization-data?${query}`);
       if (!response.ok) {
         const errorData = await response.json();
         throw new Error(errorData.error || 'Failed to fetch visualization data');
@@ -130,17 +141,17 @@ const VisualizationPanel: React.FC = () => {
     ],
   };
 
-  // Prepare correlation data
-  const correlationEntries = Object.entries(data.correlations)
-    .sort(([,a], [,b]) => Math.abs(b) - Math.abs(a))
-    .slice(0, 10); // Top 10 correlations
+  // Prepare correlation ratio data
+  const correlationEntries = Object.entries(data.correlationRatio)
+    .sort(([,a], [,b]) => b - a)
+    .slice(0, 10); // Top 10 sensors
 
   const correlationData = {
     labels: correlationEntries.map(([sensor]) => sensor),
     datasets: [
       {
-        label: 'Correlation with Target',
-        data: correlationEntries.map(([, corr]) => Math.abs(corr)),
+        label: 'Correlation Ratio (η) with Class',
+        data: correlationEntries.map(([, ratio]) => ratio),
         backgroundColor: '#8B5CF6',
         borderColor: '#7C3AED',
         borderWidth: 1,
@@ -225,7 +236,7 @@ const VisualizationPanel: React.FC = () => {
 
         {/* Feature Correlation */}
         <div className="bg-white rounded-lg shadow-md p-6">
-          <h3 className="text-lg font-semibold text-gray-900 mb-4">Top Feature Correlations</h3>
+          <h3 className="text-lg font-semibold text-gray-900 mb-4">Top Sensors by Correlation Ratio</h3>
           <div className="h-64">
             <Bar data={correlationData} options={chartOptions} />
           </div>
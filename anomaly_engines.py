@@ -0,0 +1,128 @@
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.stats import chi2
+from sklearn.covariance import LedoitWolf
+from sklearn.ensemble import IsolationForest
+
+from zscore import severity_bands
+
+# Expected share of normal rows flagged: sets the Mahalanobis chi-square
+# threshold and the Isolation Forest contamination
+ANOMALY_ALPHA = 0.001
+# Rows scored per block (and per thread for the Isolation Forest)
+SCORE_BLOCK_ROWS = 10000
+
+
+def _fit_fill(values):
+    """Per-sensor medians used to fill missing values (0.0 for all-NaN sensors)"""
+    fill = np.nanmedian(values, axis=0) if np.isnan(values).any() else np.median(values, axis=0)
+    return np.where(np.isnan(fill), 0.0, fill)
+
+
+def _filled(values, fill):
+    values = np.array(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if missing.any():
+        np.copyto(values, np.broadcast_to(fill, values.shape), where=missing)
+    return values
+
+
+def _standardization(X):
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    return mean, np.where(std > 0, std, 1.0)
+
+
+class MahalanobisScorer:
+    """Distance of each row from the normal data's mean under its covariance.
+
+    Unlike per-sensor z-scores this flags rows whose sensors move together
+    in a way the normal data does not, even when each sensor stays within
+    its own range. Sensors are standardized and the covariance is a
+    Ledoit-Wolf shrinkage estimate, so it stays invertible with collinear or
+    constant sensors; its inverse is computed once at fit. For normal data
+    squared distances follow a chi-square distribution with one degree of
+    freedom per sensor, whose ``1 - ANOMALY_ALPHA`` quantile (as a distance)
+    is the default threshold. Per-sensor contributions ``d_j (P d)_j`` sum to
+    the squared distance.
+    """
+
+    name = 'mahalanobis'
+
+    def fit(self, values, sensors):
+        """Fit on a (rows, sensors) float matrix of normal data; NaNs are median-filled"""
+        values = np.asarray(values, dtype=np.float64)
+        self.sensors = list(sensors)
+        self.fill = _fit_fill(values)
+        X = _filled(values, self.fill)
+        self.mean, self.scale = _standardization(X)
+        self.precision = LedoitWolf().fit((X - self.mean) / self.scale).precision_
+        self.threshold = float(np.sqrt(chi2.ppf(1 - ANOMALY_ALPHA, len(self.sensors))))
+        return self
+
+    def score(self, values):
+        """Distances (rows,) and per-sensor contributions (rows, sensors) of raw rows"""
+        values = np.asarray(values, dtype=np.float64)
+        distances = np.empty(len(values))
+        contributions = np.empty(values.shape)
+        for start in range(0, len(values), SCORE_BLOCK_ROWS):
+            block = slice(start, start + SCORE_BLOCK_ROWS)
+            centered = (_filled(values[block], self.fill) - self.mean) / self.scale
+            contributions[block] = centered * (centered @ self.precision)
+            distances[block] = np.sqrt(np.maximum(contributions[block].sum(axis=1), 0.0))
+        return distances, contributions
+
+    def severity_bands(self, threshold):
+        """Major and critical score bounds, scaled like the z-score bands"""
+        return severity_bands(threshold)
+
+
+class IsolationForestScorer:
+    """Isolation Forest anomaly scores: how easily random splits isolate a row.
+
+    Scores are ``-score_samples`` (about 0.5 for typical rows, approaching 1
+    for anomalies); the default threshold is the score exceeded by
+    ``ANOMALY_ALPHA`` of the normal data. Trees are built on ``n_jobs``
+    workers and blocks of rows are scored in parallel threads (tree
+    traversal releases the GIL). Sensors are attributed by their |z|
+    against the normal data, which the forest itself does not provide.
+    """
+
+    name = 'isolation-forest'
+
+    def __init__(self, n_estimators=100, max_samples='auto', random_state=42, n_jobs=-1):
+        self.n_estimators = n_estimators
+        self.max_samples = max_samples
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+
+    def fit(self, values, sensors):
+        """Fit on a (rows, sensors) float matrix of normal data; NaNs are median-filled"""
+        values = np.asarray(values, dtype=np.float64)
+        self.sensors = list(sensors)
+        self.fill = _fit_fill(values)
+        X = _filled(values, self.fill)
+        self.mean, self.scale = _standardization(X)
+        self.model = IsolationForest(n_estimators=self.n_estimators, max_samples=self.max_samples,
+                                     contamination=ANOMALY_ALPHA, random_state=self.random_state,
+                                     n_jobs=self.n_jobs).fit(X)
+        self.threshold = float(-self.model.offset_)
+        return self
+
+    def score(self, values):
+        """Anomaly scores (rows,) and per-sensor |z| (rows, sensors) of raw rows"""
+        X = _filled(values, self.fill)
+        blocks = [X[start:start + SCORE_BLOCK_ROWS] for start in range(0, len(X), SCORE_BLOCK_ROWS)]
+        scores = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            delayed(self.model.score_samples)(block) for block in blocks
+        )
+        scores = -np.concatenate(scores) if scores else np.empty(0)
+        return scores, np.abs(X - self.mean) / self.scale
+
+    def severity_bands(self, threshold):
+        """Major and critical score bounds: rows isolated in 3/4 and 1/2 of the threshold's path length.
+
+        Scores are ``2 ** (-path / c)``, so scaling the path length raises the
+        score to that power; the bands stay below the maximum score of 1.
+        """
+        return threshold ** 0.75, threshold ** 0.5
@@ -2,17 +2,42 @@ from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
-import joblib
+from sklearn.utils.class_weight import compute_class_weight
+from sklearn.inspection import permutation_importance
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report, roc_auc_score
 import os
-import tempfile
 import json
+import copy
 from datetime import datetime
+from functools import lru_cache
 import logging
-import math
+import re
+import time
+import atexit
+import io
+import threading
+import shutil
+import uuid
+import zipfile
+from dataset_registry import DatasetRegistry
+from dataset_cache import DatasetCache
+from preprocessing import preprocess_data, scale_model_inputs, stratified_subsample, NA_VALUES
+from json_encoding import json_response
+from model_store import ModelStore
+from online_detector import OnlineZScoreDetector, OnlineDetectorStore
+from job_queue import JobQueue
+from attribution import path_explainer, occlusion_attributions
+from correlations import correlation_summary
+from batch_analysis import BatchAnalyzer
+from baselines import BASELINE_FILE, RobustBaseline, SCORING_THRESHOLDS
+from anomaly_engines import MahalanobisScorer, IsolationForestScorer
+from generate_sample_data import DEFAULT_CLASS_MIX, generate_sensor_blocks, sensor_names_for
+from rolling_features import RollingFeatures
+from pyramid import DOWNSAMPLING_METHODS
+from zscore import compute_z_scores, severity_bands
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,105 +46,445 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Global variables to store the model and scaler
-model = None
-scaler = None
-feature_names = None
+# Trees grown between progress reports when training inside a job
+TRAINING_STEP_TREES = 10
+
+# Classifier backends selectable with ``engine``
+CLASSIFIER_ENGINES = {
+    'random-forest': lambda: RandomForestClassifier(
+        n_estimators=100,
+        max_depth=10,
+        random_state=42,
+        n_jobs=-1
+    ),
+    # Histogram-binned boosting: fast on large data and handles NaN natively
+    'hist-gradient-boosting': lambda: HistGradientBoostingClassifier(
+        max_iter=200,
+        learning_rate=0.1,
+        random_state=42
+    )
+}
+
+# Engines trained on data with missing values left as NaN (no median imputation)
+NAN_NATIVE_ENGINES = {'hist-gradient-boosting'}
+
+# Multivariate anomaly scorers selectable with ``method``, fitted on a dataset's normal rows
+ANOMALY_ENGINES = {
+    'mahalanobis': MahalanobisScorer,
+    # Trees built and rows scored on all cores
+    'isolation-forest': lambda: IsolationForestScorer(
+        n_estimators=100,
+        random_state=42,
+        n_jobs=-1
+    )
+}
+
+# Rows one root-cause request may explain individually (tree-path models, occlusion fallback)
+MAX_ATTRIBUTION_ROWS = 10000
+MAX_OCCLUSION_ROWS = 200
+
+# Default per-class-stratified training row budget (unset: train on every row)
+DEFAULT_MAX_TRAIN_ROWS = int(os.environ.get('SENSOR_FAULT_MAX_TRAIN_ROWS', 0)) or None
+
+# Downsampled points per sensor in time-series responses (default, upper bound, dashboard)
+TIME_SERIES_POINTS = 500
+MAX_TIME_SERIES_POINTS = 10000
+DASHBOARD_TIME_SERIES_POINTS = 100
+
+# Most windows one window-statistics request may split its row range into
+MAX_STAT_WINDOWS = 1000
+
+# Most datasets (trucks) one batch analysis may cover
+MAX_BATCH_DATASETS = 1000
+
+# Rows and shuffles per sensor of permutation importance, for models without built-in importances
+PERMUTATION_ROWS = 5000
+PERMUTATION_REPEATS = 3
+
+# Generated rows in an anomaly engine benchmark (default, upper bound);
+# larger benchmarks than MAX_SYNC_BENCHMARK_ROWS always run as a job
+BENCHMARK_ROWS = 20000
+MAX_SYNC_BENCHMARK_ROWS = 50000
+MAX_BENCHMARK_ROWS = 1000000
 
 class SensorFaultDetector:
     def __init__(self):
         self.model = None
         self.scaler = StandardScaler()
         self.feature_names = None
+        self.model_version = None
         self.z_score_threshold = 3.0
+        # ``RollingFeatures`` turning time-ordered sensor rows into model inputs, if used
+        self.rolling = None
+    
+    @property
+    def sensor_names(self):
+        """Sensors the model reads (its inputs, unless rolling features are derived from them)"""
+        return self.rolling.sensors if self.rolling is not None else self.feature_names
         
-    def detect_anomalies_zscore(self, data):
-        """Detect anomalies using Z-Score method"""
+    def compute_z_scores(self, data):
+        """Absolute Z-scores of every row against the batch mean and std"""
+        return compute_z_scores(data.to_numpy(dtype=np.float64))
+    
+    def detect_anomalies_zscore(self, data, compact=False, offset=0, limit=None, top_k=None):
+        """Detect anomalies using Z-Score method.
+        
+        By default the boolean mask and the full z-score matrix are returned.
+        In compact mode only anomalous rows are listed (row index, max-z sensor
+        and severity), either paged with ``offset``/``limit`` or cut to the
+        ``top_k`` highest scores.
+        """
         try:
             # Calculate Z-scores for each feature
-            z_scores = np.abs((data - data.mean()) / data.std())
-            
-            # Find anomalies (points with Z-score > threshold)
-            anomalies = (z_scores > self.z_score_threshold).any(axis=1)
-            
-            # Calculate statistics
-            total_samples = len(data)
-            anomaly_count = anomalies.sum()
-            anomaly_rate = (anomaly_count / total_samples) * 100
-            
-            # Categorize anomalies by severity
-            max_z_scores = z_scores.max(axis=1)
-            critical_anomalies = (max_z_scores > 5.0).sum()
-            major_anomalies = ((max_z_scores > 3.5) & (max_z_scores <= 5.0)).sum()
-            minor_anomalies = ((max_z_scores > 3.0) & (max_z_scores <= 3.5)).sum()
-            
-            return {
-                'totalSamples': int(total_samples),
-                'anomalies': int(anomaly_count),
-                'anomalyRate': round(anomaly_rate, 2),
-                'criticalAnomalies': int(critical_anomalies),
-                'majorAnomalies': int(major_anomalies),
-                'minorAnomalies': int(minor_anomalies),
-                'anomalyIndices': anomalies.tolist(),
-                'zScores': z_scores.values.tolist()
-            }
+            z_scores = self.compute_z_scores(data)
+            return self._summarize_anomalies(data, z_scores, self.z_score_threshold, compact, offset, limit, top_k)
         except Exception as e:
             logger.error(f"Error in anomaly detection: {str(e)}")
             raise
     
-    def train_random_forest(self, X, y):
+    def detect_anomalies_baseline(self, data, baseline, method='mad', threshold=None, compact=False, offset=0,
+                                  limit=None, top_k=None):
+        """Detect anomalies against a fitted ``RobustBaseline`` instead of the batch's own statistics.
+        
+        ``data`` holds raw (unimputed) values of the baseline's sensors; the
+        results have the same layout as ``detect_anomalies_zscore``, with the
+        robust scores in place of z-scores.
+        """
+        try:
+            scores = baseline.score(data[baseline.sensors].to_numpy(dtype=np.float64), method)
+            threshold = threshold or SCORING_THRESHOLDS[method]
+            return self._summarize_anomalies(data[baseline.sensors], scores, threshold, compact, offset, limit,
+                                             top_k)
+        except Exception as e:
+            logger.error(f"Error in baseline anomaly detection: {str(e)}")
+            raise
+    
+    def detect_anomalies_engine(self, data, scorer, threshold=None, compact=False, offset=0, limit=None,
+                                top_k=None):
+        """Detect anomalies with a fitted multivariate scorer from ``ANOMALY_ENGINES``.
+        
+        Rows are flagged on their single multivariate score; the per-sensor
+        matrix in ``zScores`` holds the scorer's sensor contributions, and
+        compact rows name the largest contributor.
+        """
+        try:
+            row_scores, contributions = scorer.score(data[scorer.sensors].to_numpy(dtype=np.float64))
+            threshold = threshold or scorer.threshold
+            return self._summarize_anomalies(data[scorer.sensors], contributions, threshold, compact, offset, limit,
+                                             top_k, row_scores=row_scores, bands=scorer.severity_bands(threshold))
+        except Exception as e:
+            logger.error(f"Error in {scorer.name} anomaly detection: {str(e)}")
+            raise
+    
+    def _summarize_anomalies(self, data, z_scores, threshold, compact=False, offset=0, limit=None, top_k=None,
+                             row_scores=None, bands=None):
+        """Anomaly counts, severities and rows for a rows x sensors score matrix.
+        
+        Rows are scored by their highest sensor score unless ``row_scores``
+        are given. Severity bands scale with ``threshold`` unless ``bands``
+        gives the (major, critical) bounds: for the default z-score threshold
+        of 3 they are minor (3-3.5], major (3.5-5] and critical >5.
+        """
+        # Row scores: the max over sensors (NaN-skipping, like pandas)
+        max_z_scores = np.fmax.reduce(z_scores, axis=1) if row_scores is None else row_scores
+        
+        # Find anomalies (rows scoring above the threshold)
+        anomalies = max_z_scores > threshold
+        
+        # Calculate statistics
+        total_samples = len(data)
+        anomaly_count = anomalies.sum()
+        anomaly_rate = (anomaly_count / total_samples) * 100
+        
+        # Categorize anomalies by severity
+        major, critical = bands or severity_bands(threshold)
+        critical_anomalies = (max_z_scores > critical).sum()
+        major_anomalies = ((max_z_scores > major) & (max_z_scores <= critical)).sum()
+        minor_anomalies = ((max_z_scores > threshold) & (max_z_scores <= major)).sum()
+            
+        results = {
+            'totalSamples': int(total_samples),
+            'anomalies': int(anomaly_count),
+            'anomalyRate': round(anomaly_rate, 2),
+            'criticalAnomalies': int(critical_anomalies),
+            'majorAnomalies': int(major_anomalies),
+            'minorAnomalies': int(minor_anomalies)
+        }
+        
+        if not compact:
+            results['anomalyIndices'] = anomalies
+            results['zScores'] = z_scores
+            return results
+        
+        rows = np.flatnonzero(anomalies)
+        if top_k:
+            rows = rows[np.argsort(-max_z_scores[rows], kind='stable')[:top_k]]
+        page = rows[offset:offset + limit] if limit else rows[offset:]
+        
+        page_z = z_scores[page]
+        max_sensors = np.where(np.isnan(page_z), -np.inf, page_z).argmax(axis=1) if len(page) else []
+        page_max = max_z_scores[page]
+        severity = np.where(page_max > critical, 'critical', np.where(page_max > major, 'major', 'minor'))
+        
+        results['anomalyRows'] = [
+            {
+                'index': int(index),
+                'sensor': str(data.columns[sensor]),
+                'maxZScore': round(float(z), 3),
+                'severity': str(level)
+            }
+            for index, sensor, z, level in zip(data.index[page], max_sensors, page_max, severity)
+        ]
+        results['page'] = {
+            'offset': int(offset),
+            'limit': int(limit) if limit else None,
+            'topK': int(top_k) if top_k else None,
+            'returned': len(page),
+            'total': len(rows)
+        }
+        return results
+    
+    @property
+    def handles_missing(self):
+        """Whether the model takes NaN inputs as they are"""
+        return isinstance(self.model, HistGradientBoostingClassifier)
+    
+    def train_random_forest(self, X, y, progress=None):
         """Train Random Forest classifier"""
+        return self.train_classifier(X, y, 'random-forest', progress)
+    
+    def train_classifier(self, X, y, engine='random-forest', progress=None, max_train_rows=None,
+                         class_weight=None):
+        """Train a classifier with one of the ``CLASSIFIER_ENGINES``.
+        
+        With ``max_train_rows`` the training split is subsampled per class to
+        that budget (see ``stratified_subsample``), while the metrics are still
+        computed on a hold-out set with the full class distribution.
+        ``class_weight='balanced'`` reweights classes by inverse frequency.
+        """
         try:
             # Split the data
             X_train, X_test, y_train, y_test = train_test_split(
                 X, y, test_size=0.2, random_state=42, stratify=y
             )
+            full_train_counts = y_train.value_counts()
+            if max_train_rows is not None and len(y_train) > max_train_rows:
+                keep = stratified_subsample(y_train.to_numpy(), max_train_rows)
+                X_train, y_train = X_train.iloc[keep], y_train.iloc[keep]
             
             # Scale the features
             X_train_scaled = self.scaler.fit_transform(X_train)
             X_test_scaled = self.scaler.transform(X_test)
             
-            # Train Random Forest
-            self.model = RandomForestClassifier(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42,
-                n_jobs=-1
-            )
-            self.model.fit(X_train_scaled, y_train)
-            
-            # Make predictions
-            y_pred = self.model.predict(X_test_scaled)
+            # Train the classifier; forests are grown in steps to report progress
+            self.model = CLASSIFIER_ENGINES[engine]()
+            if class_weight == 'balanced' and isinstance(self.model, RandomForestClassifier):
+                # Explicit weights: the preset is not meant for warm_start fits
+                classes = np.unique(y_train)
+                weights = compute_class_weight('balanced', classes=classes, y=y_train)
+                self.model.set_params(class_weight=dict(zip(classes, weights)))
+            elif class_weight:
+                self.model.set_params(class_weight=class_weight)
+            if isinstance(self.model, RandomForestClassifier):
+                self._grow_forest(X_train_scaled, y_train, self.model.n_estimators, progress)
+            else:
+                self.model.fit(X_train_scaled, y_train)
             
-            # Calculate metrics
-            accuracy = accuracy_score(y_test, y_pred) * 100
-            precision = precision_score(y_test, y_pred, average='weighted') * 100
-            recall = recall_score(y_test, y_pred, average='weighted') * 100
-            f1 = f1_score(y_test, y_pred, average='weighted') * 100
+            # Make predictions and calculate metrics
+            results = self._evaluate(X_test_scaled, y_test)
             
             # Get class distribution
             class_counts = y.value_counts().to_dict()
+            results['classes'] = {str(k): int(v) for k, v in class_counts.items()}
+            results['classificationReport'] = classification_report(y_test, results.pop('predictions'),
+                                                                    output_dict=True)
+            if max_train_rows is not None or class_weight:
+                train_counts = y_train.value_counts()
+                results['sampling'] = {
+                    'rowBudget': max_train_rows,
+                    'trainRows': int(len(y_train)),
+                    'availableTrainRows': int(full_train_counts.sum()),
+                    'testRows': int(len(y_test)),
+                    'classWeight': class_weight,
+                    'trainRowsPerClass': {str(k): int(train_counts.get(k, 0)) for k in full_train_counts.index}
+                }
+            return results
+        except Exception as e:
+            logger.error(f"Error in training {engine} classifier: {str(e)}")
+            raise
+    
+    def update_random_forest(self, base, X, y, new_trees=20, max_trees=200, progress=None):
+        """Incrementally retrain the forest of the ``base`` detector on new data.
+        
+        ``new_trees`` trees are grown on the new rows with ``warm_start`` and
+        added to a copy of the base forest; beyond ``max_trees`` the oldest
+        trees are retired. The base scaler is kept, since existing trees split
+        on its scaled values. Both models are scored on the same hold-out split
+        of the new data, so the result reports how the metrics changed.
+        """
+        try:
+            base_classes = set(base.model.classes_)
+            new_classes = set(y.unique())
+            if new_classes != base_classes:
+                raise ValueError(f"Incremental training needs the same classes as the base model "
+                                 f"({sorted(map(str, base_classes))}), got {sorted(map(str, new_classes))}; "
+                                 f"run a full retrain instead")
+            missing = [name for name in base.feature_names if name not in X.columns]
+            if missing:
+                raise ValueError(f"Dataset is missing sensors used by the base model: {missing}")
+            X = X[base.feature_names]
             
-            return {
-                'accuracy': round(accuracy, 2),
-                'precision': round(precision, 2),
-                'recall': round(recall, 2),
-                'f1Score': round(f1, 2),
-                'classes': {str(k): int(v) for k, v in class_counts.items()},
-                'classificationReport': classification_report(y_test, y_pred, output_dict=True)
+            # Split the data
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42, stratify=y
+            )
+            
+            # Reuse the base scaler
+            self.scaler = base.scaler
+            self.feature_names = list(base.feature_names)
+            X_train_scaled = self.scaler.transform(X_train)
+            X_test_scaled = self.scaler.transform(X_test)
+            
+            previous = base._evaluate(X_test_scaled, y_test)
+            previous.pop('predictions')
+            
+            # Add trees trained on the new rows only
+            self.model = copy.deepcopy(base.model)
+            base_trees = len(self.model.estimators_)
+            # warm_start seeds tree i from position i of random_state's sequence; once
+            # trees were retired those positions were already used by earlier updates,
+            # so continue from a seed derived from the trees being kept instead
+            kept_seeds = [tree.random_state for tree in self.model.estimators_]
+            self.model.set_params(random_state=int(np.random.SeedSequence(kept_seeds).generate_state(1)[0]))
+            self._grow_forest(X_train_scaled, y_train, base_trees + new_trees, progress)
+            
+            # Retire the oldest trees beyond the budget
+            retired = max(len(self.model.estimators_) - max_trees, 0)
+            if retired:
+                self.model.estimators_ = self.model.estimators_[retired:]
+                self.model.set_params(n_estimators=len(self.model.estimators_))
+            
+            results = self._evaluate(X_test_scaled, y_test)
+            class_counts = y.value_counts().to_dict()
+            results['classes'] = {str(k): int(v) for k, v in class_counts.items()}
+            results['classificationReport'] = classification_report(y_test, results.pop('predictions'),
+                                                                    output_dict=True)
+            results['baseVersion'] = base.model_version
+            results['previousMetrics'] = previous
+            results['metricChanges'] = {name: round(results[name] - previous[name], 2) for name in previous}
+            results['trees'] = {
+                'added': new_trees,
+                'retired': retired,
+                'total': len(self.model.estimators_),
+                'budget': max_trees
             }
+            return results
+        except Exception as e:
+            logger.error(f"Error in incremental Random Forest training: {str(e)}")
+            raise
+    
+    def _grow_forest(self, X_train, y_train, n_estimators, progress=None):
+        """Grow ``self.model`` to ``n_estimators`` trees, keeping existing trees.
+        
+        With a ``progress(percent, message)`` callback the trees are added in
+        steps with ``warm_start``; sklearn seeds every tree the same way, so
+        the model is identical to a single fit.
+        """
+        start = len(getattr(self.model, 'estimators_', []))
+        step = TRAINING_STEP_TREES if progress else n_estimators - start
+        self.model.set_params(warm_start=True)
+        for grown in range(start + step, n_estimators + step, step):
+            self.model.set_params(n_estimators=min(grown, n_estimators))
+            self.model.fit(X_train, y_train)
+            if progress:
+                progress(30 + 60 * (self.model.n_estimators - start) // (n_estimators - start),
+                         f'Trained {self.model.n_estimators - start}/{n_estimators - start} trees')
+        self.model.set_params(warm_start=False)
+    
+    def _evaluate(self, X_test_scaled, y_test):
+        """Weighted accuracy/precision/recall/F1 (percent) of the model on a scaled hold-out set"""
+        # Make predictions
+        y_pred = self.model.predict(X_test_scaled)
+        
+        # Calculate metrics
+        accuracy = accuracy_score(y_test, y_pred) * 100
+        precision = precision_score(y_test, y_pred, average='weighted') * 100
+        recall = recall_score(y_test, y_pred, average='weighted') * 100
+        f1 = f1_score(y_test, y_pred, average='weighted') * 100
+        
+        return {
+            'accuracy': round(accuracy, 2),
+            'precision': round(precision, 2),
+            'recall': round(recall, 2),
+            'f1Score': round(f1, 2),
+            'predictions': y_pred
+        }
+    
+    def predict_batch(self, X, batch_size=10000):
+        """Predict classes and probabilities with the trained scaler and model.
+        
+        Rows are scaled and scored in vectorized batches of ``batch_size``.
+        Missing values are filled with the scaler's training means, unless the
+        model handles NaN itself.
+        """
+        try:
+            if self.model is None:
+                raise ValueError("Model not trained yet")
+            
+            values = np.array(X, dtype=np.float64)
+            if values.ndim != 2 or values.shape[1] != len(self.feature_names):
+                raise ValueError(f"Expected rows with {len(self.feature_names)} sensor values")
+            
+            probabilities = np.empty((len(values), len(self.model.classes_)))
+            for start in range(0, len(values), batch_size):
+                batch = self.scale_rows(values[start:start + batch_size])
+                probabilities[start:start + batch_size] = self.model.predict_proba(batch)
+            predictions = self.model.classes_[probabilities.argmax(axis=1)]
+            
+            return predictions, probabilities
         except Exception as e:
-            logger.error(f"Error in training Random Forest: {str(e)}")
+            logger.error(f"Error in batch prediction: {str(e)}")
             raise
     
-    def get_feature_importance(self):
-        """Get feature importance from trained model"""
+    def scale_rows(self, values):
+        """Model inputs for raw sensor rows: missing values filled with the
+        training means (unless the model handles NaN), then scaled"""
+        return scale_model_inputs(self.scaler, values, fill_missing=not self.handles_missing)
+    
+    def explain_rows(self, values, explainer=None):
+        """Per-row sensor contributions to the predicted class.
+        
+        Uses the tree-path ``explainer`` when given, otherwise occlusion of
+        each sensor by its training mean. Returns the predicted classes and
+        probabilities and the (rows, sensors) contributions to those classes.
+        """
+        X = self.scale_rows(values)
+        if explainer is not None:
+            contributions = explainer.explain(X)
+            probabilities = explainer.probabilities(X, contributions)
+        else:
+            contributions = occlusion_attributions(self.model.predict_proba, X, np.zeros(X.shape[1]))
+            probabilities = self.model.predict_proba(X)
+        predicted = probabilities.argmax(axis=1)
+        rows = np.arange(len(X))
+        return {
+            'classes': self.model.classes_[predicted],
+            'probabilities': probabilities[rows, predicted],
+            'contributions': contributions[rows, :, predicted]
+        }
+    
+    def get_feature_importance(self, sample=None):
+        """Get feature importance from trained model
+        
+        ``sample`` returns raw model-input rows; it is only called for models
+        without built-in importances, which are then measured by permutation.
+        """
         try:
             if self.model is None:
                 raise ValueError("Model not trained yet")
             
             # Get feature importance
-            importance = self.model.feature_importances_
+            importance = self._feature_importances(sample)
             
             # Create feature importance list
             feature_importance = []
@@ -141,6 +506,47 @@ class SensorFaultDetector:
             logger.error(f"Error in getting feature importance: {str(e)}")
             raise
     
+    def _feature_importances(self, sample=None):
+        """Impurity importances, each feature's share of split gain for boosted models, else permutation importance"""
+        if hasattr(self.model, 'feature_importances_'):
+            return self.model.feature_importances_
+        gains = self._split_gains()
+        if gains is None:
+            if sample is None:
+                raise ValueError('This model has no built-in feature importances; pass a dataset_id to measure '
+                                 'permutation importance on it')
+            # How much shuffling each sensor lowers the probability of the model's own predictions
+            # (no labels needed)
+            values = sample()
+            values = values[np.linspace(0, len(values) - 1, min(len(values), PERMUTATION_ROWS)).astype(int)]
+            X = self.scale_rows(values)
+            def confidence(model, X, predicted):
+                columns = np.searchsorted(model.classes_, predicted)
+                return model.predict_proba(X)[np.arange(len(X)), columns].mean()
+            gains = np.maximum(permutation_importance(self.model, X, self.model.predict(X), scoring=confidence,
+                                                      n_repeats=PERMUTATION_REPEATS,
+                                                      random_state=42).importances_mean, 0.0)
+        total = gains.sum()
+        return gains / total if total > 0 else gains
+    
+    def _split_gains(self):
+        """Total split gain per feature of a histogram gradient boosting model, or None if unreadable"""
+        # Relies on the private ``_predictors`` trees of HistGradientBoostingClassifier (scikit-learn 1.x),
+        # which may change in any release; callers fall back to permutation importance
+        predictors = getattr(self.model, '_predictors', None)
+        if predictors is None:
+            return None
+        gains = np.zeros(len(self.feature_names))
+        try:
+            for iteration in predictors:
+                for predictor in iteration:
+                    nodes = predictor.nodes
+                    splits = nodes['is_leaf'] == 0
+                    np.add.at(gains, nodes['feature_idx'][splits], nodes['gain'][splits])
+        except (AttributeError, KeyError, ValueError, IndexError):
+            return None
+        return gains
+    
     def _get_sensor_description(self, sensor_name):
         """Get description for sensor based on name"""
         descriptions = {
@@ -163,78 +569,179 @@ class SensorFaultDetector:
         }
         return descriptions.get(sensor_name, f'{sensor_name} Sensor')
 
-# Initialize the detector
+# Z-score detection only reads the threshold, so one detector serves all requests.
+# Trained models live in separate, never-mutated detectors (see load_detector).
 detector = SensorFaultDetector()
 
-def preprocess_data(df):
-    """Preprocess the data to handle missing values and non-numeric data"""
-    try:
-        # Create a copy to avoid modifying original data
-        df_clean = df.copy()
-        
-        # Check if dataframe is empty
-        if df_clean.empty:
-            raise ValueError("DataFrame is empty")
-        
-        # Replace 'na', 'NA', 'NaN', 'nan' with numpy NaN
-        df_clean = df_clean.replace(['na', 'NA', 'NaN', 'nan', ''], np.nan)
-        
-        # Convert numeric columns to float, handling errors
-        numeric_cols = df_clean.select_dtypes(include=[np.number]).columns
-        for col in df_clean.columns:
-            if col not in numeric_cols and col != 'class':
-                try:
-                    df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
-                except:
-                    # If conversion fails, drop the column
-                    df_clean = df_clean.drop(col, axis=1)
-                    logger.warning(f"Dropped non-numeric column: {col}")
-        
-        # Handle missing values in numeric columns
-        numeric_cols = df_clean.select_dtypes(include=[np.number]).columns
-        for col in numeric_cols:
-            if col != 'class':
-                # Fill missing values with median
-                median_val = df_clean[col].median()
-                if pd.isna(median_val):
-                    median_val = 0.0
-                df_clean[col] = df_clean[col].fillna(median_val)
-        
-        # Remove rows with missing target values
-        if 'class' in df_clean.columns:
-            df_clean = df_clean.dropna(subset=['class'])
-        
-        # Ensure all numeric columns are float
-        for col in df_clean.columns:
-            if col != 'class':
-                df_clean[col] = df_clean[col].astype(float)
-        
-        # Final validation
-        if df_clean.empty:
-            raise ValueError("No valid data remaining after preprocessing")
-        
-        if len(df_clean.columns) < 2:
-            raise ValueError("Insufficient features after preprocessing")
-        
-        logger.info(f"Data preprocessing completed. Shape: {df_clean.shape}")
-        return df_clean
-        
-    except Exception as e:
-        logger.error(f"Error in data preprocessing: {str(e)}")
-        raise
+# Persistent state (models, streams, jobs) survives restarts and is shared by worker processes
+STATE_DIR = os.environ.get('SENSOR_FAULT_STATE_DIR',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state'))
 
-def safe_jsonify(data):
-    """Recursively replace NaN and inf with None for JSON serialization"""
-    if isinstance(data, dict):
-        return {k: safe_jsonify(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [safe_jsonify(v) for v in data]
-    elif isinstance(data, float):
-        if math.isnan(data) or math.isinf(data):
-            return None
-        return data
-    else:
-        return data
+# Rows per chunk when streaming uploads into the column store
+UPLOAD_CHUNK_ROWS = 50000
+
+# Parsed and preprocessed frames shared across endpoints
+dataset_cache = DatasetCache()
+
+# Index of uploaded datasets (replaces scanning the temp directory for CSVs)
+dataset_registry = DatasetRegistry(on_evict=dataset_cache.invalidate)
+
+# Online Z-score detectors for live telemetry, one per stream ID
+online_detectors = OnlineDetectorStore(os.path.join(STATE_DIR, 'streams'))
+
+# Versioned trained models shared by all workers through the ACTIVE pointer;
+# only the newest versions of each dataset (and the active one) are kept
+model_store = ModelStore(os.path.join(STATE_DIR, 'models'),
+                         keep_per_dataset=int(os.environ.get('SENSOR_FAULT_MODELS_PER_DATASET', 5)))
+
+@lru_cache(maxsize=8)
+def load_detector(version):
+    """Detector snapshot serving a stored model version.
+    
+    Versions never change once written, so snapshots are cached and shared
+    read-only by all threads; training builds a new detector instead of
+    mutating one that requests may be using.
+    """
+    snapshot = SensorFaultDetector()
+    snapshot.model, snapshot.scaler, metadata = model_store.load(version)
+    snapshot.feature_names = metadata['featureNames']
+    if metadata.get('rollingFeatures'):
+        snapshot.rolling = RollingFeatures.from_config(metadata['rollingFeatures'])
+    snapshot.model_version = version
+    logger.info(f"Loaded model version {version}")
+    return snapshot
+
+@lru_cache(maxsize=8)
+def load_explainer(version):
+    """Tree-path attribution tables of a stored forest or boosting model, built once per version"""
+    return path_explainer(load_detector(version).model)
+
+def model_detector(version=None, dataset_id=None):
+    """Snapshot for ``version``, else the newest model of ``dataset_id``, else the active one.
+    
+    Returns None when no model has been trained yet.
+    """
+    if not version and dataset_id:
+        version = model_store.latest_for_dataset(dataset_id)
+    if not version:
+        version = model_store.active_version()
+    return load_detector(version) if version else None
+
+# Warm start: serve predictions from the last active model without retraining
+try:
+    model_detector()
+except Exception as e:
+    logger.warning(f"Could not load stored model: {str(e)}")
+
+# Background jobs for long-running training and analysis requests
+job_queue = JobQueue(max_workers=int(os.environ.get('SENSOR_FAULT_JOB_WORKERS', 2)),
+                     state_dir=os.path.join(STATE_DIR, 'jobs'))
+
+# Worker processes for multi-truck batch analysis (default: one per CPU core)
+batch_analyzer = BatchAnalyzer(max_workers=int(os.environ.get('SENSOR_FAULT_BATCH_WORKERS', 0)) or None)
+atexit.register(batch_analyzer.shutdown)
+
+STREAM_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+def request_param(name, default=None, type=None):
+    """Read a parameter from the query string, the JSON body or form data"""
+    value = request.args.get(name)
+    if value is None and request.is_json:
+        value = (request.get_json(silent=True) or {}).get(name)
+    if value is None:
+        value = request.form.get(name)
+    if value is None:
+        return default
+    return type(value) if type else value
+
+def wants_async():
+    """Whether the request asked to run as a background job (``async=true``)"""
+    return str(request_param('async', 'false')).lower() == 'true'
+
+def rows_to_matrix(rows, columns, feature_names):
+    """Convert posted rows (lists or dicts) into a float matrix ordered like ``feature_names``"""
+    if rows and isinstance(rows[0], dict):
+        return np.array([[row.get(name, np.nan) for name in feature_names] for row in rows], dtype=np.float64)
+    values = np.array(rows, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[np.newaxis, :]
+    if columns:
+        missing = [name for name in feature_names if name not in columns]
+        if missing:
+            raise ValueError(f"Missing sensor columns: {missing}")
+        positions = [columns.index(name) for name in feature_names]
+        values = values[:, positions]
+    return values
+
+def resolve_dataset():
+    """Look up the dataset referenced by the request's ``dataset_id``.
+
+    The ID is read from the query string, a JSON body or form data. Returns a
+    ``(record, error_response)`` tuple where exactly one item is set.
+    """
+    dataset_id = request.args.get('dataset_id')
+    if not dataset_id and request.is_json:
+        dataset_id = (request.get_json(silent=True) or {}).get('dataset_id')
+    if not dataset_id:
+        dataset_id = request.form.get('dataset_id')
+    if not dataset_id:
+        return None, (jsonify({'error': 'No dataset ID provided. Please upload a file first.'}), 400)
+
+    record = dataset_registry.get(dataset_id)
+    if record is None:
+        return None, (jsonify({'error': f'Dataset {dataset_id} not found or expired. Please upload the file again.'}), 404)
+    return record, None
+
+def load_raw_frame(record, columns=None):
+    """Dataset frame backed by the memory-mapped column store.
+
+    Only the requested columns are mapped; the full frame is cached.
+    """
+    if columns is not None:
+        return record.store.to_frame(columns)
+    key = (record.dataset_id, record.content_hash, 'raw')
+    return dataset_cache.get_or_load(key, lambda: record.store.to_frame())
+
+def load_preprocessed_frame(record, impute=True):
+    """Output of ``preprocess_data`` for a dataset, computed once per dataset"""
+    key = (record.dataset_id, record.content_hash, 'preprocessed' if impute else 'preprocessed-nan')
+    return dataset_cache.get_or_load(key, lambda: preprocess_data(load_raw_frame(record), impute=impute))
+
+def load_rolling_frame(record, rolling, impute=True):
+    """Rolling-feature model inputs of a dataset in file (time) order, computed once per configuration"""
+    missing = [name for name in rolling.sensors if name not in record.feature_names]
+    if missing:
+        raise ValueError(f'Dataset is missing sensors used by the model: {missing}')
+    config = json.dumps(rolling.config(), sort_keys=True)
+    key = (record.dataset_id, record.content_hash, f"rolling-{'preprocessed' if impute else 'nan'}-{config}")
+    return dataset_cache.get_or_load(key, lambda: rolling.frame(load_feature_frame(record, impute)))
+
+def load_model_inputs(record, scorer):
+    """Model input columns of a dataset for a trained detector"""
+    impute = not scorer.handles_missing
+    if scorer.rolling is not None:
+        return load_rolling_frame(record, scorer.rolling, impute)
+    missing = [name for name in scorer.feature_names if name not in record.feature_names]
+    if missing:
+        raise ValueError(f'Dataset is missing sensors used by the model: {missing}')
+    return load_feature_frame(record, impute)[scorer.feature_names]
+
+def stream_model_inputs(stream_id, scorer, values):
+    """Model inputs of rows appended to a stream, continuing its rolling windows.
+    
+    Only the new rows are computed; the stream keeps the last rows its
+    longest window or lag needs next to its state, so every worker process
+    continues the same history (it restarts on a change of rolling
+    configuration).
+    """
+    with online_detectors.lock(stream_id):
+        saved = online_detectors.read_arrays(stream_id, 'rolling')
+        rolling = RollingFeatures.from_state(saved) if saved is not None else None
+        if rolling is None or rolling.config() != scorer.rolling.config():
+            rolling = RollingFeatures.from_config(scorer.rolling.config())
+        inputs = rolling.update(values)
+        online_detectors.write_arrays(stream_id, 'rolling', rolling.state())
+    return inputs
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -247,169 +754,825 @@ def health_check():
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
-    """Handle file upload and data preprocessing"""
+    """Handle file upload, streaming the CSV into the column store in chunks.
+
+    Accepts either a multipart form with a ``file`` field or a raw CSV request
+    body (``Content-Type: text/csv``, name passed as ``?filename=``).
+    """
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
+        if request.mimetype in ('text/csv', 'application/octet-stream'):
+            # Raw body: read straight from the request stream
+            filename = request.args.get('filename', 'upload.csv')
+            stream = request.stream
+        else:
+            if 'file' not in request.files:
+                return jsonify({'error': 'No file provided'}), 400
+            
+            file = request.files['file']
+            if file.filename == '':
+                return jsonify({'error': 'No file selected'}), 400
+            filename = file.filename
+            stream = file.stream
         
-        if not file.filename.endswith('.csv'):
+        if not filename.endswith('.csv'):
             return jsonify({'error': 'Only CSV files are supported'}), 400
         
-        # Read the CSV file
-        df = pd.read_csv(file)
-        
-        # Basic data validation
-        if df.empty:
-            return jsonify({'error': 'File is empty'}), 400
-        
-        # Store the data temporarily (in production, you'd use a database)
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
-        df.to_csv(temp_file.name, index=False)
-        
-        # Extract feature names (assuming last column is target)
-        feature_cols = [col for col in df.columns if col != 'class']
-        detector.feature_names = feature_cols
-        
-        # Get basic statistics
-        stats = {
-            'rows': len(df),
-            'columns': len(df.columns),
-            'features': len(feature_cols),
-            'filename': file.filename,
-            'upload_time': datetime.now().isoformat()
-        }
+        # Parse in chunks, treating 'na'-style tokens as missing at parse time.
+        # Each chunk is validated against the header, written to the binary
+        # column store and folded into running statistics, so the whole file
+        # is never held in memory.
+        chunks = pd.read_csv(stream, chunksize=UPLOAD_CHUNK_ROWS, na_values=NA_VALUES)
+        record = dataset_registry.register(chunks, filename)
         
         return jsonify({
             'message': 'File uploaded successfully',
-            'data': stats
+            'datasetId': record.dataset_id,
+            'data': record.to_dict()
         })
         
+    except (ValueError, pd.errors.ParserError) as e:
+        logger.error(f"Invalid file upload: {str(e)}")
+        return jsonify({'error': f'Invalid file: {str(e)}'}), 400
     except Exception as e:
         logger.error(f"Error in file upload: {str(e)}")
         return jsonify({'error': f'Error processing file: {str(e)}'}), 500
 
-@app.route('/api/detect-anomalies', methods=['POST'])
-def detect_anomalies():
-    """Detect anomalies using Z-Score method"""
+@app.route('/api/datasets', methods=['GET'])
+def list_datasets():
+    """List the datasets currently held by the registry"""
+    return jsonify({'datasets': [record.to_dict() for record in dataset_registry.list()]})
+
+@app.route('/api/datasets/<dataset_id>', methods=['GET', 'DELETE'])
+def dataset_detail(dataset_id):
+    """Get metadata for a dataset or delete it"""
+    if request.method == 'DELETE':
+        if not dataset_registry.remove(dataset_id):
+            return jsonify({'error': f'Dataset {dataset_id} not found'}), 404
+        return jsonify({'message': f'Dataset {dataset_id} deleted'})
+    
+    record = dataset_registry.get(dataset_id)
+    if record is None:
+        return jsonify({'error': f'Dataset {dataset_id} not found'}), 404
+    return jsonify(record.to_dict())
+
+def baseline_summary(baseline):
+    """Public view of a fitted baseline"""
+    return {
+        'rows': baseline.rows,
+        'normalClass': baseline.info.get('normalClass'),
+        'fittedAt': baseline.info.get('fittedAt'),
+        'constantSensors': baseline.constant_sensors,
+        'thresholds': SCORING_THRESHOLDS,
+        'sensors': {
+            name: {'median': median, 'scale': scale, 'lower': lower, 'upper': upper}
+            for name, median, scale, lower, upper in zip(baseline.sensors, baseline.median, baseline.scale,
+                                                         baseline.lower, baseline.upper)
+        }
+    }
+
+def normal_rows(record, normal_class=None):
+    """Raw sensor values of a dataset's rows labelled ``normal_class`` and that class.
+    
+    ``normal_class`` defaults to the most frequent class; datasets without
+    labels use all rows (class None).
+    """
+    store = record.store
+    rows = slice(None)
+    labels = store.labels()
+    if labels is not None:
+        codes = store.label_codes()
+        if normal_class is None:
+            counts = np.bincount(codes[codes >= 0], minlength=len(store.classes))
+            if not counts.any():
+                raise ValueError('Dataset has no labelled rows')
+            normal_class = store.classes[int(counts.argmax())]
+        if normal_class not in store.classes:
+            raise ValueError(f"Unknown class '{normal_class}', expected one of {store.classes}")
+        rows = codes == store.classes.index(normal_class)
+    elif normal_class is not None:
+        raise ValueError('Dataset has no class column to select normal rows from')
+    return np.column_stack([store.column(name)[rows] for name in record.feature_names]), normal_class
+
+@app.route('/api/datasets/<dataset_id>/baseline', methods=['GET', 'POST', 'DELETE'])
+def dataset_baseline(dataset_id):
+    """Fit (POST), show or delete the robust anomaly baseline of a dataset.
+    
+    The baseline is fitted on the rows labelled ``normal_class`` (default:
+    the most frequent class; all rows when the dataset has no labels) and
+    stored with the dataset for ``method=mad|quantile`` anomaly detection.
+    """
     try:
-        # Get the uploaded file path (in production, get from database)
-        temp_files = [f for f in os.listdir(tempfile.gettempdir()) if f.endswith('.csv')]
-        if not temp_files:
-            return jsonify({'error': 'No data file found. Please upload a file first.'}), 400
+        record = dataset_registry.get(dataset_id)
+        if record is None:
+            return jsonify({'error': f'Dataset {dataset_id} not found'}), 404
         
-        # Read the most recent CSV file
-        latest_file = max(temp_files, key=lambda x: os.path.getctime(os.path.join(tempfile.gettempdir(), x)))
-        file_path = os.path.join(tempfile.gettempdir(), latest_file)
+        if request.method == 'DELETE':
+            baseline_path = os.path.join(record.path, BASELINE_FILE)
+            if not os.path.exists(baseline_path):
+                return jsonify({'error': f'No baseline fitted on dataset {dataset_id}'}), 404
+            os.remove(baseline_path)
+            return jsonify({'message': f'Baseline of dataset {dataset_id} deleted'})
         
-        df = pd.read_csv(file_path)
+        if request.method == 'GET':
+            baseline = RobustBaseline.load(record.path)
+            if baseline is None:
+                return jsonify({'error': f'No baseline fitted on dataset {dataset_id}'}), 404
+            return json_response(dict(baseline_summary(baseline), datasetId=dataset_id))
         
-        # Preprocess data
-        df_preprocessed = preprocess_data(df)
+        start = time.perf_counter()
+        values, normal_class = normal_rows(record, request_param('normal_class'))
+        baseline = RobustBaseline.fit(values, record.feature_names, normalClass=normal_class,
+                                      datasetId=dataset_id)
+        baseline.save(record.path)
+        return json_response(dict(baseline_summary(baseline), datasetId=dataset_id,
+                                  fitMs=round((time.perf_counter() - start) * 1000, 3)))
         
-        # Remove target column if present
+    except ValueError as e:
+        return jsonify({'error': f'Invalid baseline request: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Error fitting baseline: {str(e)}")
+        return jsonify({'error': f'Error fitting baseline: {str(e)}'}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_statistics():
+    """Hit/miss counters and memory usage of the dataset cache"""
+    return jsonify(dataset_cache.stats())
+
+def load_correlations(record):
+    """Correlation matrix and sensor/class correlations of a dataset, computed once"""
+    def compute():
+        df_preprocessed = load_preprocessed_frame(record)
+        labels = None
         if 'class' in df_preprocessed.columns:
-            df_features = df_preprocessed.drop('class', axis=1)
-        else:
-            df_features = df_preprocessed
+            labels = df_preprocessed['class'].astype(str).to_numpy()
+        df_features = load_feature_frame(record)
+        summary = correlation_summary(df_features.to_numpy(dtype=np.float64), labels)
+        summary['sensors'] = np.array(df_features.columns, dtype=object)
+        return summary
+    key = (record.dataset_id, record.content_hash, 'correlations')
+    return dataset_cache.get_or_load(key, compute)
+
+def load_feature_frame(record, impute=True):
+    """Preprocessed sensor columns of a dataset, without the target"""
+    df_preprocessed = load_preprocessed_frame(record, impute)
+    if 'class' in df_preprocessed.columns:
+        return df_preprocessed.drop('class', axis=1)
+    return df_preprocessed
+
+def anomaly_params():
+    """Scoring and paging options of an anomaly detection request"""
+    method = request_param('method', 'zscore')
+    methods = ['zscore'] + sorted(SCORING_THRESHOLDS) + sorted(ANOMALY_ENGINES)
+    if method not in methods:
+        raise ValueError(f"method must be one of {methods}")
+    offset = request_param('offset', 0, int)
+    limit = request_param('limit', None, int)
+    top_k = request_param('top_k', None, int)
+    if offset < 0:
+        raise ValueError("offset must be 0 or more")
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+    if top_k is not None and top_k < 1:
+        raise ValueError("top_k must be at least 1")
+    return {
+        'compact': request_param('mode', 'full') == 'compact',
+        'offset': offset,
+        'limit': limit,
+        'top_k': top_k,
+        'method': method,
+        'baseline_id': request_param('baseline_id'),
+        'threshold': request_param('threshold', None, float)
+    }
+
+def load_baseline(dataset_id):
+    """Robust baseline fitted on the dataset ``dataset_id``"""
+    record = dataset_registry.get(dataset_id)
+    if record is None:
+        raise ValueError(f'Baseline dataset {dataset_id} not found or expired')
+    baseline = RobustBaseline.load(record.path)
+    if baseline is None:
+        raise ValueError(f'No baseline fitted on dataset {dataset_id}; POST /api/datasets/{dataset_id}/baseline first')
+    return baseline
+
+def load_anomaly_engine(dataset_id, method):
+    """Scorer of ``ANOMALY_ENGINES[method]`` fitted on a dataset's normal rows, fitted once per dataset.
+    
+    The normal class is the one of the dataset's robust baseline when it
+    has one, else the most frequent class.
+    """
+    record = dataset_registry.get(dataset_id)
+    if record is None:
+        raise ValueError(f'Baseline dataset {dataset_id} not found or expired')
+    baseline = RobustBaseline.load(record.path)
+    normal_class = baseline.info.get('normalClass') if baseline else None
+    def fit():
+        values, _ = normal_rows(record, normal_class)
+        if not len(values):
+            raise ValueError(f'Dataset {dataset_id} has no normal rows to fit on')
+        return ANOMALY_ENGINES[method]().fit(values, record.feature_names)
+    key = (record.dataset_id, record.content_hash, f'anomaly-{method}-{normal_class}')
+    return dataset_cache.get_or_load(key, fit)
+
+def run_anomaly_detection(record, compact=False, offset=0, limit=None, top_k=None, method='zscore',
+                          baseline_id=None, threshold=None, progress=None):
+    """Anomaly detection payload for a dataset.
+    
+    ``zscore`` standardizes the dataset with its own statistics; ``mad`` and
+    ``quantile`` score it against the robust baseline fitted on
+    ``baseline_id`` (default: the dataset itself), and the
+    ``ANOMALY_ENGINES`` score it with a multivariate model fitted on that
+    dataset's normal rows.
+    """
+    if progress:
+        progress(10, 'Preprocessing data')
+    
+    if method == 'zscore':
+        # Preprocessed features (cached across endpoints), without the target
+        df_features = load_feature_frame(record)
+        if progress:
+            progress(60, 'Computing z-scores')
         
         # Detect anomalies
-        results = detector.detect_anomalies_zscore(df_features)
+        results = detector.detect_anomalies_zscore(df_features, compact=compact, offset=offset,
+                                                   limit=limit, top_k=top_k)
+    elif method in ANOMALY_ENGINES:
+        if progress:
+            progress(30, f'Fitting the {method} engine')
+        scorer = load_anomaly_engine(baseline_id or record.dataset_id, method)
+        missing = [name for name in scorer.sensors if name not in record.feature_names]
+        if missing:
+            raise ValueError(f'Dataset is missing sensors of the {method} engine: {missing[:10]}')
+        # Raw values: the scorer fills missing values with the normal data's medians
+        df_features = load_feature_frame(record, impute=False)
+        if progress:
+            progress(60, f'Scoring with the {method} engine')
+        results = detector.detect_anomalies_engine(df_features, scorer, threshold, compact=compact, offset=offset,
+                                                   limit=limit, top_k=top_k)
+        threshold = threshold or scorer.threshold
+    else:
+        baseline = load_baseline(baseline_id or record.dataset_id)
+        missing = [name for name in baseline.sensors if name not in record.feature_names]
+        if missing:
+            raise ValueError(f'Dataset is missing sensors of the baseline: {missing[:10]}')
+        # Raw values: missing values score NaN instead of being imputed
+        df_features = load_feature_frame(record, impute=False)
+        if progress:
+            progress(60, 'Scoring against the baseline')
+        results = detector.detect_anomalies_baseline(df_features, baseline, method, threshold, compact=compact,
+                                                     offset=offset, limit=limit, top_k=top_k)
+    results['scoring'] = {
+        'method': method,
+        'threshold': threshold or SCORING_THRESHOLDS.get(method, detector.z_score_threshold),
+        'baselineId': (baseline_id or record.dataset_id) if method != 'zscore' else None
+    }
+    
+    return {
+        'type': 'anomalies',
+        'data': results,
+        'timestamp': datetime.now().isoformat()
+    }
+
+@app.route('/api/detect-anomalies', methods=['POST'])
+def detect_anomalies():
+    """Detect anomalies using Z-Score method, robust scores or a multivariate engine.
+    
+    ``method=mad|quantile`` scores against the baseline of ``baseline_id``
+    (default: this dataset) and ``method=mahalanobis|isolation-forest``
+    against a model of that dataset's normal rows, with an optional
+    ``threshold``.
+    ``mode=compact`` returns only the anomalous rows (paged with ``offset`` and
+    ``limit``, or the ``top_k`` strongest) instead of the full z-score matrix,
+    which is available from ``/api/detect-anomalies/zscores``.
+    """
+    try:
+        record, error = resolve_dataset()
+        if error:
+            return error
         
-        return jsonify(safe_jsonify({
-            'type': 'anomalies',
-            'data': results,
-            'timestamp': datetime.now().isoformat()
-        }))
+        params = anomaly_params()
+        if params['method'] in SCORING_THRESHOLDS:
+            load_baseline(params['baseline_id'] or record.dataset_id)
+        elif params['baseline_id'] and dataset_registry.get(params['baseline_id']) is None:
+            raise ValueError(f"Baseline dataset {params['baseline_id']} not found or expired")
+        if wants_async():
+            return submit_job('detect-anomalies', record, params)
         
+        return json_response(run_anomaly_detection(record, **params), stream=not params['compact'])
+        
+    except ValueError as e:
+        return jsonify({'error': f'Invalid anomaly detection request: {str(e)}'}), 400
     except Exception as e:
         logger.error(f"Error in anomaly detection: {str(e)}")
         return jsonify({'error': f'Error in anomaly detection: {str(e)}'}), 500
 
-@app.route('/api/classify-faults', methods=['POST'])
-def classify_faults():
-    """Classify faults using Random Forest"""
+@app.route('/api/detect-anomalies/zscores', methods=['GET'])
+def download_z_scores():
+    """Download the full rows x sensors z-score matrix as a binary NumPy file.
+    
+    ``format=npy`` (default) returns a float32 matrix with sensor names in the
+    ``X-Sensor-Names`` header; ``format=npz`` bundles ``z_scores``,
+    ``row_index`` and ``sensors``.
+    """
     try:
-        # Get the uploaded file path
-        temp_files = [f for f in os.listdir(tempfile.gettempdir()) if f.endswith('.csv')]
-        if not temp_files:
-            return jsonify({'error': 'No data file found. Please upload a file first.'}), 400
+        record, error = resolve_dataset()
+        if error:
+            return error
         
-        latest_file = max(temp_files, key=lambda x: os.path.getctime(os.path.join(tempfile.gettempdir(), x)))
-        file_path = os.path.join(tempfile.gettempdir(), latest_file)
+        file_format = request_param('format', 'npy')
+        if file_format not in ('npy', 'npz'):
+            return jsonify({'error': 'format must be "npy" or "npz"'}), 400
         
-        df = pd.read_csv(file_path)
+        df_features = load_feature_frame(record)
+        z_scores = detector.compute_z_scores(df_features).astype(np.float32)
         
-        # Check if target column exists
-        if 'class' not in df.columns:
-            return jsonify({'error': 'Target column "class" not found in dataset'}), 400
+        buffer = io.BytesIO()
+        if file_format == 'npz':
+            np.savez(buffer, z_scores=z_scores, row_index=df_features.index.to_numpy(),
+                     sensors=np.array(df_features.columns, dtype=str))
+        else:
+            np.save(buffer, z_scores)
+        
+        response = app.response_class(buffer.getvalue(), mimetype='application/octet-stream')
+        response.headers['Content-Disposition'] = f'attachment; filename=zscores_{record.dataset_id}.{file_format}'
+        response.headers['X-Sensor-Names'] = ','.join(df_features.columns)
+        return response
         
-        # Preprocess data
-        df_preprocessed = preprocess_data(df)
+    except Exception as e:
+        logger.error(f"Error exporting z-scores: {str(e)}")
+        return jsonify({'error': f'Error exporting z-scores: {str(e)}'}), 500
+
+def benchmark_anomaly_engines(rows, seed=42, progress=None):
+    """Latency and detection quality of every anomaly method on generated sample data.
+    
+    Baselines and engines are fitted on the Normal rows of the first half
+    of the data and score the second half, whose fault classes are the
+    anomalies to find; z-scores use the second half's own statistics. The
+    data comes from a generator seeded with ``seed``, so the global NumPy
+    random state is left alone.
+    """
+    blocks = list(generate_sensor_blocks(rows, seed=seed))
+    sensors = sensor_names_for(blocks[0][0].shape[1])
+    values = np.concatenate([block for block, _ in blocks]).astype(np.float64)
+    normal = np.concatenate([codes for _, codes in blocks]) == list(DEFAULT_CLASS_MIX).index('Normal')
+    del blocks
+    half = len(values) // 2
+    reference, test = values[:half][normal[:half]], values[half:]
+    truth = ~normal[half:]
+    
+    def robust(method):
+        baseline = RobustBaseline.fit(reference, sensors)
+        return lambda X: np.fmax.reduce(baseline.score(X, method), axis=1), SCORING_THRESHOLDS[method]
+    def engine(method):
+        scorer = ANOMALY_ENGINES[method]().fit(reference, sensors)
+        return lambda X: scorer.score(X)[0], scorer.threshold
+    fitters = {'zscore': lambda: (lambda X: np.fmax.reduce(detector.compute_z_scores(pd.DataFrame(X)), axis=1),
+                                  detector.z_score_threshold)}
+    fitters.update({method: lambda method=method: robust(method) for method in SCORING_THRESHOLDS})
+    fitters.update({method: lambda method=method: engine(method) for method in ANOMALY_ENGINES})
+    
+    results = {}
+    for done, (method, fit) in enumerate(fitters.items()):
+        if progress:
+            progress(100 * done / len(fitters), f'Benchmarking {method}')
+        start = time.perf_counter()
+        score, threshold = fit()
+        fitted = time.perf_counter()
+        scores = np.nan_to_num(score(test), nan=0.0)
+        elapsed = time.perf_counter() - fitted
+        flagged = scores > threshold
+        results[method] = {
+            'threshold': round(float(threshold), 4),
+            'fitMs': round((fitted - start) * 1000, 3),
+            'msPer10kRows': round(elapsed * 1000 * 10000 / len(test), 3),
+            'flagged': int(flagged.sum()),
+            'precision': round(float(precision_score(truth, flagged, zero_division=0)), 4),
+            'recall': round(float(recall_score(truth, flagged, zero_division=0)), 4),
+            'f1': round(float(f1_score(truth, flagged, zero_division=0)), 4),
+            'falsePositiveRate': round(float(flagged[~truth].mean()), 4) if (~truth).any() else None,
+            'rocAuc': round(float(roc_auc_score(truth, scores)), 4) if 0 < truth.sum() < len(truth) else None
+        }
+    return {
+        'rows': len(values),
+        'referenceRows': len(reference),
+        'testRows': len(test),
+        'testAnomalies': int(truth.sum()),
+        'sensors': len(sensors),
+        'methods': results
+    }
+
+@app.route('/api/anomaly-engines/benchmark', methods=['GET'])
+def anomaly_engine_benchmark():
+    """Compare the anomaly methods on ``rows`` rows of generated sample data.
+    
+    Reports fit time, scoring latency per 10k rows and precision, recall,
+    F1 and ROC AUC against the generated fault labels. ``async=true``, or
+    more than ``MAX_SYNC_BENCHMARK_ROWS`` rows, runs it as a job (202).
+    """
+    try:
+        rows = request_param('rows', BENCHMARK_ROWS, int)
+        seed = request_param('seed', 42, int)
+        if not 100 <= rows <= MAX_BENCHMARK_ROWS:
+            raise ValueError(f'rows must be between 100 and {MAX_BENCHMARK_ROWS}')
+        if wants_async() or rows > MAX_SYNC_BENCHMARK_ROWS:
+            job = job_queue.submit('anomaly-benchmark',
+                                   lambda job: benchmark_anomaly_engines(rows, seed, progress=job.update),
+                                   params={'rows': rows, 'seed': seed})
+            return job_accepted(job)
+        return json_response({
+            'type': 'anomaly-benchmark',
+            'data': benchmark_anomaly_engines(rows, seed),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': f'Invalid benchmark request: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Error benchmarking anomaly engines: {str(e)}")
+        return jsonify({'error': f'Error benchmarking anomaly engines: {str(e)}'}), 500
+
+def int_list_param(name):
+    """Request parameter holding a list or comma-separated string of integers"""
+    value = request_param(name)
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [item for item in value.split(',') if item.strip()]
+    try:
+        return [int(item) for item in value]
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a list of integers')
+
+def classification_params():
+    """Training options of a classification request.
+    
+    ``engine`` picks one of the ``CLASSIFIER_ENGINES``; full training takes a
+    ``max_train_rows`` budget, ``class_weight`` and ``rolling_windows`` /
+    ``lags`` (comma-separated row counts) to add rolling-window features.
+    ``mode=incremental`` adds ``new_trees`` trees trained on the dataset to
+    the ``base_version`` model (default: active), keeping at most
+    ``max_trees``.
+    """
+    mode = request_param('mode', 'full')
+    if mode not in ('full', 'incremental'):
+        raise ValueError('mode must be "full" or "incremental"')
+    engine = request_param('engine', 'random-forest')
+    if engine not in CLASSIFIER_ENGINES:
+        raise ValueError(f'engine must be one of {sorted(CLASSIFIER_ENGINES)}')
+    if mode == 'incremental' and engine != 'random-forest':
+        raise ValueError('Incremental training is only supported for the random-forest engine')
+    params = {'mode': mode, 'engine': engine}
+    if mode == 'full':
+        params['max_train_rows'] = request_param('max_train_rows', DEFAULT_MAX_TRAIN_ROWS, int)
+        params['class_weight'] = request_param('class_weight')
+        if params['max_train_rows'] is not None and params['max_train_rows'] < 1:
+            raise ValueError('max_train_rows must be positive')
+        if params['class_weight'] not in (None, 'balanced'):
+            raise ValueError('class_weight must be "balanced" or omitted')
+        windows, lags = int_list_param('rolling_windows'), int_list_param('lags')
+        if windows or lags:
+            # Validated here, so a queued job cannot fail on them
+            RollingFeatures([], windows, lags)
+            params['rolling'] = {'windows': windows, 'lags': lags}
+    if mode == 'incremental':
+        params['base_version'] = request_param('base_version')
+        params['new_trees'] = request_param('new_trees', 20, int)
+        params['max_trees'] = request_param('max_trees', 200, int)
+        if params['new_trees'] < 1 or params['max_trees'] < 1:
+            raise ValueError('new_trees and max_trees must be positive')
+    return params
+
+def run_fault_classification(record, mode='full', engine='random-forest', base_version=None,
+                             new_trees=20, max_trees=200, max_train_rows=None, class_weight=None,
+                             rolling=None, progress=None):
+    """Train, store and activate a classifier on a dataset; returns the payload.
+    
+    With ``rolling`` ({windows, lags}) the model also sees rolling-window
+    features of the rows in file order; incremental updates reuse the base
+    model's rolling features.
+    """
+    if progress:
+        progress(5, 'Preprocessing data')
+    
+    # Preprocess data (cached across endpoints); NaN-native engines skip imputation
+    impute = engine not in NAN_NATIVE_ENGINES
+    df_preprocessed = load_preprocessed_frame(record, impute=impute)
+    
+    # Prepare features and target
+    X = df_preprocessed.drop('class', axis=1)
+    y = df_preprocessed['class']
+    
+    # Train a fresh detector, so concurrent requests never see a half-fitted model
+    trained = SensorFaultDetector()
+    extra = {'datasetId': record.dataset_id, 'trainingMode': mode, 'engine': engine}
+    if mode == 'incremental':
+        base = model_detector(base_version)
+        if base is None:
+            raise ValueError('No base model to update. Pass base_version or activate a model first.')
+        if not isinstance(base.model, RandomForestClassifier):
+            raise ValueError(f'Base model {base.model_version} is not a Random Forest')
+        trained.rolling = base.rolling
+    elif rolling:
+        trained.rolling = RollingFeatures(X.columns, rolling['windows'], rolling['lags'])
+    if trained.rolling is not None:
+        if progress:
+            progress(15, 'Computing rolling-window features')
+        X = load_rolling_frame(record, trained.rolling, impute)
+        extra['rollingFeatures'] = trained.rolling.config()
+    if progress:
+        progress(30, 'Training model')
+    
+    if mode == 'incremental':
+        results = trained.update_random_forest(base, X, y, new_trees=new_trees, max_trees=max_trees,
+                                               progress=progress)
+        extra['baseVersion'] = base.model_version
+    else:
+        results = trained.train_classifier(X, y, engine, progress=progress, max_train_rows=max_train_rows,
+                                           class_weight=class_weight)
+        trained.feature_names = X.columns.tolist()
+    if progress:
+        progress(95, 'Saving model')
+    
+    # Persist the trained model as a new version; activating it is an explicit call
+    metadata = model_store.save(trained.model, trained.scaler, trained.feature_names,
+                                metrics=results, extra=extra)
+    results['modelVersion'] = metadata['version']
+    results['engine'] = engine
+    
+    return {
+        'type': 'classification',
+        'data': results,
+        'timestamp': datetime.now().isoformat()
+    }
+
+@app.route('/api/classify-faults', methods=['POST'])
+def classify_faults():
+    """Classify faults with the selected ``engine`` (``mode=incremental`` updates an existing forest)"""
+    try:
+        record, error = resolve_dataset()
+        if error:
+            return error
         
-        # Prepare features and target
-        X = df_preprocessed.drop('class', axis=1)
-        y = df_preprocessed['class']
+        # Check if target column exists
+        if 'class' not in record.columns:
+            return jsonify({'error': 'Target column "class" not found in dataset'}), 400
         
-        # Train model and get results
-        results = detector.train_random_forest(X, y)
+        params = classification_params()
+        if params.get('base_version') and model_store.metadata(params['base_version']) is None:
+            return jsonify({'error': f"Model version {params['base_version']} not found"}), 404
+        if wants_async():
+            return submit_job('classify-faults', record, params)
         
-        return jsonify(safe_jsonify({
-            'type': 'classification',
-            'data': results,
-            'timestamp': datetime.now().isoformat()
-        }))
+        return json_response(run_fault_classification(record, **params))
         
+    except ValueError as e:
+        return jsonify({'error': f'Invalid classification request: {str(e)}'}), 400
     except Exception as e:
         logger.error(f"Error in fault classification: {str(e)}")
         return jsonify({'error': f'Error in fault classification: {str(e)}'}), 500
 
+def run_row_attribution(trained, record):
+    """Sensor contributions for the rows of ``record`` selected by the request.
+    
+    Rows are picked by index labels (``rows``), a positional window
+    (``start``/``end``) or the ``limit`` strongest z-score anomalies
+    (``anomalies=true``). Each row lists its ``top_n`` sensors by contribution
+    to its predicted class; ``sensors`` averages them over the selection.
+    """
+    top_n = max(request_param('top_n', 5, int), 1)
+    df_inputs = load_model_inputs(record, trained)
+    df_features = load_feature_frame(record, impute=not trained.handles_missing)
+    
+    rows = request_param('rows')
+    if rows is not None:
+        if isinstance(rows, str):
+            rows = [int(row) for row in rows.split(',') if row.strip()]
+        positions = df_features.index.get_indexer(rows)
+        if (positions < 0).any():
+            raise ValueError(f'Unknown row indices: {[r for r, p in zip(rows, positions) if p < 0][:10]}')
+    elif str(request_param('anomalies', 'false')).lower() == 'true':
+        anomalies = detector.detect_anomalies_zscore(df_features, compact=True,
+                                                     top_k=request_param('limit', 100, int))
+        positions = df_features.index.get_indexer([row['index'] for row in anomalies['anomalyRows']])
+    else:
+        start = max(request_param('start', 0, int), 0)
+        end = min(request_param('end', len(df_features), int), len(df_features))
+        positions = np.arange(start, max(end, start))
+    explainer = load_explainer(trained.model_version)
+    max_rows = MAX_ATTRIBUTION_ROWS if explainer is not None else MAX_OCCLUSION_ROWS
+    if len(positions) > max_rows:
+        raise ValueError(f'At most {max_rows} rows can be explained per request with this model')
+    
+    start_time = time.perf_counter()
+    values = df_inputs.to_numpy(dtype=np.float64)[positions]
+    explained = trained.explain_rows(values, explainer)
+    contributions = explained['contributions']
+    order = np.argsort(-contributions, axis=1)[:, :top_n]
+    names = np.array(trained.feature_names)
+    
+    mean_contribution = contributions.mean(axis=0) if len(positions) else np.zeros(len(names))
+    sensor_order = np.argsort(-mean_contribution)
+    return {
+        'method': 'tree-path' if explainer is not None else 'occlusion',
+        'rows': [
+            {
+                'index': int(index),
+                'predictedClass': str(predicted),
+                'probability': round(float(probability), 4),
+                'sensors': [
+                    {'name': str(names[j]), 'contribution': round(float(row_contributions[j]), 4)}
+                    for j in top
+                ]
+            }
+            for index, predicted, probability, row_contributions, top in zip(
+                df_features.index[positions], explained['classes'], explained['probabilities'],
+                contributions, order)
+        ],
+        'sensors': [
+            {
+                'name': str(names[j]),
+                'meanContribution': round(float(mean_contribution[j]), 4),
+                'description': trained._get_sensor_description(names[j])
+            }
+            for j in sensor_order
+        ],
+        'latencyMs': round((time.perf_counter() - start_time) * 1000, 3)
+    }
+
 @app.route('/api/root-cause', methods=['POST'])
 def identify_root_cause():
-    """Identify root cause sensors using feature importance"""
+    """Identify root cause sensors using feature importance.
+    
+    Uses the model ``version`` if given, else the newest model trained on
+    ``dataset_id``, else the active model. Selecting rows of the dataset
+    (``rows``, ``start``/``end`` or ``anomalies=true``) adds per-row sensor
+    attributions (see ``run_row_attribution``).
+    """
     try:
+        version = request_param('version')
+        if version and model_store.metadata(version) is None:
+            return jsonify({'error': f'Model version {version} not found'}), 404
+        
         # Check if model is trained
-        if detector.model is None:
-            return jsonify({'error': 'Model not trained. Please run classification first.'}), 400
+        trained = model_detector(version, request_param('dataset_id'))
+        if trained is None:
+            return jsonify({'error': 'No model for this dataset. Run classification on it, pass a version '
+                                     'or activate a model first.'}), 400
         
-        # Get feature importance
-        results = detector.get_feature_importance()
+        # Get feature importance (rows of the dataset only matter for models without built-in importances)
+        record = dataset_registry.get(request_param('dataset_id'))
+        sample = (lambda: load_model_inputs(record, trained).to_numpy(dtype=np.float64)) if record else None
+        results = trained.get_feature_importance(sample)
         
-        return jsonify({
+        results['modelVersion'] = trained.model_version
+        
+        if any(request_param(name) is not None for name in ('rows', 'start', 'end', 'anomalies')):
+            record, error = resolve_dataset()
+            if error:
+                return error
+            results['rowAttribution'] = run_row_attribution(trained, record)
+        
+        return json_response({
             'type': 'rootcause',
             'data': results,
             'timestamp': datetime.now().isoformat()
         })
         
+    except ValueError as e:
+        return jsonify({'error': f'Invalid root cause request: {str(e)}'}), 400
     except Exception as e:
         logger.error(f"Error in root cause analysis: {str(e)}")
         return jsonify({'error': f'Error in root cause analysis: {str(e)}'}), 500
 
+@app.route('/api/predict', methods=['POST'])
+def predict():
+    """Score rows with a stored model without retraining.
+    
+    Takes a ``dataset_id`` or posted ``rows`` (lists with ``columns``, or dicts)
+    and an optional model ``version`` (defaults to the newest model trained on
+    ``dataset_id``, else the active one). Returns the predicted class and
+    class probabilities per row plus latency statistics.
+    For models with rolling-window features, posted rows are one time-ordered
+    series; with a ``stream_id`` they continue that stream's earlier rows.
+    """
+    try:
+        body = request.get_json(silent=True) or {}
+        rows = body.get('rows')
+        batch_size = max(request_param('batch_size', 10000, int), 1)
+        include_probabilities = str(request_param('include_probabilities', 'true')).lower() != 'false'
+        
+        version = request_param('version')
+        if version and model_store.metadata(version) is None:
+            return jsonify({'error': f'Model version {version} not found'}), 404
+        scorer = model_detector(version, request_param('dataset_id'))
+        if scorer is None:
+            return jsonify({'error': 'No model to score with. Pass a version or a dataset_id with a trained '
+                                     'model, or activate a model first.'}), 400
+        
+        start = time.perf_counter()
+        row_index = None
+        if rows:
+            values = rows_to_matrix(rows, body.get('columns'), scorer.sensor_names)
+            if scorer.rolling is not None:
+                stream_id = request_param('stream_id')
+                if stream_id is None:
+                    values = scorer.rolling.transform(values)
+                elif not STREAM_ID_PATTERN.match(stream_id):
+                    return jsonify({'error': 'Invalid stream ID'}), 400
+                else:
+                    values = stream_model_inputs(stream_id, scorer, values)
+        else:
+            record, error = resolve_dataset()
+            if error:
+                return error
+            df_inputs = load_model_inputs(record, scorer)
+            values = df_inputs.to_numpy(dtype=np.float64)
+            row_index = df_inputs.index.to_numpy()
+        prepared_ms = (time.perf_counter() - start) * 1000
+        
+        predictions, probabilities = scorer.predict_batch(values, batch_size=batch_size)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        inference_ms = elapsed_ms - prepared_ms
+        
+        classes, counts = np.unique(predictions, return_counts=True)
+        results = {
+            'rows': len(values),
+            'modelVersion': scorer.model_version,
+            'classes': [str(c) for c in scorer.model.classes_],
+            'predictions': predictions.astype(str),
+            'classCounts': {str(c): int(n) for c, n in zip(classes, counts)},
+            'latency': {
+                'totalMs': round(elapsed_ms, 3),
+                'inferenceMs': round(inference_ms, 3),
+                'perRowMs': round(elapsed_ms / max(len(values), 1), 5),
+                'rowsPerSecond': round(len(values) / (elapsed_ms / 1000), 1) if elapsed_ms > 0 else None
+            }
+        }
+        if include_probabilities:
+            results['probabilities'] = np.round(probabilities, 4)
+        if row_index is not None:
+            results['rowIndex'] = row_index
+        
+        return json_response({
+            'type': 'prediction',
+            'data': results,
+            'timestamp': datetime.now().isoformat()
+        }, stream=len(values) > 10000)
+        
+    except ValueError as e:
+        return jsonify({'error': f'Invalid prediction input: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Error in prediction: {str(e)}")
+        return jsonify({'error': f'Error in prediction: {str(e)}'}), 500
+
+@app.route('/api/models', methods=['GET'])
+def list_models():
+    """List stored model versions and the active one"""
+    return json_response({
+        'active': model_store.active_version(),
+        'models': model_store.list()
+    })
+
+@app.route('/api/models/<version>', methods=['GET'])
+def model_detail(version):
+    """Metadata and metrics of a stored model version"""
+    metadata = model_store.metadata(version)
+    if metadata is None:
+        return jsonify({'error': f'Model version {version} not found'}), 404
+    return json_response(metadata)
+
+@app.route('/api/models/<version>/activate', methods=['POST'])
+def activate_model_version(version):
+    """Make a stored model version the one that serves predictions"""
+    try:
+        if model_store.metadata(version) is None:
+            return jsonify({'error': f'Model version {version} not found'}), 404
+        model_store.activate(version)
+        # Load it now so the first prediction does not pay for it
+        load_detector(version)
+        metadata = model_store.metadata(version)
+        return json_response({'message': f'Model version {version} activated', 'data': metadata})
+        
+    except Exception as e:
+        logger.error(f"Error activating model: {str(e)}")
+        return jsonify({'error': f'Error activating model: {str(e)}'}), 500
+
 @app.route('/api/data-stats', methods=['GET'])
 def get_data_statistics():
     """Get basic statistics about the uploaded data"""
     try:
-        temp_files = [f for f in os.listdir(tempfile.gettempdir()) if f.endswith('.csv')]
-        if not temp_files:
-            return jsonify({'error': 'No data file found'}), 404
-        
-        latest_file = max(temp_files, key=lambda x: os.path.getctime(os.path.join(tempfile.gettempdir(), x)))
-        file_path = os.path.join(tempfile.gettempdir(), latest_file)
-        
-        df = pd.read_csv(file_path)
-        
-        stats = {
-            'rows': len(df),
-            'columns': len(df.columns),
-            'memory_usage': df.memory_usage(deep=True).sum(),
-            'missing_values': df.isnull().sum().sum(),
-            'numeric_columns': len(df.select_dtypes(include=[np.number]).columns),
-            'categorical_columns': len(df.select_dtypes(include=['object']).columns),
-            'column_names': df.columns.tolist()
-        }
+        record, error = resolve_dataset()
+        if error:
+            return error
+        
+        # Answered from the summary and per-sensor statistics (moments,
+        # quantiles, histograms) stored with the dataset, without loading the data
+        stats = dict(record.meta.get('summary', {}))
+        stats.update({
+            'rows': record.rows,
+            'columns': len(record.columns),
+            'column_names': record.columns,
+            'sensor_stats': record.meta.get('sensorStats', {})
+        })
         
         return jsonify(stats)
         
@@ -417,130 +1580,511 @@ def get_data_statistics():
         logger.error(f"Error getting data statistics: {str(e)}")
         return jsonify({'error': f'Error getting data statistics: {str(e)}'}), 500
 
+def run_visualization(record, progress=None):
+    """Class distribution, correlations, time series and sensor statistics of a dataset"""
+    if progress:
+        progress(10, 'Preprocessing data')
+    
+    # Preprocess data for visualizations (cached across endpoints)
+    df_preprocessed = load_preprocessed_frame(record)
+    if progress:
+        progress(50, 'Computing correlations')
+    
+    # Class distribution
+    class_distribution = {}
+    if 'class' in df_preprocessed.columns:
+        class_counts = df_preprocessed['class'].value_counts()
+        class_distribution = {str(k): int(v) for k, v in class_counts.items()}
+    else:
+        # If no class column, create a dummy distribution
+        class_distribution = {'Normal': len(df_preprocessed)}
+    
+    # Feature association with target (if class exists): the correlation ratio
+    # (eta, unsigned 0..1) for the class label, plus the signed correlation
+    # with each class' indicator
+    correlation_ratio = {}
+    class_correlations = {}
+    if 'class' in df_preprocessed.columns:
+        summary = load_correlations(record)
+        for name, ratio in zip(summary['sensors'], summary['correlationRatio']):
+            if not np.isnan(ratio):
+                correlation_ratio[name] = round(float(ratio), 3)
+        class_correlations = {
+            str(label): dict(zip(summary['sensors'], np.round(row, 3)))
+            for label, row in zip(summary['classes'], summary['classCorrelation'])
+        }
+    
+    if progress:
+        progress(80, 'Collecting sensor statistics')
+    
+    # Time series of the first 8 sensors, downsampled over the whole recording
+    numeric_cols = df_preprocessed.select_dtypes(include=[np.number]).columns
+    feature_cols = [col for col in numeric_cols if col != 'class']
+    time_series = downsample_sensors(record, feature_cols[:8], points=DASHBOARD_TIME_SERIES_POINTS)
+    time_series_data = {col: series['values'] for col, series in time_series.items()}
+    
+    # Sensor statistics (computed once at upload)
+    stored_stats = record.meta.get('sensorStats', {})
+    sensor_stats = {}
+    for col in feature_cols:
+        stats = stored_stats.get(col, {})
+        sensor_stats[col] = {
+            key: round(stats[key], 3) if stats.get(key) is not None else 0
+            for key in ('mean', 'std', 'min', 'max')
+        }
+    
+    return {
+        'classDistribution': class_distribution,
+        'correlationRatio': correlation_ratio,
+        'classCorrelations': class_correlations,
+        'timeSeriesData': time_series_data,
+        'sensorStats': sensor_stats,
+        'totalSamples': len(df_preprocessed),
+        'totalFeatures': len(feature_cols)
+    }
+
 @app.route('/api/visualization-data', methods=['GET'])
 def get_visualization_data():
     """Get data for visualizations including time series, correlations, and class distribution"""
     try:
-        temp_files = [f for f in os.listdir(tempfile.gettempdir()) if f.endswith('.csv')]
-        if not temp_files:
-            return jsonify({'error': 'No data file found'}), 404
+        record, error = resolve_dataset()
+        if error:
+            return error
         
-        latest_file = max(temp_files, key=lambda x: os.path.getctime(os.path.join(tempfile.gettempdir(), x)))
-        file_path = os.path.join(tempfile.gettempdir(), latest_file)
+        if wants_async():
+            return submit_job('visualization-data', record)
         
-        df = pd.read_csv(file_path)
-        
-        # Preprocess data for visualizations
-        df_preprocessed = preprocess_data(df)
-        
-        # Class distribution
-        class_distribution = {}
-        if 'class' in df_preprocessed.columns:
-            class_counts = df_preprocessed['class'].value_counts()
-            class_distribution = {str(k): int(v) for k, v in class_counts.items()}
-        else:
-            # If no class column, create a dummy distribution
-            class_distribution = {'Normal': len(df_preprocessed)}
-        
-        # Feature correlation with target (if class exists)
-        correlations = {}
-        if 'class' in df_preprocessed.columns:
-            numeric_cols = df_preprocessed.select_dtypes(include=[np.number]).columns
-            feature_cols = [col for col in numeric_cols if col != 'class']
-            
-            for col in feature_cols:
-                try:
-                    corr = df_preprocessed[col].corr(df_preprocessed['class'])
-                    if not pd.isna(corr):
-                        correlations[col] = round(corr, 3)
-                except:
-                    correlations[col] = 0.0
-        
-        # Time series data (simulate time series from sensor data)
-        time_series_data = {}
-        numeric_cols = df_preprocessed.select_dtypes(include=[np.number]).columns
-        feature_cols = [col for col in numeric_cols if col != 'class']
-        
-        # Take first 24 samples for time series visualization
-        sample_size = min(24, len(df_preprocessed))
-        for col in feature_cols[:8]:  # Limit to first 8 sensors
-            try:
-                values = df_preprocessed[col].head(sample_size).tolist()
-                time_series_data[col] = values
-            except:
-                time_series_data[col] = []
-        
-        # Sensor statistics
-        sensor_stats = {}
-        for col in feature_cols:
-            try:
-                sensor_stats[col] = {
-                    'mean': round(float(df_preprocessed[col].mean()), 3),
-                    'std': round(float(df_preprocessed[col].std()), 3),
-                    'min': round(float(df_preprocessed[col].min()), 3),
-                    'max': round(float(df_preprocessed[col].max()), 3)
-                }
-            except:
-                sensor_stats[col] = {'mean': 0, 'std': 0, 'min': 0, 'max': 0}
-        
-        return jsonify(safe_jsonify({
-            'classDistribution': class_distribution,
-            'correlations': correlations,
-            'timeSeriesData': time_series_data,
-            'sensorStats': sensor_stats,
-            'totalSamples': len(df_preprocessed),
-            'totalFeatures': len(feature_cols)
-        }))
+        return json_response(run_visualization(record))
         
     except Exception as e:
         logger.error(f"Error getting visualization data: {str(e)}")
         return jsonify({'error': f'Error getting visualization data: {str(e)}'}), 500
 
+@app.route('/api/correlations', methods=['GET'])
+def get_correlations():
+    """Sensor x sensor correlation matrix and sensor/class correlations of a dataset"""
+    try:
+        record, error = resolve_dataset()
+        if error:
+            return error
+        
+        summary = load_correlations(record)
+        results = {
+            'sensors': summary['sensors'].tolist(),
+            'matrix': np.round(summary['matrix'], 4)
+        }
+        if 'classes' in summary:
+            results['classes'] = [str(label) for label in summary['classes']]
+            results['classCorrelation'] = np.round(summary['classCorrelation'], 4)
+            results['correlationRatio'] = np.round(summary['correlationRatio'], 4)
+        return json_response(results)
+        
+    except Exception as e:
+        logger.error(f"Error computing correlations: {str(e)}")
+        return jsonify({'error': f'Error computing correlations: {str(e)}'}), 500
+
+def sensor_range_params(record):
+    """``sensors`` (comma-separated or a list; default: the first 10) and the
+    row range ``start``/``end`` (default: the whole dataset) of a request"""
+    sensors = request_param('sensors')
+    if sensors is None:
+        sensors = record.feature_names[:10]
+    elif isinstance(sensors, str):
+        sensors = [name.strip() for name in sensors.split(',') if name.strip()]
+    unknown = [name for name in sensors if name not in record.feature_names]
+    if unknown:
+        raise ValueError(f'Unknown sensors: {unknown}')
+    start = request_param('start', 0, int)
+    end = request_param('end', record.rows, int)
+    if not 0 <= start < end <= record.rows:
+        raise ValueError(f'Row range must satisfy 0 <= start < end <= {record.rows}')
+    return sensors, start, end
+
+def downsample_sensors(record, sensors, start=0, end=None, points=TIME_SERIES_POINTS, method='lttb'):
+    """Shape-preserving downsample of the rows [start, end) of each sensor.
+
+    Reads the min/max pyramid stored with the dataset, so the cost depends on
+    ``points`` rather than on the length of the range. Each sensor gets the
+    kept row positions (``index``) and their raw ``values``, plus its mean and
+    std over the whole dataset (computed at upload).
+    """
+    stored_stats = record.meta.get('sensorStats', {})
+    time_series = {}
+    for col in sensors:
+        index, values = record.store.pyramid(col).downsample(start, end, points, method)
+        stats = stored_stats.get(col, {})
+        time_series[col] = {
+            'index': index,
+            'values': values,
+            'mean': round(stats['mean'], 3) if stats.get('mean') is not None else 0,
+            'std': round(stats['std'], 3) if stats.get('std') is not None else 0
+        }
+    return time_series
+
 @app.route('/api/sensor-time-series', methods=['GET'])
 def get_sensor_time_series():
-    """Get time series data for specific sensors"""
+    """Downsampled time series of selected sensors over a row range.
+    
+    ``sensors`` (comma-separated or a list; default: the first 10), the row
+    range ``start``/``end`` (default: the whole recording), the target
+    ``points`` per sensor and the ``method`` (``lttb`` or ``minmax``).
+    """
     try:
-        temp_files = [f for f in os.listdir(tempfile.gettempdir()) if f.endswith('.csv')]
-        if not temp_files:
-            return jsonify({'error': 'No data file found'}), 404
-        
-        latest_file = max(temp_files, key=lambda x: os.path.getctime(os.path.join(tempfile.gettempdir(), x)))
-        file_path = os.path.join(tempfile.gettempdir(), latest_file)
-        
-        df = pd.read_csv(file_path)
-        
-        # Preprocess data
-        df_preprocessed = preprocess_data(df)
-        
-        # Get numeric columns (sensors)
-        numeric_cols = df_preprocessed.select_dtypes(include=[np.number]).columns
-        feature_cols = [col for col in numeric_cols if col != 'class']
-        
-        # Limit to first 50 samples for better visualization
-        sample_size = min(50, len(df_preprocessed))
-        df_sample = df_preprocessed.head(sample_size)
-        
-        time_series = {}
-        for col in feature_cols[:10]:  # Limit to first 10 sensors
-            try:
-                values = df_sample[col].tolist()
-                time_series[col] = {
-                    'values': values,
-                    'mean': round(float(df_sample[col].mean()), 3),
-                    'std': round(float(df_sample[col].std()), 3)
-                }
-            except:
-                time_series[col] = {'values': [], 'mean': 0, 'std': 0}
+        record, error = resolve_dataset()
+        if error:
+            return error
         
-        return jsonify(safe_jsonify({
+        sensors, start, end = sensor_range_params(record)
+        points = request_param('points', TIME_SERIES_POINTS, int)
+        method = request_param('method', 'lttb')
+        if points > MAX_TIME_SERIES_POINTS:
+            raise ValueError(f'At most {MAX_TIME_SERIES_POINTS} points per sensor can be requested')
+        if method not in DOWNSAMPLING_METHODS:
+            raise ValueError(f"method must be one of {list(DOWNSAMPLING_METHODS)}")
+        
+        time_series = downsample_sensors(record, sensors, start, end, points, method)
+        return json_response({
             'timeSeries': time_series,
-            'sampleSize': sample_size,
-            'sensors': list(time_series.keys())
-        }))
+            'sampleSize': max((len(series['index']) for series in time_series.values()), default=0),
+            'sensors': list(time_series.keys()),
+            'range': {'start': start, 'end': end, 'rows': record.rows},
+            'points': points,
+            'method': method
+        })
         
+    except ValueError as e:
+        return jsonify({'error': f'Invalid time series request: {str(e)}'}), 400
     except Exception as e:
         logger.error(f"Error getting sensor time series: {str(e)}")
         return jsonify({'error': f'Error getting sensor time series: {str(e)}'}), 500
 
+@app.route('/api/sensor-windows', methods=['GET'])
+def get_sensor_windows():
+    """Count, mean, std, min, max and anomaly counts of sensors over row windows.
+    
+    The row range ``start``/``end`` of the selected ``sensors`` is split into
+    ``windows`` equal windows. Every window is answered from the rollup
+    pyramid stored with the dataset in O(log n), without scanning its rows.
+    """
+    try:
+        record, error = resolve_dataset()
+        if error:
+            return error
+        
+        sensors, start, end = sensor_range_params(record)
+        windows = request_param('windows', 1, int)
+        if not 1 <= windows <= min(MAX_STAT_WINDOWS, end - start):
+            raise ValueError(f'windows must be between 1 and {min(MAX_STAT_WINDOWS, end - start)}')
+        edges = np.linspace(start, end, windows + 1).astype(np.int64)
+        starts, ends = edges[:-1], edges[1:]
+        
+        sensor_windows = {}
+        for col in sensors:
+            stats = record.store.pyramid(col).window_stats(starts, ends)
+            sensor_windows[col] = {
+                key: np.round(values, 4) if values.dtype.kind == 'f' else values
+                for key, values in stats.items()
+            }
+        results = {
+            'range': {'start': start, 'end': end, 'rows': record.rows},
+            'windows': {'start': starts, 'end': ends},
+            'sensors': sensor_windows,
+            'zScoreThreshold': record.meta.get('pyramid', {}).get('zScoreThreshold')
+        }
+        # Rows with any anomalous sensor, over all sensors of the dataset
+        anomaly_rows = record.store.anomaly_rows()
+        if anomaly_rows is not None:
+            results['anomalyRows'] = anomaly_rows.window_counts(starts, ends)
+        return json_response(results)
+        
+    except ValueError as e:
+        return jsonify({'error': f'Invalid window statistics request: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Error computing sensor window statistics: {str(e)}")
+        return jsonify({'error': f'Error computing sensor window statistics: {str(e)}'}), 500
+
+def batch_tasks():
+    """Per-truck tasks of a batch request and the uploaded zip archive (if any).
+    
+    Trucks are the datasets named by ``dataset_ids`` (a list or comma-separated)
+    or the CSV files of an uploaded zip ``file``; zip members are ingested
+    into new datasets by the workers.
+    """
+    version = request_param('version')
+    if version and model_store.metadata(version) is None:
+        raise ValueError(f'Model version {version} not found')
+    if str(request_param('predict', 'true')).lower() != 'false':
+        version = version or model_store.active_version()
+        if version is None:
+            raise ValueError('No active model. Pass a version, activate a model or set predict=false')
+    else:
+        version = None
+    common = {
+        'zScoreThreshold': detector.z_score_threshold,
+        'modelsRoot': model_store.root,
+        'version': version
+    }
+    
+    if 'file' in request.files:
+        upload = request.files['file']
+        if not upload.filename.endswith('.zip'):
+            raise ValueError('Batch uploads must be zip archives of CSV files')
+        zip_path = os.path.join(dataset_registry.storage_dir, f'.batch-{uuid.uuid4().hex}.zip')
+        upload.save(zip_path)
+        try:
+            with zipfile.ZipFile(zip_path) as archive:
+                members = [name for name in archive.namelist()
+                           if name.endswith('.csv') and not name.startswith('__MACOSX/')]
+            if not members:
+                raise ValueError('The zip archive contains no CSV files')
+            if len(members) > MAX_BATCH_DATASETS:
+                raise ValueError(f'At most {MAX_BATCH_DATASETS} datasets can be analyzed per batch')
+        except (ValueError, zipfile.BadZipFile):
+            os.remove(zip_path)
+            raise
+        tasks = []
+        for member in members:
+            dataset_id = uuid.uuid4().hex
+            tasks.append(dict(common, truck=os.path.splitext(os.path.basename(member))[0], datasetId=dataset_id,
+                              path=dataset_registry.new_path(dataset_id), zipPath=zip_path, member=member))
+        return tasks, zip_path
+    
+    dataset_ids = request_param('dataset_ids')
+    if isinstance(dataset_ids, str):
+        dataset_ids = [dataset_id.strip() for dataset_id in dataset_ids.split(',') if dataset_id.strip()]
+    if not dataset_ids:
+        raise ValueError('Provide dataset_ids or a zip file of CSVs')
+    if len(dataset_ids) > MAX_BATCH_DATASETS:
+        raise ValueError(f'At most {MAX_BATCH_DATASETS} datasets can be analyzed per batch')
+    records = [dataset_registry.get(dataset_id) for dataset_id in dataset_ids]
+    unknown = [dataset_id for dataset_id, record in zip(dataset_ids, records) if record is None]
+    if unknown:
+        raise ValueError(f'Datasets not found or expired: {unknown[:10]}')
+    tasks = [dict(common, truck=record.filename or record.dataset_id, datasetId=record.dataset_id,
+                  path=record.path) for record in records]
+    return tasks, None
+
+def run_batch_analysis(tasks, zip_path=None, progress=None):
+    """Fan the per-truck tasks out to the batch process pool.
+    
+    Datasets ingested from a zip archive are registered when their analysis
+    succeeded and deleted otherwise; the archive itself is removed.
+    """
+    try:
+        results = batch_analyzer.run(tasks, progress=progress)
+    except BaseException:
+        if zip_path:
+            for task in tasks:
+                shutil.rmtree(task['path'], ignore_errors=True)
+        raise
+    finally:
+        if zip_path and os.path.exists(zip_path):
+            os.remove(zip_path)
+    if zip_path:
+        for summary, task in zip(results['trucks'], tasks):
+            if 'error' in summary or dataset_registry.get(task['datasetId']) is None:
+                shutil.rmtree(task['path'], ignore_errors=True)
+                summary['datasetId'] = None
+    return results
+
+@app.route('/api/batch-analysis', methods=['POST'])
+def batch_analysis():
+    """Anomaly detection and model inference over many trucks' datasets in parallel.
+    
+    Takes ``dataset_ids`` or a zip ``file`` of per-truck CSVs, an optional model
+    ``version`` (default: the active model; ``predict=false`` skips inference)
+    and ``async=true`` to run as a job. Returns a summary per truck plus a
+    fleet rollup.
+    """
+    try:
+        tasks, zip_path = batch_tasks()
+        if wants_async():
+            job = job_queue.submit('batch-analysis',
+                                   lambda job: run_batch_analysis(tasks, zip_path, progress=job.update),
+                                   params={'trucks': len(tasks), 'version': tasks[0]['version']})
+            return job_accepted(job)
+        
+        return json_response({
+            'type': 'batch-analysis',
+            'data': run_batch_analysis(tasks, zip_path),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({'error': f'Invalid batch analysis request: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Error in batch analysis: {str(e)}")
+        return jsonify({'error': f'Error in batch analysis: {str(e)}'}), 500
+
+@app.route('/api/stream/<stream_id>/score', methods=['POST'])
+def score_stream(stream_id):
+    """Score a mini-batch of live rows with the stream's online Z-score detector.
+
+    The first call creates the stream; its sensors come from ``columns``, the
+    keys of dict rows, or a ``dataset_id`` whose upload statistics seed the
+    baseline. ``decay``, ``zScoreThreshold`` and ``warmup`` configure it.
+    """
+    try:
+        if not STREAM_ID_PATTERN.match(stream_id):
+            return jsonify({'error': 'Invalid stream ID'}), 400
+        
+        body = request.get_json(silent=True) or {}
+        rows = body.get('rows') or []
+        columns = body.get('columns')
+        if not rows:
+            return jsonify({'error': 'No rows provided'}), 400
+        
+        start = time.perf_counter()
+        with online_detectors.lock(stream_id):
+            online = online_detectors.get(stream_id)
+            if online is None:
+                record = dataset_registry.get(body.get('dataset_id'))
+                if record is not None:
+                    feature_names = record.feature_names
+                elif columns:
+                    feature_names = [col for col in columns if col != 'class']
+                elif isinstance(rows[0], dict):
+                    feature_names = [col for col in rows[0] if col != 'class']
+                else:
+                    return jsonify({'error': 'Provide "columns" or dict rows to create a new stream'}), 400
+                
+                # Validated by the constructor, before anything is persisted
+                online = OnlineZScoreDetector(
+                    feature_names,
+                    z_score_threshold=body.get('zScoreThreshold', 3.0),
+                    decay=body.get('decay'),
+                    warmup=body.get('warmup', 30)
+                )
+                if record is not None:
+                    stats = record.meta.get('sensorStats', {})
+                    online.seed(
+                        [stats.get(name, {}).get('count', 0) for name in feature_names],
+                        [stats.get(name, {}).get('mean') or 0.0 for name in feature_names],
+                        [stats.get(name, {}).get('std') or 0.0 for name in feature_names]
+                    )
+                online_detectors.create(stream_id, online)
+            
+            values = rows_to_matrix(rows, columns, online.feature_names)
+            results = online.score_batch(values)
+            online_detectors.save(stream_id)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        return json_response({
+            'type': 'stream',
+            'streamId': stream_id,
+            'data': {
+                'rows': len(values),
+                'anomalies': results['anomalies'],
+                'severity': results['severity'].tolist(),
+                'maxZScores': np.round(results['maxZScores'], 3),
+                'maxSensors': results['maxSensors'],
+                'rowsSeen': online.rows_seen,
+                'latency': {
+                    'totalMs': round(elapsed_ms, 3),
+                    'perRowMs': round(elapsed_ms / len(values), 4)
+                }
+            },
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': f'Invalid stream request: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Error scoring stream: {str(e)}")
+        return jsonify({'error': f'Error scoring stream: {str(e)}'}), 500
+
+@app.route('/api/stream/<stream_id>', methods=['GET', 'DELETE'])
+def stream_state(stream_id):
+    """Get the running baseline of a stream or reset it"""
+    if not STREAM_ID_PATTERN.match(stream_id):
+        return jsonify({'error': 'Invalid stream ID'}), 400
+    if request.method == 'DELETE':
+        with online_detectors.lock(stream_id):
+            if not online_detectors.remove(stream_id):
+                return jsonify({'error': f'Stream {stream_id} not found'}), 404
+        return jsonify({'message': f'Stream {stream_id} reset'})
+    
+    online = online_detectors.get(stream_id)
+    if online is None:
+        return jsonify({'error': f'Stream {stream_id} not found'}), 404
+    return json_response(online.summary())
+
+# Job types accepted by /api/jobs and the function computing each payload
+JOB_RUNNERS = {
+    'classify-faults': run_fault_classification,
+    'detect-anomalies': run_anomaly_detection,
+    'visualization-data': run_visualization
+}
+
+def submit_job(job_type, record, params=None):
+    """Queue an analysis of ``record`` and answer 202 with the job status"""
+    params = params or {}
+    runner = JOB_RUNNERS[job_type]
+    job = job_queue.submit(job_type, lambda job: runner(record, progress=job.update, **params),
+                           params=dict(params, dataset_id=record.dataset_id))
+    return job_accepted(job)
+
+def job_accepted(job):
+    """202 response with the status and polling URLs of a queued job"""
+    status = job.to_dict()
+    status['statusUrl'] = f'/api/jobs/{job.job_id}'
+    status['resultUrl'] = f'/api/jobs/{job.job_id}/result'
+    return jsonify(status), 202
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+def jobs():
+    """List jobs, or submit one: ``type`` is a job type, ``dataset_id`` the dataset"""
+    if request.method == 'GET':
+        return jsonify({'jobs': [job.to_dict() for job in job_queue.list()]})
+    
+    try:
+        job_type = request_param('type')
+        if job_type not in JOB_RUNNERS:
+            return jsonify({'error': f'Unknown job type. Expected one of: {sorted(JOB_RUNNERS)}'}), 400
+        
+        record, error = resolve_dataset()
+        if error:
+            return error
+        
+        params = None
+        if job_type == 'classify-faults':
+            if 'class' not in record.columns:
+                return jsonify({'error': 'Target column "class" not found in dataset'}), 400
+            params = classification_params()
+        if job_type == 'detect-anomalies':
+            params = anomaly_params()
+        return submit_job(job_type, record, params)
+        
+    except ValueError as e:
+        return jsonify({'error': f'Invalid job parameters: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Error submitting job: {str(e)}")
+        return jsonify({'error': f'Error submitting job: {str(e)}'}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    """Poll a job's status and progress, or cancel it"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    if request.method == 'DELETE':
+        job_queue.cancel(job_id)
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Payload of a finished job, in the format of the corresponding endpoint"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    if job.status == 'succeeded':
+        stream = job.job_type == 'detect-anomalies' and not job.params.get('compact')
+        return json_response(job.result, stream=stream)
+    if job.status == 'failed':
+        return jsonify({'error': job.error, 'job': job.to_dict()}), 500
+    if job.status == 'cancelled':
+        return jsonify({'error': f'Job {job_id} was cancelled', 'job': job.to_dict()}), 409
+    return jsonify(job.to_dict()), 202
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,174 @@
+import numpy as np
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+
+# Memory budget (bytes) of the occluded input copies built per prediction call
+OCCLUSION_BUDGET_BYTES = 64 * 1024 * 1024
+# Fields of scikit-learn's (private) boosting tree nodes read by BoostingPathExplainer
+NODE_FIELDS = {'value', 'feature_idx', 'num_threshold', 'missing_go_to_left', 'left', 'right', 'is_leaf',
+               'is_categorical'}
+
+
+class TreePathExplainer:
+    """Per-sample feature contributions of a random forest (Saabas' method).
+
+    Walking a sample down a tree, every split moves the predicted class
+    distribution from the parent node's to the child's; that change is
+    credited to the split feature. Summed over the path and averaged over
+    trees, ``bias + contributions.sum(features)`` equals ``predict_proba``.
+
+    The per-node changes of all trees are stored once as a sparse
+    (nodes, features * classes) matrix, so explaining a batch is one
+    ``decision_path`` call and one sparse product.
+    """
+
+    def __init__(self, model):
+        if not isinstance(model, RandomForestClassifier):
+            raise TypeError("Tree-path attribution needs a RandomForestClassifier")
+        self.n_features = model.n_features_in_
+        self.n_classes = len(model.classes_)
+        self.n_trees = len(model.estimators_)
+        self.model = model
+
+        rows, cols, data = [], [], []
+        bias = np.zeros(self.n_classes)
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            value = tree.value[:, 0, :]
+            probabilities = value / value.sum(axis=1, keepdims=True)
+            bias += probabilities[0]
+
+            # Parent and split feature of every non-root node
+            parent = np.full(tree.node_count, -1)
+            internal = np.flatnonzero(tree.children_left >= 0)
+            parent[tree.children_left[internal]] = internal
+            parent[tree.children_right[internal]] = internal
+            nodes = np.flatnonzero(parent >= 0)
+            delta = probabilities[nodes] - probabilities[parent[nodes]]
+            feature = tree.feature[parent[nodes]]
+
+            rows.append(np.repeat(nodes + offset, self.n_classes))
+            cols.append((feature[:, np.newaxis] * self.n_classes + np.arange(self.n_classes)).ravel())
+            data.append(delta.ravel())
+            offset += tree.node_count
+
+        self.bias = bias / self.n_trees
+        self._deltas = sparse.csr_matrix(
+            (np.concatenate(data) / self.n_trees, (np.concatenate(rows), np.concatenate(cols))),
+            shape=(offset, self.n_features * self.n_classes)
+        )
+
+    def explain(self, X):
+        """Contributions of shape (rows, features, classes) for scaled inputs ``X``"""
+        paths, _ = self.model.decision_path(X)
+        contributions = (paths @ self._deltas).toarray()
+        return contributions.reshape(len(X), self.n_features, self.n_classes)
+
+    def probabilities(self, X, contributions):
+        """Class probabilities of the explained rows (bias plus contributions)"""
+        return self.bias + contributions.sum(axis=1)
+
+
+class BoostingPathExplainer:
+    """Per-sample feature contributions of a histogram gradient boosting model.
+
+    The same path decomposition as ``TreePathExplainer``, on the raw
+    (log-odds) scores: every split's change in node value is credited to
+    its feature, so ``bias + contributions.sum(features)`` equals the raw
+    score of each class. Trees are walked level by level for all rows at
+    once, which costs one vectorized step per tree depth instead of a
+    prediction per occluded feature. Binary models have one score; the
+    negative class gets its negation.
+
+    The trees are read from the private ``_predictors`` and
+    ``_baseline_prediction`` of scikit-learn 1.x, which may change in any
+    release; if they are missing or laid out differently the constructor
+    raises ``TypeError`` and ``path_explainer`` falls back to occlusion.
+    """
+
+    def __init__(self, model):
+        if not isinstance(model, HistGradientBoostingClassifier):
+            raise TypeError("Boosting path attribution needs a HistGradientBoostingClassifier")
+        if not hasattr(model, '_predictors') or not hasattr(model, '_baseline_prediction'):
+            raise TypeError("This scikit-learn version does not expose the boosting trees")
+        self.n_features = model.n_features_in_
+        self.n_classes = len(model.classes_)
+        self.model = model
+        self.trees = []
+        for iteration in model._predictors:
+            for k, predictor in enumerate(iteration):
+                nodes = getattr(predictor, 'nodes', None)
+                if nodes is None or not NODE_FIELDS.issubset(nodes.dtype.names or ()):
+                    raise TypeError("Unsupported layout of the boosting trees")
+                if nodes['is_categorical'].any():
+                    raise TypeError("Boosting path attribution does not support categorical splits")
+                # Leaf values are stored shrunk by the learning rate, internal ones not
+                value = np.where(nodes['is_leaf'].astype(bool), nodes['value'],
+                                 nodes['value'] * model.learning_rate)
+                self.trees.append((k, nodes, value))
+        self.bias = np.asarray(model._baseline_prediction, dtype=np.float64).ravel().copy()
+        for k, _, value in self.trees:
+            self.bias[k] += value[0]
+
+    def explain(self, X):
+        """Raw-score contributions of shape (rows, features, classes) for scaled inputs ``X``"""
+        X = np.asarray(X, dtype=np.float64)
+        scores = np.zeros((len(X), self.n_features, len(self.bias)))
+        rows = np.arange(len(X))
+        for k, nodes, value in self.trees:
+            node = np.zeros(len(X), dtype=np.int64)
+            active = ~nodes['is_leaf'][node].astype(bool)
+            while active.any():
+                at, current = rows[active], node[active]
+                feature = nodes['feature_idx'][current]
+                x = X[at, feature]
+                left = np.where(np.isnan(x), nodes['missing_go_to_left'][current].astype(bool),
+                                x <= nodes['num_threshold'][current])
+                child = np.where(left, nodes['left'][current], nodes['right'][current]).astype(np.int64)
+                np.add.at(scores[:, :, k], (at, feature), value[child] - value[current])
+                node[active] = child
+                active[active] = ~nodes['is_leaf'][child].astype(bool)
+        if self.n_classes == 2 and scores.shape[2] == 1:
+            scores = np.concatenate([-scores, scores], axis=2)
+        return scores
+
+    def probabilities(self, X, contributions):
+        return self.model.predict_proba(X)
+
+
+def path_explainer(model):
+    """Path-decomposition explainer of a tree ensemble, or None for other models"""
+    try:
+        if isinstance(model, RandomForestClassifier):
+            return TreePathExplainer(model)
+        if isinstance(model, HistGradientBoostingClassifier):
+            return BoostingPathExplainer(model)
+    except TypeError:
+        pass
+    return None
+
+
+def occlusion_attributions(predict_proba, X, baseline, max_bytes=OCCLUSION_BUDGET_BYTES):
+    """Model-agnostic contributions: the drop in each class probability when a
+    feature is replaced by its ``baseline`` value. Returns (rows, features, classes).
+
+    Occluded copies are predicted in batches of rows (or of one row's
+    features) whose inputs fit in ``max_bytes``.
+    """
+    n_rows, n_features = X.shape
+    probabilities = predict_proba(X)
+    contributions = np.empty((n_rows, n_features, probabilities.shape[1]))
+    copies = max(max_bytes // (n_features * X.itemsize), 1)
+    row_step, feature_step = max(copies // n_features, 1), min(copies, n_features)
+    for start in range(0, n_rows, row_step):
+        rows = slice(start, start + row_step)
+        for first in range(0, n_features, feature_step):
+            columns = np.arange(first, min(first + feature_step, n_features))
+            chunk = X[rows]
+            occluded = np.repeat(chunk[:, np.newaxis, :], len(columns), axis=1)
+            occluded[:, np.arange(len(columns)), columns] = baseline[columns]
+            occluded_probabilities = predict_proba(occluded.reshape(-1, n_features))
+            contributions[rows, columns] = (probabilities[rows, np.newaxis, :]
+                                            - occluded_probabilities.reshape(len(chunk), len(columns), -1))
+    return contributions
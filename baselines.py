@@ -0,0 +1,113 @@
+import json
+import os
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+BASELINE_FILE = 'baseline.json'
+
+# Scale factors making the median / mean absolute deviation consistent with
+# the standard deviation of normally distributed data
+MAD_SCALE = 1.4826
+MEAN_AD_SCALE = 1.2533
+# Quantiles bounding the normal range of the ``quantile`` score
+QUANTILE_RANGE = (0.25, 0.75)
+
+# Scoring methods and their default anomaly thresholds: a robust z-score of
+# 3.5 (Iglewicz and Hoaglin) and Tukey's 1.5 interquartile ranges
+SCORING_THRESHOLDS = {'mad': 3.5, 'quantile': 1.5}
+
+
+class RobustBaseline:
+    """Per-sensor robust location and scale fitted once on known-normal rows.
+
+    ``mad`` scores are robust z-scores ``|x - median| / (1.4826 * MAD)``;
+    where the MAD is zero (mostly-constant sensors) the scaled mean absolute
+    deviation is used instead. ``quantile`` scores measure how far a value
+    lies outside the interquartile box, in interquartile ranges. Sensors
+    that are constant in the baseline and missing values score NaN, which
+    never counts as anomalous. Scoring a batch is one vectorized operation
+    against the stored statistics, so the scores of a row do not depend on
+    the rest of its batch.
+    """
+
+    def __init__(self, sensors, median, scale, lower, upper, rows=0, info=None):
+        self.sensors = list(sensors)
+        self.median = np.asarray(median, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self.upper = np.asarray(upper, dtype=np.float64)
+        self.rows = rows
+        self.info = info or {}
+
+    @classmethod
+    def fit(cls, values, sensors, **info):
+        """Fit on a (rows, sensors) float matrix of normal data; NaNs are ignored"""
+        values = np.asarray(values, dtype=np.float64)
+        with warnings.catch_warnings():
+            # All-NaN sensors get NaN statistics
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            median = np.nanmedian(values, axis=0)
+            deviation = np.abs(values - median)
+            mad = np.nanmedian(deviation, axis=0) * MAD_SCALE
+            mean_ad = np.nanmean(deviation, axis=0) * MEAN_AD_SCALE
+            lower, upper = np.nanquantile(values, QUANTILE_RANGE, axis=0)
+        scale = np.where(mad > 0, mad, mean_ad)
+        scale[~(scale > 0)] = np.nan
+        info.setdefault('fittedAt', datetime.now().isoformat())
+        return cls(sensors, median, scale, lower, upper, rows=len(values), info=info)
+
+    def score(self, values, method='mad'):
+        """Scores of raw rows whose columns are ordered like ``sensors``"""
+        if method not in SCORING_THRESHOLDS:
+            raise ValueError(f"Unknown scoring method '{method}', expected one of {sorted(SCORING_THRESHOLDS)}")
+        values = np.asarray(values, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if method == 'mad':
+                return np.abs(values - self.median) / self.scale
+            spread = self.upper - self.lower
+            spread = np.where(spread > 0, spread, self.scale)
+            outside = np.maximum(np.maximum(self.lower - values, values - self.upper), 0.0)
+            return outside / spread
+
+    @property
+    def constant_sensors(self):
+        return [name for name, scale in zip(self.sensors, self.scale) if np.isnan(scale)]
+
+    def to_dict(self):
+        def numbers(array):
+            return [float(v) if np.isfinite(v) else None for v in array]
+        return {
+            'sensors': self.sensors,
+            'median': numbers(self.median),
+            'scale': numbers(self.scale),
+            'lower': numbers(self.lower),
+            'upper': numbers(self.upper),
+            'rows': self.rows,
+            'info': self.info
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        def array(values):
+            return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        return cls(data['sensors'], array(data['median']), array(data['scale']), array(data['lower']),
+                   array(data['upper']), rows=data['rows'], info=data.get('info'))
+
+    def save(self, directory):
+        """Write the baseline next to a dataset (atomic replace)"""
+        path = os.path.join(directory, BASELINE_FILE)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, directory):
+        """Baseline stored in ``directory``, or None"""
+        path = os.path.join(directory, BASELINE_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,234 @@
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+from column_store import ColumnStore
+from dataset_registry import write_dataset
+from model_store import ModelStore
+from preprocessing import NA_VALUES, preprocess_data, scale_model_inputs
+from rolling_features import RollingFeatures
+from zscore import compute_z_scores, severity_bands
+
+logger = logging.getLogger(__name__)
+
+# Rows parsed at a time when ingesting a CSV from a zip archive
+INGEST_CHUNK_ROWS = 50000
+# Rows scored per model call
+PREDICT_BATCH_ROWS = 10000
+# Sensors (per truck and fleet-wide) and trucks listed in rankings
+TOP_SENSORS = 5
+TOP_TRUCKS = 10
+
+
+@lru_cache(maxsize=4)
+def _load_model(models_root, version):
+    """Model, scaler and metadata of a version, loaded once per worker process.
+
+    The model's arrays are memory-mapped, so all workers share their pages.
+    Each worker already has a core to itself, so the model predicts on a
+    single thread instead of one per core in every worker.
+    """
+    model, scaler, metadata = ModelStore(models_root).load(version)
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = 1
+    return model, scaler, metadata
+
+
+def ingest_zip_member(zip_path, member, path):
+    """Stream one CSV out of a zip archive into a column store at ``path``"""
+    with zipfile.ZipFile(zip_path) as archive, archive.open(member) as stream:
+        chunks = pd.read_csv(stream, chunksize=INGEST_CHUNK_ROWS, na_values=NA_VALUES)
+        return write_dataset(path, chunks, os.path.basename(member))
+
+
+def predict_summary(frame, features, models_root, version):
+    """Predicted class counts and mean confidence of a stored model over a dataset"""
+    model, scaler, metadata = _load_model(models_root, version)
+    names = metadata['featureNames']
+    rolling = RollingFeatures.from_config(metadata['rollingFeatures']) if metadata.get('rollingFeatures') else None
+    sensors = rolling.sensors if rolling is not None else names
+    missing = [name for name in sensors if name not in features.columns]
+    if missing:
+        raise ValueError(f"Dataset is missing sensors used by the model: {missing[:10]}")
+    handles_missing = isinstance(model, HistGradientBoostingClassifier)
+    if handles_missing:
+        features = preprocess_data(frame, impute=False)
+    if rolling is not None:
+        # Rolling-window features over the rows in file (time) order
+        values = rolling.transform(features[sensors].to_numpy(dtype=np.float64))
+    else:
+        values = features[names].to_numpy(dtype=np.float64)
+
+    probabilities = np.empty((len(values), len(model.classes_)))
+    for start in range(0, len(values), PREDICT_BATCH_ROWS):
+        batch = scale_model_inputs(scaler, values[start:start + PREDICT_BATCH_ROWS], fill_missing=not handles_missing)
+        probabilities[start:start + PREDICT_BATCH_ROWS] = model.predict_proba(batch)
+    classes, counts = np.unique(model.classes_[probabilities.argmax(axis=1)], return_counts=True)
+    return {
+        'modelVersion': version,
+        'classCounts': {str(c): int(n) for c, n in zip(classes, counts)},
+        'meanConfidence': round(float(probabilities.max(axis=1).mean()), 4) if len(values) else None
+    }
+
+
+def summarize_dataset(store, z_score_threshold=3.0, models_root=None, version=None):
+    """Anomaly and (optionally) prediction summary of one dataset.
+
+    Z-scores are taken against the dataset's own mean and std after median
+    imputation, and rows are critical above the same threshold-scaled band,
+    as in ``/api/detect-anomalies``.
+    """
+    frame = store.to_frame()
+    df = preprocess_data(frame)
+    features = df.drop('class', axis=1) if 'class' in df.columns else df
+    values = features.to_numpy(dtype=np.float64)
+    z_scores = compute_z_scores(values)
+    _, critical = severity_bands(z_score_threshold)
+    flagged = z_scores > z_score_threshold
+    anomalous = flagged.any(axis=1)
+    max_z_scores = np.fmax.reduce(z_scores, axis=1)
+    sensor_anomalies = flagged.sum(axis=0)
+    top = np.argsort(-sensor_anomalies, kind='stable')[:TOP_SENSORS]
+
+    summary = {
+        'rows': len(values),
+        'sensors': values.shape[1],
+        'missingValues': store.meta['summary']['missing_values'],
+        'anomalies': int(anomalous.sum()),
+        'anomalyRate': round(float(anomalous.mean()) * 100, 2) if len(values) else 0.0,
+        'criticalAnomalies': int((max_z_scores > critical).sum()),
+        'sensorAnomalies': {str(name): int(n) for name, n in zip(features.columns, sensor_anomalies) if n},
+        'topSensors': [
+            {'name': str(features.columns[j]), 'anomalies': int(sensor_anomalies[j])}
+            for j in top if sensor_anomalies[j]
+        ]
+    }
+    if 'class' in df.columns:
+        summary['labelCounts'] = {str(k): int(v) for k, v in df['class'].value_counts().items()}
+    if version:
+        try:
+            summary['predictions'] = predict_summary(frame, features, models_root, version)
+        except ValueError as e:
+            summary['predictionError'] = str(e)
+    return summary
+
+
+def analyze_truck(task):
+    """Worker entry point: ingest (for zip members) and summarize one truck's dataset.
+
+    ``task`` is a small dict of paths and options; the data itself is read
+    from the memory-mapped column store, so nothing large is pickled.
+    """
+    start = time.perf_counter()
+    summary = {'truck': task['truck'], 'datasetId': task['datasetId']}
+    try:
+        if task.get('member'):
+            ingest_zip_member(task['zipPath'], task['member'], task['path'])
+        summary.update(summarize_dataset(ColumnStore(task['path']), task['zScoreThreshold'],
+                                         task.get('modelsRoot'), task.get('version')))
+    except Exception as e:
+        logger.error(f"Batch analysis of {task['truck']} failed: {str(e)}")
+        summary['error'] = str(e)
+    summary['elapsedMs'] = round((time.perf_counter() - start) * 1000, 3)
+    return summary
+
+
+def fleet_rollup(summaries):
+    """Fleet-wide totals and rankings over per-truck summaries"""
+    analyzed = [s for s in summaries if 'error' not in s]
+    rows = sum(s['rows'] for s in analyzed)
+    anomalies = sum(s['anomalies'] for s in analyzed)
+    sensor_anomalies = Counter()
+    class_counts = Counter()
+    for s in analyzed:
+        sensor_anomalies.update(s['sensorAnomalies'])
+        class_counts.update(s.get('predictions', {}).get('classCounts', {}))
+    worst = sorted(analyzed, key=lambda s: -s['anomalyRate'])[:TOP_TRUCKS]
+    return {
+        'trucks': len(summaries),
+        'analyzed': len(analyzed),
+        'failed': len(summaries) - len(analyzed),
+        'rows': rows,
+        'anomalies': anomalies,
+        'anomalyRate': round(anomalies / rows * 100, 2) if rows else 0.0,
+        'criticalAnomalies': sum(s['criticalAnomalies'] for s in analyzed),
+        'predictedClassCounts': dict(class_counts),
+        'topSensors': [{'name': name, 'anomalies': n} for name, n in sensor_anomalies.most_common(TOP_SENSORS)],
+        'worstTrucks': [
+            {'truck': s['truck'], 'datasetId': s['datasetId'], 'anomalyRate': s['anomalyRate'],
+             'anomalies': s['anomalies']}
+            for s in worst
+        ]
+    }
+
+
+class BatchAnalyzer:
+    """Process pool that fans per-truck analyses out across CPU cores.
+
+    The pool is started on first use and kept for later batches (workers
+    cache loaded models). Tasks carry only paths and options: datasets are
+    memory-mapped column stores and models are memory-mapped joblib files,
+    so workers share their pages instead of receiving pickled copies.
+    Workers are started with ``forkserver`` (``spawn`` where unavailable):
+    forking the threaded web server could copy locks held by other threads.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context(method))
+            return self._executor
+
+    def run(self, tasks, progress=None):
+        """Analyze all ``tasks``; returns per-truck summaries in task order and the fleet rollup.
+
+        ``progress(percent, message)`` is called as trucks complete; if it
+        raises (e.g. on cancellation) the remaining tasks are dropped.
+        """
+        start = time.perf_counter()
+        executor = self._pool()
+        futures = {executor.submit(analyze_truck, task): i for i, task in enumerate(tasks)}
+        summaries = [None] * len(tasks)
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                summaries[futures[future]] = future.result()
+                if progress:
+                    progress(100 * done / len(tasks), f'Analyzed {done} of {len(tasks)} trucks')
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            raise
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return {
+            'trucks': summaries,
+            'fleet': fleet_rollup(summaries),
+            'workers': self.max_workers,
+            'elapsedMs': round((time.perf_counter() - start) * 1000, 3)
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark the classifier engines on generated sensor data
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+
+from app import SensorFaultDetector, CLASSIFIER_ENGINES, NAN_NATIVE_ENGINES
+from generate_sample_data import generate_sample_sensor_data
+from preprocessing import preprocess_data
+
+def benchmark_engine(engine, df_raw, latency_samples=100, measure_memory=False):
+    """Preprocess, train and score one engine; returns a dict of measurements.
+
+    Peak memory is traced in a second training run, since tracing slows
+    training down considerably.
+    """
+    impute = engine not in NAN_NATIVE_ENGINES
+
+    start = time.perf_counter()
+    df = preprocess_data(df_raw, impute=impute)
+    preprocess_s = time.perf_counter() - start
+
+    X = df.drop('class', axis=1)
+    y = df['class']
+    detector = SensorFaultDetector()
+
+    start = time.perf_counter()
+    results = detector.train_classifier(X, y, engine)
+    train_s = time.perf_counter() - start
+    detector.feature_names = X.columns.tolist()
+
+    peak_bytes = None
+    if measure_memory:
+        tracemalloc.start()
+        SensorFaultDetector().train_classifier(X, y, engine)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    # Batch throughput over the whole dataset, then single-row latency
+    values = X.to_numpy(dtype=np.float64)
+    start = time.perf_counter()
+    detector.predict_batch(values)
+    batch_s = time.perf_counter() - start
+
+    single_ms = []
+    for row in values[:latency_samples]:
+        start = time.perf_counter()
+        detector.predict_batch(row[np.newaxis, :])
+        single_ms.append((time.perf_counter() - start) * 1000)
+
+    buffer = io.BytesIO()
+    joblib.dump(detector.model, buffer)
+
+    return {
+        'engine': engine,
+        'preprocess_s': preprocess_s,
+        'train_s': train_s,
+        'train_peak_mb': peak_bytes / 1e6 if peak_bytes is not None else float('nan'),
+        'rows_per_s': len(values) / batch_s,
+        'single_row_ms': float(np.median(single_ms)),
+        'model_mb': buffer.tell() / 1e6,
+        'f1': results['f1Score']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare classifier engines on generated sensor data')
+    parser.add_argument('--rows', type=int, default=200000, help='number of generated samples')
+    parser.add_argument('--missing-rate', type=float, default=0.05,
+                        help='fraction of sensor values blanked out at random')
+    parser.add_argument('--engines', nargs='+', default=sorted(CLASSIFIER_ENGINES),
+                        choices=sorted(CLASSIFIER_ENGINES))
+    parser.add_argument('--memory', action='store_true', help='also trace peak memory while training')
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows} samples ({args.missing_rate:.0%} missing values)...")
+    df_raw = generate_sample_sensor_data(args.rows)
+    sensors = [col for col in df_raw.columns if col != 'class']
+    rng = np.random.default_rng(0)
+    values = df_raw[sensors].to_numpy(dtype=np.float64)
+    values[rng.random(values.shape) < args.missing_rate] = np.nan
+    df_raw[sensors] = values
+
+    rows = []
+    for engine in args.engines:
+        print(f"Benchmarking {engine}...")
+        rows.append(benchmark_engine(engine, df_raw, measure_memory=args.memory))
+
+    print()
+    print(f"{'engine':<24}{'prep s':>9}{'train s':>9}{'peak MB':>9}{'rows/s':>12}"
+          f"{'1-row ms':>10}{'model MB':>10}{'F1':>8}")
+    for r in rows:
+        print(f"{r['engine']:<24}{r['preprocess_s']:>9.2f}{r['train_s']:>9.2f}{r['train_peak_mb']:>9.1f}"
+              f"{r['rows_per_s']:>12,.0f}{r['single_row_ms']:>10.2f}{r['model_mb']:>10.2f}{r['f1']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
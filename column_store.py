@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import NA_VALUES, to_float_matrix
+from pyramid import (BASE_LEVEL, PYRAMID_DTYPE, Z_SCORE_THRESHOLD, CountPyramid, SensorPyramid, build_count_pyramid,
+                     build_pyramid)
+from running_stats import RunningStats
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+LABELS_FILE = 'labels.i32'
+ANOMALY_ROWS_FILE = 'anomaly_rows.u8'
+ANOMALY_COUNTS_FILE = 'anomaly_rows.cnt'
+
+
+def _column_file(index):
+    return f'col_{index:05d}.f64'
+
+
+def _pyramid_file(index):
+    return f'pyr_{index:05d}.bin'
+
+
+def _map_column(path, index, rows):
+    return np.memmap(os.path.join(path, _column_file(index)), dtype=np.float64, mode='r', shape=(rows,))
+
+
+class ColumnStoreWriter:
+    """Write a dataset as one raw float64 file per sensor column plus label codes.
+
+    Sensor values are coerced to float (unparseable values become NaN) and the
+    ``class`` column is stored as int32 codes into a list of class names, with
+    -1 marking a missing label. Data can be appended in chunks: the first chunk
+    fixes the schema, later chunks are validated against it, and running
+    per-sensor statistics (see ``running_stats``), the upload summary and a
+    content hash are updated as each chunk is written, so memory does not
+    grow with the file. On ``close`` the statistics are stored in the
+    metadata file, and a rollup pyramid of every column is written next to it (see ``pyramid``),
+    together with the flags and rollup of rows with any anomalous sensor.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.columns = None
+        self.feature_names = None
+        self.has_class = False
+        self.rows = 0
+        self.classes = []
+        self.stats = None
+        self._class_codes = {}
+        self._files = {}
+        self._text_columns = set()
+        self._memory_usage = 0
+        self._missing_labels = 0
+        self._digest = hashlib.blake2b(digest_size=16)
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def content_hash(self):
+        """Hash of everything written so far"""
+        return self._digest.hexdigest()
+
+    def append(self, df):
+        """Append a chunk of rows; the first chunk defines the schema"""
+        if self.columns is None:
+            self.columns = df.columns.tolist()
+            self.feature_names = [col for col in self.columns if col != 'class']
+            self.has_class = 'class' in self.columns
+            if not self.feature_names:
+                raise ValueError("No sensor columns found")
+            self.stats = RunningStats(len(self.feature_names))
+            for i, _ in enumerate(self.feature_names):
+                self._files[i] = open(os.path.join(self.path, _column_file(i)), 'wb')
+            if self.has_class:
+                self._files['class'] = open(os.path.join(self.path, LABELS_FILE), 'wb')
+        elif df.columns.tolist() != self.columns:
+            raise ValueError(f"Columns of rows {self.rows}+ do not match the header of the file")
+
+        if df.empty:
+            return
+
+        self._memory_usage += int(df.memory_usage(deep=True).sum())
+        self._text_columns.update(col for col in self.columns if df[col].dtype == object)
+
+        values = to_float_matrix(df, self.feature_names)
+        self.stats.update(values)
+        for i, _ in enumerate(self.feature_names):
+            data = values[:, i].tobytes()
+            self._files[i].write(data)
+            self._digest.update(data)
+
+        if self.has_class:
+            codes = self._encode_labels(df['class'])
+            self._missing_labels += int((codes < 0).sum())
+            data = codes.tobytes()
+            self._files['class'].write(data)
+            self._digest.update(data)
+
+        self.rows += len(df)
+
+    def _encode_labels(self, labels):
+        labels = labels.astype(object)
+        missing = labels.isna() | labels.isin(NA_VALUES)
+        codes = np.full(len(labels), -1, dtype=np.int32)
+        uniques = pd.unique(labels[~missing])
+        for label in uniques:
+            key = str(label)
+            if key not in self._class_codes:
+                self._class_codes[key] = len(self.classes)
+                self.classes.append(key)
+        if len(uniques):
+            mapping = {label: self._class_codes[str(label)] for label in uniques}
+            codes[~missing.to_numpy()] = labels[~missing].map(mapping).to_numpy(dtype=np.int32)
+        return codes
+
+    def abort(self):
+        """Close the column files without writing metadata"""
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def close(self, extra_meta=None):
+        """Flush column files and write the metadata file"""
+        self.abort()
+        columns = self.columns or []
+        feature_names = self.feature_names or []
+        sensor_stats = {}
+        if self.rows:
+            self.stats.count_histograms([_map_column(self.path, i, self.rows) for i in range(len(feature_names))])
+            sensor_stats = self.stats.to_dict(feature_names)
+            anomalous_rows = np.zeros(self.rows, dtype=bool)
+            for i, name in enumerate(feature_names):
+                pyramid = build_pyramid(_map_column(self.path, i, self.rows), sensor_stats[name]['mean'],
+                                        sensor_stats[name]['std'], anomalous_rows=anomalous_rows)
+                pyramid.tofile(os.path.join(self.path, _pyramid_file(i)))
+            anomalous_rows.view(np.uint8).tofile(os.path.join(self.path, ANOMALY_ROWS_FILE))
+            build_count_pyramid(anomalous_rows).tofile(os.path.join(self.path, ANOMALY_COUNTS_FILE))
+        missing_sensor_values = sum(stats['missing'] for stats in sensor_stats.values())
+        meta = {
+            'rows': self.rows,
+            'columns': columns,
+            'featureNames': feature_names,
+            'hasClass': self.has_class,
+            'classes': self.classes,
+            'summary': {
+                'memory_usage': self._memory_usage,
+                'missing_values': missing_sensor_values + self._missing_labels,
+                'numeric_columns': len(columns) - len(self._text_columns),
+                'categorical_columns': len(self._text_columns)
+            },
+            'sensorStats': sensor_stats,
+            'pyramid': {
+                'baseLevel': BASE_LEVEL,
+                'fields': list(PYRAMID_DTYPE.names),
+                'zScoreThreshold': Z_SCORE_THRESHOLD
+            }
+        }
+        if extra_meta:
+            meta.update(extra_meta)
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+        return meta
+
+
+class ColumnStore:
+    """Read access to a dataset written by ``ColumnStoreWriter``.
+
+    Columns are memory-mapped read-only, so selecting a subset of sensors only
+    touches those files and returns zero-copy arrays.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.rows = self.meta['rows']
+        self.columns = self.meta['columns']
+        self.feature_names = self.meta['featureNames']
+        self.has_class = self.meta['hasClass']
+        self.classes = self.meta['classes']
+        self._index = {name: i for i, name in enumerate(self.feature_names)}
+
+    def column(self, name):
+        """Read-only memory-mapped values of one sensor column"""
+        if name not in self._index:
+            raise KeyError(f"Unknown column: {name}")
+        if self.rows == 0:
+            return np.empty(0, dtype=np.float64)
+        return _map_column(self.path, self._index[name], self.rows)
+
+    def _pyramid_info(self):
+        """Pyramid settings, or None when the dataset was stored without a current pyramid"""
+        info = self.meta.get('pyramid') or {}
+        if not self.rows or info.get('fields') != list(PYRAMID_DTYPE.names):
+            return None
+        return info
+
+    def pyramid(self, name):
+        """Rollup pyramid of one sensor column for downsampled reads and window statistics.
+
+        Datasets stored without a (current) pyramid fall back to raw scans.
+        """
+        values = self.column(name)
+        stats = self.meta.get('sensorStats', {}).get(name, {})
+        info = self._pyramid_info()
+        if info is None:
+            return SensorPyramid(values, mean=stats.get('mean'), std=stats.get('std'))
+        records = np.memmap(os.path.join(self.path, _pyramid_file(self._index[name])), dtype=PYRAMID_DTYPE,
+                            mode='r')
+        return SensorPyramid(values, records, base_level=info['baseLevel'], mean=stats.get('mean'),
+                             std=stats.get('std'), threshold=info['zScoreThreshold'])
+
+    def anomaly_rows(self):
+        """Rollup of rows with any anomalous sensor, or None for datasets stored without one"""
+        info = self._pyramid_info()
+        if info is None:
+            return None
+        flags = np.memmap(os.path.join(self.path, ANOMALY_ROWS_FILE), dtype=np.uint8, mode='r', shape=(self.rows,))
+        counts = np.memmap(os.path.join(self.path, ANOMALY_COUNTS_FILE), dtype=np.int64, mode='r')
+        return CountPyramid(flags, counts, base_level=info['baseLevel'])
+
+    def label_codes(self):
+        """Class codes (-1 for missing) or None when the dataset has no labels"""
+        if not self.has_class:
+            return None
+        if self.rows == 0:
+            return np.empty(0, dtype=np.int32)
+        return np.memmap(os.path.join(self.path, LABELS_FILE), dtype=np.int32, mode='r', shape=(self.rows,))
+
+    def labels(self):
+        """Class labels as an object array with NaN for missing labels"""
+        codes = self.label_codes()
+        if codes is None:
+            return None
+        lookup = np.array(self.classes + [np.nan], dtype=object)
+        return lookup[codes]
+
+    def to_frame(self, columns=None):
+        """Build a DataFrame over the requested columns in their original order"""
+        wanted = self.columns if columns is None else [col for col in self.columns if col in columns]
+        data = {}
+        for col in wanted:
+            data[col] = self.labels() if col == 'class' else self.column(col)
+        return pd.DataFrame(data, columns=wanted, copy=False)
@@ -0,0 +1,56 @@
+import numpy as np
+
+# Rows per block when accumulating the centered cross-products
+CHUNK_ROWS = 100000
+
+
+def correlation_summary(values, labels=None, chunk_rows=CHUNK_ROWS):
+    """Sensor correlations from one pass over a (rows, sensors) float matrix.
+
+    Columns are centered on their means and the cross-product matrix is
+    accumulated block by block with BLAS, together with the per-class sums
+    of the centered values (a one-hot matrix product). From these follow:
+
+    - ``matrix``: the sensor x sensor Pearson correlation matrix
+    - ``classCorrelation``: Pearson correlation of every sensor with the
+      one-hot indicator of every class, shape (classes, sensors)
+    - ``correlationRatio``: eta, the share of each sensor's standard
+      deviation explained by the class (0..1, works for string labels)
+
+    NaNs must be imputed beforehand; constant sensors get NaN correlations.
+    """
+    values = np.asarray(values)
+    n_rows, n_sensors = values.shape
+    mean = values.mean(axis=0, dtype=np.float64)
+
+    classes = codes = None
+    if labels is not None:
+        classes, codes = np.unique(np.asarray(labels), return_inverse=True)
+        class_sums = np.zeros((len(classes), n_sensors))
+
+    cross = np.zeros((n_sensors, n_sensors))
+    for start in range(0, n_rows, chunk_rows):
+        centered = values[start:start + chunk_rows] - mean
+        cross += centered.T @ centered
+        if classes is not None:
+            one_hot = np.zeros((len(centered), len(classes)))
+            one_hot[np.arange(len(centered)), codes[start:start + chunk_rows]] = 1.0
+            class_sums += one_hot.T @ centered
+
+    total_ss = np.diag(cross).copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.sqrt(total_ss)
+        matrix = cross / np.outer(scale, scale)
+        summary = {'matrix': np.clip(matrix, -1.0, 1.0)}
+
+        if classes is not None:
+            class_counts = np.bincount(codes, minlength=len(classes)).astype(np.float64)
+            share = class_counts / n_rows
+            # cov(x, 1[class]) = sum over the class of centered x / n
+            label_std = np.sqrt(share * (1 - share))
+            sensor_std = scale / np.sqrt(n_rows)
+            summary['classes'] = classes
+            summary['classCorrelation'] = (class_sums / n_rows) / np.outer(label_std, sensor_std)
+            between_ss = (class_sums ** 2 / class_counts[:, np.newaxis]).sum(axis=0)
+            summary['correlationRatio'] = np.sqrt(np.clip(between_ss / total_ss, 0.0, 1.0))
+    return summary
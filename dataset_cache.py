@@ -0,0 +1,96 @@
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def frame_nbytes(df):
+    """Approximate in-memory size of a DataFrame (or a dict of arrays) in bytes"""
+    if isinstance(df, dict):
+        return sum(value.nbytes for value in df.values() if isinstance(value, np.ndarray))
+    try:
+        return int(df.memory_usage(deep=True).sum())
+    except Exception:
+        return 0
+
+
+class DatasetCache:
+    """LRU cache of parsed and preprocessed frames bounded by a memory budget.
+
+    Entries are keyed by ``(dataset_id, content_hash, kind)`` so a re-uploaded
+    or modified file never serves stale frames. Cached frames are shared
+    between requests and must be treated as read-only by callers.
+    """
+
+    def __init__(self, max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value for ``key`` or None"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value, nbytes=None):
+        """Insert a value and evict least recently used entries over budget"""
+        if nbytes is None:
+            nbytes = frame_nbytes(value)
+        if nbytes > self.max_bytes:
+            logger.info(f"Not caching {key}: {nbytes} bytes exceeds the cache budget")
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = value
+            self._sizes[key] = nbytes
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for ``key``, calling ``loader`` on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, dataset_id):
+        """Drop every entry that belongs to ``dataset_id``"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == dataset_id]:
+                self._remove(key)
+
+    def stats(self):
+        """Hit/miss counters and current memory usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRate': round(self.hits / lookups * 100, 2) if lookups else 0.0
+            }
+
+    def _remove(self, key):
+        self._entries.pop(key)
+        self._total_bytes -= self._sizes.pop(key)
@@ -0,0 +1,320 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from column_store import META_FILE, ColumnStore, ColumnStoreWriter
+from file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+DATASET_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+# Touched in a dataset's directory on access; its mtime is the access time all processes see
+ACCESS_FILE = 'last_access'
+# Lock file in the storage directory serialising access marks with deletions
+LOCK_FILE = '.lock'
+
+
+def write_dataset(path, chunks, filename, extra_meta=None):
+    """Write DataFrame chunks as a column store at ``path`` and return its metadata.
+
+    The directory is removed again if writing fails. Any process may call
+    this; ``DatasetRegistry.get`` picks the dataset up from its metadata file.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    writer = ColumnStoreWriter(path)
+    try:
+        for chunk in chunks:
+            writer.append(chunk)
+        if writer.rows == 0:
+            raise ValueError("File is empty")
+        return writer.close(extra_meta=dict(extra_meta or {}, filename=filename,
+                                            contentHash=writer.content_hash))
+    except Exception:
+        writer.abort()
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+
+
+class DatasetRecord:
+    """Metadata for a single uploaded dataset"""
+
+    def __init__(self, dataset_id, filename, path, rows, columns, feature_names, content_hash=None,
+                 meta=None):
+        self.dataset_id = dataset_id
+        self.filename = filename
+        self.path = path
+        self.rows = rows
+        self.columns = columns
+        self.feature_names = feature_names
+        self.content_hash = content_hash
+        self.meta = meta or {}
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        # Last time this process marked the dataset as accessed on disk
+        self.shared_access = 0.0
+        self._store = None
+
+    @property
+    def store(self):
+        """Column store holding the dataset's values"""
+        if self._store is None:
+            self._store = ColumnStore(self.path)
+        return self._store
+
+    def to_dict(self):
+        """Public metadata returned by the API"""
+        return {
+            'datasetId': self.dataset_id,
+            'filename': self.filename,
+            'rows': self.rows,
+            'columns': len(self.columns),
+            'features': len(self.feature_names),
+            'contentHash': self.content_hash,
+            'upload_time': datetime.fromtimestamp(self.created_at).isoformat()
+        }
+
+
+class DatasetRegistry:
+    """Index of uploaded datasets keyed by dataset ID, shared through ``storage_dir``.
+
+    Lookups are a dict access plus one ``stat``. Every worker process
+    sharing ``storage_dir`` sees the same datasets: one written or deleted by
+    another process is picked up (or dropped) on access, and accesses are
+    marked on disk (at most every ``access_interval`` seconds per process),
+    so a sweep only removes datasets that no process has touched for
+    ``ttl_seconds``. The sweep (at startup and in every cleanup pass) also
+    covers directories no process has indexed, such as datasets left by an
+    earlier run, uploads that never finished and half-deleted trash. Datasets beyond the ``max_datasets`` most recently used
+    are removed too, unless another process used them since. Marks and
+    deletions are serialised by a file lock; ``on_evict`` is called with
+    the dataset ID of every dataset removed or found removed.
+    """
+
+    def __init__(self, storage_dir=None, ttl_seconds=6 * 3600, max_datasets=200,
+                 cleanup_interval=60, on_evict=None):
+        self.storage_dir = storage_dir or os.path.join(tempfile.gettempdir(), 'sensor_fault_datasets')
+        self.ttl_seconds = ttl_seconds
+        self.max_datasets = max_datasets
+        self.cleanup_interval = cleanup_interval
+        self.access_interval = min(60.0, ttl_seconds / 10)
+        self.on_evict = on_evict
+        self._datasets = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_cleanup = 0.0
+        os.makedirs(self.storage_dir, exist_ok=True)
+        self._lock_path = os.path.join(self.storage_dir, LOCK_FILE)
+        self.cleanup(force=True)
+
+    def new_path(self, dataset_id):
+        """Storage directory for a dataset"""
+        return os.path.join(self.storage_dir, dataset_id)
+
+    def register(self, chunks, filename, extra_meta=None):
+        """Write DataFrame chunks to the column store and index them under a fresh dataset ID.
+
+        ``chunks`` may be a single DataFrame or any iterable of DataFrames
+        (e.g. ``pd.read_csv(..., chunksize=n)``); only one chunk is held in
+        memory at a time.
+        """
+        dataset_id = uuid.uuid4().hex
+        path = self.new_path(dataset_id)
+        meta = write_dataset(path, chunks, filename, extra_meta)
+
+        record = DatasetRecord(
+            dataset_id=dataset_id,
+            filename=filename,
+            path=path,
+            rows=meta['rows'],
+            columns=meta['columns'],
+            feature_names=meta['featureNames'],
+            content_hash=meta['contentHash'],
+            meta=meta
+        )
+        self._mark_access(record)
+        with self._lock:
+            self._datasets[dataset_id] = record
+            over_capacity = len(self._datasets) > self.max_datasets
+        self.cleanup(force=over_capacity)
+        logger.info(f"Registered dataset {dataset_id} ({filename}, {record.rows} rows)")
+        return record
+
+    def get(self, dataset_id):
+        """Return the record for ``dataset_id`` or None if it is unknown or expired"""
+        if not dataset_id:
+            return None
+        self.cleanup()
+        with self._lock:
+            record = self._datasets.get(dataset_id)
+        if record is None:
+            record = self._load(dataset_id)
+            if record is None:
+                return None
+        elif not os.path.exists(os.path.join(record.path, META_FILE)):
+            # Deleted by another worker process
+            self._forget(dataset_id)
+            return None
+        now = time.time()
+        if now - record.shared_access > self.access_interval and not self._mark_access(record):
+            self._forget(dataset_id)
+            return None
+        with self._lock:
+            record = self._datasets.setdefault(dataset_id, record)
+            record.last_access = now
+            self._datasets.move_to_end(dataset_id)
+            return record
+
+    def _load(self, dataset_id):
+        """Record for a dataset present on disk but not in this process' index"""
+        if not DATASET_ID_PATTERN.match(dataset_id):
+            return None
+        path = self.new_path(dataset_id)
+        try:
+            with open(os.path.join(path, META_FILE)) as f:
+                meta = json.load(f)
+            created_at = os.path.getmtime(os.path.join(path, META_FILE))
+        except (OSError, ValueError):
+            return None
+        record = DatasetRecord(
+            dataset_id=dataset_id,
+            filename=meta.get('filename'),
+            path=path,
+            rows=meta['rows'],
+            columns=meta['columns'],
+            feature_names=meta['featureNames'],
+            content_hash=meta.get('contentHash'),
+            meta=meta
+        )
+        record.created_at = created_at
+        record.last_access = self._shared_access(path) or created_at
+        return record
+
+    def _shared_access(self, path):
+        """Last access of a dataset by any process (its upload time if never marked), or None if it is gone"""
+        for name in (ACCESS_FILE, META_FILE):
+            try:
+                return os.path.getmtime(os.path.join(path, name))
+            except OSError:
+                continue
+        return None
+
+    def _mark_access(self, record):
+        """Mark a dataset as accessed for every process; False if it has been deleted"""
+        with file_lock(self._lock_path):
+            if not os.path.exists(os.path.join(record.path, META_FILE)):
+                return False
+            access_path = os.path.join(record.path, ACCESS_FILE)
+            with open(access_path, 'a'):
+                pass
+            os.utime(access_path)
+        record.shared_access = time.time()
+        return True
+
+    def _forget(self, dataset_id):
+        """Drop a dataset deleted elsewhere from this process' index"""
+        with self._lock:
+            self._datasets.pop(dataset_id, None)
+        if self.on_evict is not None:
+            self.on_evict(dataset_id)
+
+    def remove(self, dataset_id):
+        """Delete a dataset's files, whichever process registered it"""
+        if not dataset_id or not DATASET_ID_PATTERN.match(dataset_id):
+            return False
+        with file_lock(self._lock_path):
+            trash = self._unlink(self.new_path(dataset_id))
+        self._forget(dataset_id)
+        if trash is not None:
+            shutil.rmtree(trash, ignore_errors=True)
+        return trash is not None
+
+    def list(self):
+        """Records of every dataset in the storage directory, from least to most recently used"""
+        records = []
+        for name in os.listdir(self.storage_dir):
+            if not DATASET_ID_PATTERN.match(name):
+                continue
+            with self._lock:
+                record = self._datasets.get(name)
+            record = record or self._load(name)
+            if record is not None:
+                records.append((max(record.last_access, self._shared_access(record.path) or 0.0), record))
+        return [record for _, record in sorted(records, key=lambda item: item[0])]
+
+    def cleanup(self, force=False):
+        """Evict expired and least recently used datasets"""
+        now = time.time()
+        if not force and now - self._last_cleanup < self.cleanup_interval:
+            return
+        candidates = []
+        with self._lock:
+            self._last_cleanup = now
+            for dataset_id, record in list(self._datasets.items()):
+                if now - record.last_access > self.ttl_seconds:
+                    candidates.append(self._datasets.pop(dataset_id))
+            while len(self._datasets) > self.max_datasets:
+                _, record = self._datasets.popitem(last=False)
+                candidates.append(record)
+        for record in candidates:
+            with file_lock(self._lock_path):
+                shared = self._shared_access(record.path)
+                # Kept when another process used it since (the mark is at most access_interval old)
+                in_use = shared is not None and shared > max(record.last_access, record.shared_access) + 1.0
+                expired = shared is not None and now - shared > self.ttl_seconds
+                trash = self._unlink(record.path) if shared is not None and (expired or not in_use) else None
+            if trash is None and shared is not None:
+                continue
+            logger.info(f"Evicting dataset {record.dataset_id}")
+            if self.on_evict is not None:
+                self.on_evict(record.dataset_id)
+            if trash is not None:
+                shutil.rmtree(trash, ignore_errors=True)
+        self._sweep(now)
+
+    def _sweep(self, now):
+        """Delete expired dataset directories this process has not indexed, and leftover trash"""
+        for name in os.listdir(self.storage_dir):
+            path = os.path.join(self.storage_dir, name)
+            if name.startswith('.deleted-'):
+                # Left behind by a process that died while deleting
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            if not DATASET_ID_PATTERN.match(name):
+                continue
+            with self._lock:
+                if name in self._datasets:
+                    continue
+            with file_lock(self._lock_path):
+                # Without a metadata file the upload never finished; its directory's mtime is the last write
+                try:
+                    last_used = self._shared_access(path) or os.path.getmtime(path)
+                except OSError:
+                    continue
+                trash = self._unlink(path) if now - last_used > self.ttl_seconds else None
+            if trash is not None:
+                logger.info(f"Evicting dataset {name} (unused since {datetime.fromtimestamp(last_used).isoformat()})")
+                if self.on_evict is not None:
+                    self.on_evict(name)
+                shutil.rmtree(trash, ignore_errors=True)
+
+    def _unlink(self, path):
+        """Move a dataset directory out of the way (call under the file lock); returns it, or None if absent"""
+        if not os.path.isdir(path):
+            return None
+        trash = os.path.join(self.storage_dir, f'.deleted-{uuid.uuid4().hex}')
+        try:
+            os.rename(path, trash)
+        except OSError as e:
+            logger.warning(f"Could not delete files for dataset {os.path.basename(path)}: {str(e)}")
+            return None
+        return trash
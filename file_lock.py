@@ -0,0 +1,50 @@
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Seconds between attempts to take a lock held by another process (Windows only)
+LOCK_RETRY_SECONDS = 0.05
+
+
+@contextmanager
+def file_lock(path, blocking=True):
+    """Exclusive lock on ``path`` held across threads and processes.
+
+    The lock file is created if needed and left in place. Every call opens
+    its own handle, so two threads of one process exclude each other as
+    well; the lock is released when the handle is closed, also when the
+    holder dies. Without ``blocking``, raises ``BlockingIOError`` if the
+    lock is held.
+    """
+    f = open(path, 'a+')
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if not blocking:
+                        raise BlockingIOError(f"{path} is locked")
+                    time.sleep(LOCK_RETRY_SECONDS)
+        yield
+    finally:
+        f.close()
+
+
+def file_stamp(path):
+    """``(mtime_ns, size)`` of ``path``, or None if it does not exist; changes whenever the file is rewritten"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
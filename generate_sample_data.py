@@ -1,7 +1,103 @@
+import argparse
+import json
+import os
+import time
+
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+# Normal operation ranges for each sensor
+NORMAL_RANGES = {
+    'aa_000': (2.0, 2.5),    # Air Pressure Sensor A (bar)
+    'ab_001': (2.1, 2.6),    # Air Pressure Sensor B (bar)
+    'ac_002': (1.8, 2.3),    # Air Compressor Sensor (bar)
+    'ad_003': (2.2, 2.7),    # Air Tank Sensor (bar)
+    'ae_004': (1.9, 2.4),    # Air Filter Sensor (bar)
+    'af_005': (2.0, 2.5),    # Air Valve Sensor (bar)
+    'ag_005': (15.0, 25.0),  # Air Flow Sensor G (L/min)
+    'ag_006': (1.9, 2.4),    # Air Regulator Sensor (bar)
+    'ah_007': (20.0, 30.0),  # Air Heater Sensor (°C)
+    'ai_008': (18.0, 28.0),  # Air Intake Sensor (°C)
+    'aj_009': (2.1, 2.6),    # Air Junction Sensor (bar)
+    'ak_010': (1.8, 2.3),    # Air Kit Sensor (bar)
+    'al_011': (2.0, 2.5),    # Air Line Sensor (bar)
+    'am_012': (2.2, 2.7),    # Air Manifold Sensor (bar)
+    'an_013': (1.9, 2.4),    # Air Nozzle Sensor (bar)
+    'ao_014': (2.0, 2.5)     # Air Outlet Sensor (bar)
+}
+
+# Fault patterns
+FAULT_PATTERNS = {
+    'Fault Class 1': {  # High pressure fault
+        'aa_000': (3.0, 4.0),
+        'ab_001': (3.1, 4.1),
+        'ac_002': (2.8, 3.8),
+        'ad_003': (3.2, 4.2),
+        'ae_004': (2.9, 3.9),
+        'af_005': (3.0, 4.0),
+        'ag_005': (30.0, 40.0),
+        'ag_006': (2.9, 3.9),
+        'ah_007': (35.0, 45.0),
+        'ai_008': (33.0, 43.0),
+        'aj_009': (3.1, 4.1),
+        'ak_010': (2.8, 3.8),
+        'al_011': (3.0, 4.0),
+        'am_012': (3.2, 4.2),
+        'an_013': (2.9, 3.9),
+        'ao_014': (3.0, 4.0)
+    },
+    'Fault Class 2': {  # Low pressure fault
+        'aa_000': (0.5, 1.5),
+        'ab_001': (0.6, 1.6),
+        'ac_002': (0.3, 1.3),
+        'ad_003': (0.7, 1.7),
+        'ae_004': (0.4, 1.4),
+        'af_005': (0.5, 1.5),
+        'ag_005': (5.0, 15.0),
+        'ag_006': (0.4, 1.4),
+        'ah_007': (10.0, 20.0),
+        'ai_008': (8.0, 18.0),
+        'aj_009': (0.6, 1.6),
+        'ak_010': (0.3, 1.3),
+        'al_011': (0.5, 1.5),
+        'am_012': (0.7, 1.7),
+        'an_013': (0.4, 1.4),
+        'ao_014': (0.5, 1.5)
+    },
+    'Fault Class 3': {  # Sensor malfunction
+        'aa_000': (0.0, 0.1),
+        'ab_001': (0.0, 0.1),
+        'ac_002': (0.0, 0.1),
+        'ad_003': (0.0, 0.1),
+        'ae_004': (0.0, 0.1),
+        'af_005': (0.0, 0.1),
+        'ag_005': (0.0, 1.0),
+        'ag_006': (0.0, 0.1),
+        'ah_007': (0.0, 5.0),
+        'ai_008': (0.0, 5.0),
+        'aj_009': (0.0, 0.1),
+        'ak_010': (0.0, 0.1),
+        'al_011': (0.0, 0.1),
+        'am_012': (0.0, 0.1),
+        'an_013': (0.0, 0.1),
+        'ao_014': (0.0, 0.1)
+    }
+}
+
+# Class mix of generate_sample_sensor_data: 80% normal, faults split 40/35/25
+DEFAULT_CLASS_MIX = {'Normal': 0.8, 'Fault Class 1': 0.08, 'Fault Class 2': 0.07, 'Fault Class 3': 0.05}
+
+# Rows generated (and written) per block by the scalable generator
+CHUNK_ROWS = 1000000
+
+# Output formats of write_sensor_data
+OUTPUT_FORMATS = ('csv', 'npy', 'column-store')
+
+# Decimals of CSV values, and rows formatted to text at a time
+CSV_DECIMALS = 4
+CSV_FORMAT_ROWS = 100000
+
 def generate_sample_sensor_data(num_samples=60000):
     """
     Generate sample sensor data for Scania truck air pressure system
@@ -9,145 +105,207 @@ def generate_sample_sensor_data(num_samples=60000):
     np.random.seed(42)
     
     # Define sensor names (following the pattern from the frontend)
-    sensor_names = [
-        'aa_000', 'ab_001', 'ac_002', 'ad_003', 'ae_004', 
-        'af_005', 'ag_005', 'ag_006', 'ah_007', 'ai_008',
-        'aj_009', 'ak_010', 'al_011', 'am_012', 'an_013', 'ao_014'
-    ]
+    sensor_names = list(NORMAL_RANGES)
     
     # Generate normal operation data (80% of samples)
     normal_samples = int(num_samples * 0.8)
     
-    # Normal operation ranges for each sensor
-    normal_ranges = {
-        'aa_000': (2.0, 2.5),    # Air Pressure Sensor A (bar)
-        'ab_001': (2.1, 2.6),    # Air Pressure Sensor B (bar)
-        'ac_002': (1.8, 2.3),    # Air Compressor Sensor (bar)
-        'ad_003': (2.2, 2.7),    # Air Tank Sensor (bar)
-        'ae_004': (1.9, 2.4),    # Air Filter Sensor (bar)
-        'af_005': (2.0, 2.5),    # Air Valve Sensor (bar)
-        'ag_005': (15.0, 25.0),  # Air Flow Sensor G (L/min)
-        'ag_006': (1.9, 2.4),    # Air Regulator Sensor (bar)
-        'ah_007': (20.0, 30.0),  # Air Heater Sensor (°C)
-        'ai_008': (18.0, 28.0),  # Air Intake Sensor (°C)
-        'aj_009': (2.1, 2.6),    # Air Junction Sensor (bar)
-        'ak_010': (1.8, 2.3),    # Air Kit Sensor (bar)
-        'al_011': (2.0, 2.5),    # Air Line Sensor (bar)
-        'am_012': (2.2, 2.7),    # Air Manifold Sensor (bar)
-        'an_013': (1.9, 2.4),    # Air Nozzle Sensor (bar)
-        'ao_014': (2.0, 2.5)     # Air Outlet Sensor (bar)
-    }
-    
-    # Generate normal data
-    normal_data = {}
-    for sensor in sensor_names:
-        min_val, max_val = normal_ranges[sensor]
-        normal_data[sensor] = np.random.uniform(min_val, max_val, normal_samples)
-    
     # Generate fault data (20% of samples)
     fault_samples = num_samples - normal_samples
     
-    # Fault patterns
-    fault_patterns = {
-        'Fault Class 1': {  # High pressure fault
-            'aa_000': (3.0, 4.0),
-            'ab_001': (3.1, 4.1),
-            'ac_002': (2.8, 3.8),
-            'ad_003': (3.2, 4.2),
-            'ae_004': (2.9, 3.9),
-            'af_005': (3.0, 4.0),
-            'ag_005': (30.0, 40.0),
-            'ag_006': (2.9, 3.9),
-            'ah_007': (35.0, 45.0),
-            'ai_008': (33.0, 43.0),
-            'aj_009': (3.1, 4.1),
-            'ak_010': (2.8, 3.8),
-            'al_011': (3.0, 4.0),
-            'am_012': (3.2, 4.2),
-            'an_013': (2.9, 3.9),
-            'ao_014': (3.0, 4.0)
-        },
-        'Fault Class 2': {  # Low pressure fault
-            'aa_000': (0.5, 1.5),
-            'ab_001': (0.6, 1.6),
-            'ac_002': (0.3, 1.3),
-            'ad_003': (0.7, 1.7),
-            'ae_004': (0.4, 1.4),
-            'af_005': (0.5, 1.5),
-            'ag_005': (5.0, 15.0),
-            'ag_006': (0.4, 1.4),
-            'ah_007': (10.0, 20.0),
-            'ai_008': (8.0, 18.0),
-            'aj_009': (0.6, 1.6),
-            'ak_010': (0.3, 1.3),
-            'al_011': (0.5, 1.5),
-            'am_012': (0.7, 1.7),
-            'an_013': (0.4, 1.4),
-            'ao_014': (0.5, 1.5)
-        },
-        'Fault Class 3': {  # Sensor malfunction
-            'aa_000': (0.0, 0.1),
-            'ab_001': (0.0, 0.1),
-            'ac_002': (0.0, 0.1),
-            'ad_003': (0.0, 0.1),
-            'ae_004': (0.0, 0.1),
-            'af_005': (0.0, 0.1),
-            'ag_005': (0.0, 1.0),
-            'ag_006': (0.0, 0.1),
-            'ah_007': (0.0, 5.0),
-            'ai_008': (0.0, 5.0),
-            'aj_009': (0.0, 0.1),
-            'ak_010': (0.0, 0.1),
-            'al_011': (0.0, 0.1),
-            'am_012': (0.0, 0.1),
-            'an_013': (0.0, 0.1),
-            'ao_014': (0.0, 0.1)
-        }
-    }
-    
     # Distribute fault samples among fault classes
     fault_class_1_samples = int(fault_samples * 0.4)  # 40% of faults
     fault_class_2_samples = int(fault_samples * 0.35)  # 35% of faults
     fault_class_3_samples = fault_samples - fault_class_1_samples - fault_class_2_samples  # 25% of faults
+    class_samples = {
+        'Normal': normal_samples,
+        'Fault Class 1': fault_class_1_samples,
+        'Fault Class 2': fault_class_2_samples,
+        'Fault Class 3': fault_class_3_samples
+    }
     
-    # Generate fault data
-    fault_data = {}
-    for sensor in sensor_names:
-        fault_data[sensor] = []
-        
-        # Fault Class 1
-        min_val, max_val = fault_patterns['Fault Class 1'][sensor]
-        fault_data[sensor].extend(np.random.uniform(min_val, max_val, fault_class_1_samples))
-        
-        # Fault Class 2
-        min_val, max_val = fault_patterns['Fault Class 2'][sensor]
-        fault_data[sensor].extend(np.random.uniform(min_val, max_val, fault_class_2_samples))
-        
-        # Fault Class 3
-        min_val, max_val = fault_patterns['Fault Class 3'][sensor]
-        fault_data[sensor].extend(np.random.uniform(min_val, max_val, fault_class_3_samples))
-    
-    # Combine normal and fault data
+    # Draw every sensor's values class by class (same random stream as drawing them one list at a time)
     all_data = {}
     for sensor in sensor_names:
-        all_data[sensor] = np.concatenate([normal_data[sensor], fault_data[sensor]])
+        all_data[sensor] = np.empty(num_samples)
+        all_data[sensor][:normal_samples] = np.random.uniform(*NORMAL_RANGES[sensor], normal_samples)
+    for sensor in sensor_names:
+        offset = normal_samples
+        for name in FAULT_PATTERNS:
+            min_val, max_val = FAULT_PATTERNS[name][sensor]
+            all_data[sensor][offset:offset + class_samples[name]] = np.random.uniform(min_val, max_val,
+                                                                                     class_samples[name])
+            offset += class_samples[name]
     
     # Create class labels
-    normal_labels = ['Normal'] * normal_samples
-    fault_labels = ['Fault Class 1'] * fault_class_1_samples + \
-                   ['Fault Class 2'] * fault_class_2_samples + \
-                   ['Fault Class 3'] * fault_class_3_samples
+    labels = np.repeat(np.array(list(class_samples), dtype=object), list(class_samples.values()))
     
-    all_labels = normal_labels + fault_labels
+    # Shuffle the data (the permutation ``df.sample(frac=1, random_state=42)`` draws)
+    order = np.random.RandomState(42).permutation(num_samples)
+    df = pd.DataFrame({sensor: values[order] for sensor, values in all_data.items()})
+    df['class'] = labels[order]
     
-    # Create DataFrame
-    df = pd.DataFrame(all_data)
-    df['class'] = all_labels
+    return df
+
+def sensor_names_for(num_sensors):
+    """Names of ``num_sensors`` sensors: the sample sensors, then more in the same pattern"""
+    names = list(NORMAL_RANGES)[:num_sensors]
+    for i in range(len(names), num_sensors):
+        names.append(f'{chr(97 + i // 26 % 26)}{chr(97 + i % 26)}_{i:03d}')
+    return names
+
+def generate_sensor_blocks(num_rows, num_sensors=16, class_mix=None, drift=0.0, missing_rate=0.0,
+                           chunk_rows=CHUNK_ROWS, seed=42):
+    """Yield ``(values, codes)`` blocks of synthetic sensor rows, for datasets of any size.
+    
+    Each block is a preallocated float32 (rows, sensors) matrix and int8
+    codes into ``list(class_mix)`` (default ``DEFAULT_CLASS_MIX``, any of
+    the sample classes with relative weights). Sensors beyond the 16 sample
+    sensors repeat their ranges. ``drift`` shifts every sensor linearly, by
+    that many widths of its normal range at the last row; ``missing_rate``
+    of the values are NaN. Rows are independent draws, so no shuffle is
+    needed, and memory stays bounded by ``chunk_rows``.
+    """
+    class_mix = class_mix or DEFAULT_CLASS_MIX
+    unknown = [name for name in class_mix if name != 'Normal' and name not in FAULT_PATTERNS]
+    if unknown:
+        raise ValueError(f"Unknown classes {unknown}, expected some of {['Normal'] + list(FAULT_PATTERNS)}")
+    weights = np.array(list(class_mix.values()), dtype=np.float64)
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError('Class weights must be non-negative and not all zero')
+    if not 0 <= missing_rate < 1:
+        raise ValueError('missing_rate must be in [0, 1)')
+    if num_sensors < 1:
+        raise ValueError('num_sensors must be positive')
     
-    # Shuffle the data
-    df = df.sample(frac=1, random_state=42).reset_index(drop=True)
+    # (classes, sensors) lower bounds and widths of the uniform ranges
+    base_sensors = [list(NORMAL_RANGES)[j % len(NORMAL_RANGES)] for j in range(num_sensors)]
+    profiles = [NORMAL_RANGES if name == 'Normal' else FAULT_PATTERNS[name] for name in class_mix]
+    bounds = np.array([[profile[sensor] for sensor in base_sensors] for profile in profiles], dtype=np.float32)
+    low, span = bounds[..., 0], bounds[..., 1] - bounds[..., 0]
+    normal_width = np.array([NORMAL_RANGES[sensor][1] - NORMAL_RANGES[sensor][0] for sensor in base_sensors],
+                            dtype=np.float32)
     
-    return df
+    rng = np.random.default_rng(seed)
+    probabilities = weights / weights.sum()
+    for start in range(0, num_rows, chunk_rows):
+        rows = min(chunk_rows, num_rows - start)
+        codes = rng.choice(len(probabilities), size=rows, p=probabilities).astype(np.int8)
+        values = rng.random((rows, num_sensors), dtype=np.float32)
+        values *= span[codes]
+        values += low[codes]
+        if drift:
+            progress = np.arange(start, start + rows, dtype=np.float32) * np.float32(drift / num_rows)
+            values += progress[:, np.newaxis] * normal_width
+        if missing_rate:
+            values[rng.random((rows, num_sensors), dtype=np.float32) < missing_rate] = np.nan
+        yield values, codes
+
+def csv_rows(values, codes, classes, decimals=CSV_DECIMALS):
+    """CSV text (bytes) of a float block and its class codes, formatted without Python loops.
+    
+    Values are rounded to ``decimals`` and their digits written into a
+    fixed-width byte matrix (unused positions zero); dropping the zeros
+    leaves the rows. NaN values give empty fields, as pandas writes them.
+    """
+    rows, sensors = values.shape
+    scaled = np.rint(values.astype(np.float64) * 10 ** decimals)
+    missing = np.isnan(scaled)
+    scaled[missing] = 0
+    negative = scaled < 0
+    magnitude = np.abs(scaled).astype(np.int64)
+    integer, fraction = np.divmod(magnitude, 10 ** decimals)
+    int_digits = max(len(str(int(integer.max()))) if integer.size else 1, 1)
+    digits = np.ones(integer.shape, dtype=np.int64)
+    for k in range(1, int_digits):
+        digits += integer >= 10 ** k
+    
+    # Field layout: [sign and integer digits, right-aligned] '.' [fraction digits] ','
+    width = int_digits + 1 + 1 + decimals + 1
+    fields = np.zeros((rows, sensors, width), dtype=np.uint8)
+    point = int_digits + 1
+    for k in range(decimals):
+        fields[..., point + decimals - k] = 48 + fraction // 10 ** k % 10
+    fields[..., point] = ord('.')
+    for k in range(int_digits + 1):
+        digit = np.where(k < digits, 48 + integer // 10 ** k % 10, np.where(negative & (k == digits), ord('-'), 0))
+        fields[..., point - 1 - k] = digit
+    fields[missing, :-1] = 0
+    fields[..., -1] = ord(',')
+    
+    names = [name.encode() for name in classes]
+    labels = np.zeros((len(names), max(map(len, names)) + 1), dtype=np.uint8)
+    for i, name in enumerate(names):
+        labels[i, :len(name)] = np.frombuffer(name, dtype=np.uint8)
+    line = np.concatenate([fields.reshape(rows, -1), labels[codes]], axis=1)
+    line[:, -1] = ord('\n')
+    text = line.ravel()
+    return text[text != 0].tobytes()
+
+def write_sensor_data(path, num_rows, output_format='csv', num_sensors=16, class_mix=None, drift=0.0,
+                      missing_rate=0.0, chunk_rows=CHUNK_ROWS, seed=42):
+    """Stream generated sensor data to ``path`` block by block; returns a summary.
+    
+    ``csv`` writes a CSV with a ``class`` column (values with
+    ``CSV_DECIMALS`` decimals, missing values empty); ``npy`` writes the float32 matrix to ``path``
+    plus ``.labels.npy`` int8 codes and a ``.json`` file naming sensors
+    and classes; ``column-store`` writes the backend's dataset format into
+    the directory ``path`` (inside the dataset storage directory, under a
+    32-hex-digit name, it is served as that dataset ID).
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f'output_format must be one of {OUTPUT_FORMATS}')
+    start = time.perf_counter()
+    class_mix = class_mix or DEFAULT_CLASS_MIX
+    sensors = sensor_names_for(num_sensors)
+    classes = list(class_mix)
+    blocks = generate_sensor_blocks(num_rows, num_sensors, class_mix, drift, missing_rate, chunk_rows, seed)
+    class_counts = np.zeros(len(classes), dtype=np.int64)
+    
+    def frames():
+        for values, codes in blocks:
+            class_counts[:] += np.bincount(codes, minlength=len(classes))
+            df = pd.DataFrame(values, columns=sensors, copy=False)
+            df['class'] = pd.Categorical.from_codes(codes, classes)
+            yield df
+    
+    if output_format == 'csv':
+        with open(path, 'wb') as f:
+            f.write((','.join(sensors + ['class']) + '\n').encode())
+            for values, codes in blocks:
+                class_counts[:] += np.bincount(codes, minlength=len(classes))
+                for start_row in range(0, len(values), CSV_FORMAT_ROWS):
+                    rows = slice(start_row, start_row + CSV_FORMAT_ROWS)
+                    f.write(csv_rows(values[rows], codes[rows], classes))
+    elif output_format == 'npy':
+        stem = path[:-4] if path.endswith('.npy') else path
+        values_out = np.lib.format.open_memmap(f'{stem}.npy', mode='w+', dtype=np.float32,
+                                               shape=(num_rows, num_sensors))
+        codes_out = np.lib.format.open_memmap(f'{stem}.labels.npy', mode='w+', dtype=np.int8, shape=(num_rows,))
+        offset = 0
+        for values, codes in blocks:
+            class_counts[:] += np.bincount(codes, minlength=len(classes))
+            values_out[offset:offset + len(values)] = values
+            codes_out[offset:offset + len(codes)] = codes
+            offset += len(values)
+        values_out.flush()
+        codes_out.flush()
+        del values_out, codes_out
+        with open(f'{stem}.json', 'w') as f:
+            json.dump({'rows': num_rows, 'sensors': sensors, 'classes': classes}, f)
+    else:
+        # Only the column store needs the backend modules
+        from dataset_registry import write_dataset
+        write_dataset(path, frames(), os.path.basename(os.path.normpath(path)))
+    
+    return {
+        'path': path,
+        'format': output_format,
+        'rows': num_rows,
+        'sensors': num_sensors,
+        'classCounts': dict(zip(classes, class_counts.tolist())),
+        'seconds': round(time.perf_counter() - start, 3)
+    }
 
 def save_sample_data(filename='sample_sensor_data.csv', num_samples=60000):
     """Generate and save sample data to CSV file"""
@@ -167,13 +325,46 @@ def save_sample_data(filename='sample_sensor_data.csv', num_samples=60000):
     
     return df
 
+def parse_class_mix(text):
+    """``'Normal=0.9,Fault Class 1=0.1'`` as a class mix dict"""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip()] = float(weight)
+    return mix
+
 if __name__ == "__main__":
-    # Generate sample data
-    df = save_sample_data()
-    
-    # Print some sample rows
-    print("\nSample data (first 5 rows):")
-    print(df.head())
+    parser = argparse.ArgumentParser(description='Generate synthetic sensor data')
+    parser.add_argument('--rows', type=int, help='number of rows; switches to the chunked generator '
+                                                 '(default: 60000 sample rows via save_sample_data)')
+    parser.add_argument('--output', default=None, help='output file (directory for column-store)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='csv', help='output format')
+    parser.add_argument('--sensors', type=int, default=16, help='number of sensors')
+    parser.add_argument('--class-mix', type=parse_class_mix, default=None,
+                        help='class weights, e.g. "Normal=0.9,Fault Class 1=0.1"')
+    parser.add_argument('--drift', type=float, default=0.0,
+                        help='linear sensor drift over the file, in normal-range widths')
+    parser.add_argument('--missing-rate', type=float, default=0.0, help='fraction of values left empty')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='rows generated per block')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    args = parser.parse_args()
     
-    print("\nSample data (last 5 rows):")
-    print(df.tail()) 
\ No newline at end of file
+    if args.rows is None:
+        # Generate sample data
+        df = save_sample_data(args.output or 'sample_sensor_data.csv')
+        
+        # Print some sample rows
+        print("\nSample data (first 5 rows):")
+        print(df.head())
+        
+        print("\nSample data (last 5 rows):")
+        print(df.tail())
+    else:
+        output = args.output or {'csv': 'sensor_data.csv', 'npy': 'sensor_data.npy',
+                                 'column-store': 'sensor_data'}[args.format]
+        print(f"Generating {args.rows} rows of {args.sensors} sensors into {output} ({args.format})...")
+        summary = write_sensor_data(output, args.rows, args.format, num_sensors=args.sensors,
+                                    class_mix=args.class_mix, drift=args.drift, missing_rate=args.missing_rate,
+                                    chunk_rows=args.chunk_rows, seed=args.seed)
+        print(f"Done in {summary['seconds']} s ({args.rows / max(summary['seconds'], 1e-9):,.0f} rows/s)")
+        print(f"Class distribution: {summary['classCounts']}")
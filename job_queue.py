@@ -0,0 +1,288 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+# Seconds between writes of a running job's progress to its status file
+PROGRESS_SAVE_INTERVAL = 0.5
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested"""
+
+
+class Job:
+    """A long-running operation executed by the job queue"""
+
+    def __init__(self, job_type, params=None):
+        self.job_id = uuid.uuid4().hex
+        self.job_type = job_type
+        self.params = params or {}
+        self.status = 'queued'
+        self.progress = 0
+        self.message = 'Queued'
+        self._result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel_event = threading.Event()
+        # Set by a queue with a state directory
+        self._cancel_path = None
+        self._result_path = None
+        self._on_progress = None
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    @property
+    def cancel_requested(self):
+        if self._cancel_event.is_set():
+            return True
+        # Cancellation requested through another worker process
+        if self._cancel_path is not None and os.path.exists(self._cancel_path):
+            self._cancel_event.set()
+            return True
+        return False
+
+    @property
+    def result(self):
+        """Payload of a succeeded job; loaded from disk for jobs run by another process"""
+        if self._result is None and self._result_path is not None and self.status == 'succeeded':
+            self._result = joblib.load(self._result_path)
+        return self._result
+
+    @result.setter
+    def result(self, value):
+        self._result = value
+
+    def update(self, progress, message=None):
+        """Report progress (0-100); raises JobCancelled if the job was cancelled"""
+        if self.cancel_requested:
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+        self.progress = int(progress)
+        if message:
+            self.message = message
+        if self._on_progress is not None:
+            self._on_progress(self)
+
+    def to_dict(self):
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+        return {
+            'jobId': self.job_id,
+            'type': self.job_type,
+            'params': self.params,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'createdAt': iso(self.created_at),
+            'startedAt': iso(self.started_at),
+            'finishedAt': iso(self.finished_at)
+        }
+
+    @classmethod
+    def from_dict(cls, status):
+        """Read-only view of a job from its ``to_dict()`` status"""
+        def timestamp(value):
+            return datetime.fromisoformat(value).timestamp() if value else None
+        job = cls(status['type'], status['params'])
+        job.job_id = status['jobId']
+        job.status = status['status']
+        job.progress = status['progress']
+        job.message = status['message']
+        job.error = status['error']
+        job.created_at = timestamp(status['createdAt'])
+        job.started_at = timestamp(status['startedAt'])
+        job.finished_at = timestamp(status['finishedAt'])
+        return job
+
+
+class JobQueue:
+    """Local worker pool for long-running analysis jobs.
+
+    At most ``max_workers`` jobs run at once; the rest wait in the executor's
+    queue. Job functions receive the ``Job`` as first argument and should call
+    ``job.update()`` at checkpoints, which is where cancellation takes effect.
+    Finished jobs are kept for ``retention_seconds`` (and at most ``max_jobs``).
+
+    With a ``state_dir`` every job's status, result and cancellation request
+    are files there, so worker processes sharing the directory can poll,
+    fetch and cancel jobs that another process runs.
+    """
+
+    def __init__(self, max_workers=2, max_jobs=500, retention_seconds=3600, state_dir=None):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.retention_seconds = retention_seconds
+        self.state_dir = state_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._saved_at = {}
+        self._lock = threading.Lock()
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.state_dir, f'{job_id}{suffix}')
+
+    def _save(self, job):
+        """Write a job's status file (atomic replace)"""
+        if not self.state_dir:
+            return
+        path = self._path(job.job_id, '.json')
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(job.to_dict(), f, default=str)
+            os.replace(tmp_path, path)
+            self._saved_at[job.job_id] = time.time()
+        except OSError as e:
+            logger.warning(f"Could not save status of job {job.job_id}: {str(e)}")
+
+    def _save_progress(self, job):
+        if time.time() - self._saved_at.get(job.job_id, 0.0) >= PROGRESS_SAVE_INTERVAL:
+            self._save(job)
+
+    def submit(self, job_type, fn, *args, params=None, **kwargs):
+        """Queue ``fn(job, *args, **kwargs)`` and return the job immediately"""
+        job = Job(job_type, params)
+        if self.state_dir:
+            job._cancel_path = self._path(job.job_id, '.cancel')
+            job._on_progress = self._save_progress
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._save(job)
+        self._prune()
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested:
+            job.status = 'cancelled'
+            job.message = 'Cancelled'
+            job.finished_at = time.time()
+            self._save(job)
+            return
+        job.status = 'running'
+        job.started_at = time.time()
+        job.message = 'Running'
+        self._save(job)
+        try:
+            job.result = fn(job, *args, **kwargs)
+            if self.state_dir:
+                joblib.dump(job.result, self._path(job.job_id, '.result'))
+            job.progress = 100
+            job.message = 'Completed'
+            job.status = 'succeeded'
+        except JobCancelled:
+            job.message = 'Cancelled'
+            job.status = 'cancelled'
+        except Exception as e:
+            logger.error(f"Job {job.job_id} ({job.job_type}) failed: {str(e)}")
+            job.error = str(e)
+            job.message = 'Failed'
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+
+    def _load(self, job_id):
+        """Job run by another process, from its status file, or None"""
+        if not self.state_dir or not JOB_ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(self._path(job_id, '.json')) as f:
+                job = Job.from_dict(json.load(f))
+        except (OSError, ValueError):
+            return None
+        job._cancel_path = self._path(job_id, '.cancel')
+        job._result_path = self._path(job_id, '.result')
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None else self._load(job_id)
+
+    def list(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if self.state_dir:
+            local = {job.job_id for job in jobs}
+            for name in os.listdir(self.state_dir):
+                job_id, _, suffix = name.partition('.')
+                if suffix == 'json' and job_id not in local:
+                    job = self._load(job_id)
+                    if job is not None:
+                        jobs.append(job)
+            jobs.sort(key=lambda job: job.created_at)
+        return jobs
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs are dropped, running ones stop at the next checkpoint"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        job._cancel_event.set()
+        if job.future is None:
+            # Run by another process, which picks the request up from the marker file
+            with open(job._cancel_path, 'w'):
+                pass
+        elif job.future.cancel():
+            job.status = 'cancelled'
+            job.message = 'Cancelled'
+            job.finished_at = time.time()
+            self._save(job)
+        return job
+
+    def running_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == 'running')
+
+    def _prune(self):
+        now = time.time()
+        dropped = []
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.done and now - job.finished_at > self.retention_seconds:
+                    del self._jobs[job_id]
+                    dropped.append(job_id)
+            finished = [job_id for job_id, job in self._jobs.items() if job.done]
+            while len(self._jobs) > self.max_jobs and finished:
+                job_id = finished.pop(0)
+                del self._jobs[job_id]
+                dropped.append(job_id)
+        if not self.state_dir:
+            return
+        # Files of jobs dropped here, and of other processes' jobs finished long ago
+        for job_id in dropped:
+            self._delete_files(job_id)
+        for name in os.listdir(self.state_dir):
+            job_id, _, suffix = name.partition('.')
+            if suffix == 'json' and job_id not in self._jobs:
+                job = self._load(job_id)
+                if job is not None and job.done and now - job.finished_at > self.retention_seconds:
+                    self._delete_files(job_id)
+
+    def _delete_files(self, job_id):
+        self._saved_at.pop(job_id, None)
+        for suffix in ('.json', '.result', '.cancel'):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except FileNotFoundError:
+                pass
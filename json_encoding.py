@@ -0,0 +1,97 @@
+import json
+import math
+from datetime import date, datetime
+
+import numpy as np
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library encoder
+    orjson = None
+
+# Arrays larger than this many elements are encoded in row blocks when streaming
+STREAM_THRESHOLD = 100000
+STREAM_BLOCK_ROWS = 2000
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def clean_array(arr):
+    """Convert an array to nested lists with NaN/inf replaced by None, vectorized"""
+    arr = np.asarray(arr)
+    if arr.dtype.kind == 'f':
+        finite = np.isfinite(arr)
+        if not finite.all():
+            out = arr.astype(object)
+            out[~finite] = None
+            return out.tolist()
+    return arr.tolist()
+
+
+def _default(obj):
+    """Fallback for types the JSON backends do not handle natively"""
+    if isinstance(obj, np.ndarray):
+        return clean_array(obj)
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _sanitize(data):
+    """Make a payload valid for the stdlib encoder; arrays are cleaned vectorized"""
+    if isinstance(data, dict):
+        return {str(k) if not isinstance(k, str) else k: _sanitize(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_sanitize(v) for v in data]
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if isinstance(data, (np.ndarray, np.generic, datetime, date)):
+        return _default(data)
+    return data
+
+
+def dumps(data):
+    """Encode a payload to JSON bytes with NaN/inf written as null"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(_sanitize(data), separators=(',', ':')).encode()
+
+
+def iter_encode(data):
+    """Encode a payload piece by piece, emitting large arrays in row blocks"""
+    if isinstance(data, dict):
+        yield b'{'
+        for i, (key, value) in enumerate(data.items()):
+            if i:
+                yield b','
+            yield dumps(str(key)) + b':'
+            yield from iter_encode(value)
+        yield b'}'
+    elif isinstance(data, np.ndarray) and data.size > STREAM_THRESHOLD and data.ndim > 0:
+        yield b'['
+        for start in range(0, len(data), STREAM_BLOCK_ROWS):
+            if start:
+                yield b','
+            # Encode the block as a list and strip its brackets
+            yield dumps(data[start:start + STREAM_BLOCK_ROWS])[1:-1]
+        yield b']'
+    else:
+        yield dumps(data)
+
+
+def json_response(data, status=200, stream=False):
+    """Flask response for a payload that may contain NumPy arrays and NaN/inf.
+
+    With ``stream=True`` the body is produced incrementally, so large arrays
+    are never materialized as one JSON string.
+    """
+    if stream:
+        return Response(iter_encode(data), status=status, mimetype='application/json')
+    return Response(dumps(data), status=status, mimetype='application/json')
@@ -0,0 +1,215 @@
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+import logging
+from datetime import datetime
+
+import joblib
+
+from file_lock import file_lock, file_stamp
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_FILE = 'ACTIVE'
+METADATA_FILE = 'metadata.json'
+MODEL_FILE = 'model.joblib'
+SCALER_FILE = 'scaler.joblib'
+# Versions in save order with the dataset each was trained on: [[version, datasetId], ...]
+INDEX_FILE = 'index.json'
+LOCK_FILE = '.lock'
+# Versions kept per training dataset (the active version is always kept)
+DEFAULT_KEEP_PER_DATASET = 5
+# Versions are '<YYYYmmdd>-<HHMMSS>-<6 hex digits>'; anything else never reaches a path
+MODEL_VERSION_PATTERN = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}$')
+
+
+class ModelStore:
+    """Versioned on-disk store of trained classifiers.
+
+    Each version is a directory holding the joblib-dumped model and scaler
+    plus a metadata file (feature names, metrics, creation time). An
+    ``ACTIVE`` pointer file names the version that serves requests that do
+    not pick a model, so every worker process can load the same model
+    without retraining. Saving never moves the pointer unless asked to:
+    one user's training run must not change what other users are served.
+
+    Only the ``keep_per_dataset`` newest versions trained on each dataset
+    (plus the active one) are kept; older ones are deleted on save. A small
+    index file lists the versions and their datasets, so finding a
+    dataset's newest model reads no metadata files; it is rewritten under a
+    file lock and reloaded whenever another process changed it.
+    """
+
+    def __init__(self, root, keep_per_dataset=DEFAULT_KEEP_PER_DATASET):
+        self.root = root
+        self.keep_per_dataset = keep_per_dataset
+        self._lock = threading.Lock()
+        self._index = []
+        self._index_stamp = None
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, INDEX_FILE)
+        self._lock_path = os.path.join(root, LOCK_FILE)
+        if file_stamp(self._index_path) is None:
+            with file_lock(self._lock_path):
+                if file_stamp(self._index_path) is None:
+                    # Stores written before the index existed
+                    self._write_index([[m['version'], m.get('datasetId')] for m in self._scan()])
+
+    def _read_index(self):
+        """``[[version, datasetId], ...]`` in save order, reloaded only when the file changed"""
+        stamp = file_stamp(self._index_path)
+        with self._lock:
+            if stamp is not None and stamp != self._index_stamp:
+                try:
+                    with open(self._index_path) as f:
+                        self._index = json.load(f)
+                    self._index_stamp = stamp
+                except (OSError, ValueError):
+                    pass
+            return self._index
+
+    def _write_index(self, index):
+        """Replace the index file (call under the file lock)"""
+        tmp_path = f'{self._index_path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._index_path)
+        with self._lock:
+            self._index = index
+            self._index_stamp = file_stamp(self._index_path)
+
+    def _version_dir(self, version):
+        if not isinstance(version, str) or not MODEL_VERSION_PATTERN.match(version):
+            raise KeyError(f"Unknown model version: {version}")
+        return os.path.join(self.root, version)
+
+    def save(self, model, scaler, feature_names, metrics=None, extra=None, activate=False):
+        """Persist a trained model as a new version and return its metadata"""
+        version = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        metadata = {
+            'version': version,
+            'createdAt': datetime.now().isoformat(),
+            'featureNames': list(feature_names),
+            'classes': [str(c) for c in getattr(model, 'classes_', [])],
+            'modelType': type(model).__name__,
+            'metrics': metrics or {}
+        }
+        if extra:
+            metadata.update(extra)
+
+        # Write into a temporary directory and rename, so readers never see a partial version
+        tmp_dir = os.path.join(self.root, f'.tmp-{version}')
+        os.makedirs(tmp_dir)
+        try:
+            joblib.dump(model, os.path.join(tmp_dir, MODEL_FILE))
+            joblib.dump(scaler, os.path.join(tmp_dir, SCALER_FILE))
+            with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+                json.dump(metadata, f)
+            os.rename(tmp_dir, self._version_dir(version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Saved model version {version}")
+        if activate:
+            self.activate(version)
+        self._add_to_index(version, metadata.get('datasetId'))
+        return metadata
+
+    def _add_to_index(self, version, dataset_id):
+        """Index a new version and delete the versions of its dataset beyond the retention limit"""
+        with file_lock(self._lock_path):
+            self._read_index()
+            index = self._index + [[version, dataset_id]]
+            same_dataset = [v for v, d in index if d == dataset_id]
+            active = self.active_version()
+            retired = {v for v in same_dataset[:-self.keep_per_dataset] if v != active}
+            if retired:
+                index = [entry for entry in index if entry[0] not in retired]
+            self._write_index(index)
+        for old in retired:
+            trash = os.path.join(self.root, f'.deleted-{old}')
+            try:
+                os.rename(self._version_dir(old), trash)
+            except OSError as e:
+                logger.warning(f"Could not delete model version {old}: {str(e)}")
+                continue
+            shutil.rmtree(trash, ignore_errors=True)
+            logger.info(f"Deleted model version {old} (over {self.keep_per_dataset} for dataset {dataset_id})")
+
+    def metadata(self, version):
+        """Metadata of a version, or None if it does not exist"""
+        if not isinstance(version, str) or not MODEL_VERSION_PATTERN.match(version):
+            return None
+        path = os.path.join(self._version_dir(version), METADATA_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def list(self):
+        """Metadata of all versions, oldest first"""
+        versions = []
+        for version, _ in self._read_index():
+            metadata = self.metadata(version)
+            if metadata is not None:
+                versions.append(metadata)
+        return versions
+
+    def _scan(self):
+        """Metadata of every version directory, oldest first (to build the index)"""
+        versions = []
+        for name in sorted(os.listdir(self.root)):
+            if not MODEL_VERSION_PATTERN.match(name) or not os.path.isdir(self._version_dir(name)):
+                continue
+            metadata = self.metadata(name)
+            if metadata is not None:
+                versions.append(metadata)
+        return versions
+
+    def latest_for_dataset(self, dataset_id):
+        """Newest version trained on ``dataset_id``, or None"""
+        for version, trained_on in reversed(self._read_index()):
+            if trained_on == dataset_id:
+                return version
+        return None
+
+    def active_version(self):
+        """Version named by the ACTIVE pointer, or None until one is activated"""
+        path = os.path.join(self.root, ACTIVE_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                version = f.read().strip()
+            if version and self.metadata(version) is not None:
+                return version
+        return None
+
+    def activate(self, version):
+        """Point ACTIVE at ``version`` (atomic rename)"""
+        # Under the store lock, so retention cannot delete the version meanwhile
+        with file_lock(self._lock_path):
+            if self.metadata(version) is None:
+                raise KeyError(f"Unknown model version: {version}")
+            tmp_path = os.path.join(self.root, f'.{ACTIVE_FILE}.{uuid.uuid4().hex}')
+            with open(tmp_path, 'w') as f:
+                f.write(version)
+            os.replace(tmp_path, os.path.join(self.root, ACTIVE_FILE))
+        logger.info(f"Activated model version {version}")
+
+    def load(self, version, mmap=True):
+        """Load a version's model, scaler and metadata.
+
+        With ``mmap`` the model's arrays are memory-mapped read-only, so worker
+        processes loading the same version share their pages.
+        """
+        metadata = self.metadata(version)
+        if metadata is None:
+            raise KeyError(f"Unknown model version: {version}")
+        mmap_mode = 'r' if mmap else None
+        version_dir = self._version_dir(version)
+        model = joblib.load(os.path.join(version_dir, MODEL_FILE), mmap_mode=mmap_mode)
+        scaler = joblib.load(os.path.join(version_dir, SCALER_FILE))
+        return model, scaler, metadata
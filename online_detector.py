@@ -0,0 +1,350 @@
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from file_lock import file_lock, file_stamp
+from zscore import severity_bands
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_LEVELS = np.array(['normal', 'minor', 'major', 'critical'])
+# Detectors an OnlineDetectorStore keeps in memory, and seconds an unused one stays there
+MAX_CACHED_STREAMS = 1000
+STREAM_IDLE_SECONDS = 3600
+
+
+class OnlineZScoreDetector:
+    """Incremental Z-score anomaly detector for live telemetry.
+
+    Keeps per-sensor running weights, means and M2 that are updated with the
+    weighted Welford/Chan merge, one mini-batch at a time. With ``decay`` set
+    (e.g. 0.999) every new row multiplies the weight of the history by that
+    factor, so the baseline follows slow drift. Each batch is scored against
+    the state before the batch, then merged into it; anomalous rows are left
+    out of the update unless ``update_on_anomaly`` is set.
+    """
+
+    def __init__(self, feature_names, z_score_threshold=3.0, decay=None, warmup=30,
+                 update_on_anomaly=False):
+        self.feature_names = list(feature_names)
+        try:
+            self.z_score_threshold = float(z_score_threshold)
+            self.decay = float(decay) if decay is not None else None
+            self.warmup = float(warmup)
+        except (TypeError, ValueError):
+            raise ValueError('zScoreThreshold, decay and warmup must be numbers')
+        if not (np.isfinite(self.z_score_threshold) and self.z_score_threshold > 0):
+            raise ValueError('zScoreThreshold must be a positive number')
+        if self.decay is not None and not 0 < self.decay <= 1:
+            raise ValueError('decay must be in (0, 1]')
+        if not (self.warmup >= 0 and self.warmup.is_integer()):
+            raise ValueError('warmup must be a non-negative integer')
+        self.warmup = int(self.warmup)
+        self.update_on_anomaly = update_on_anomaly
+        n = len(self.feature_names)
+        self.weight = np.zeros(n)
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+        self.rows_seen = 0
+        self.anomalies_seen = 0
+
+    def seed(self, count, mean, std):
+        """Initialise the baseline from precomputed per-sensor statistics"""
+        count = np.asarray(count, dtype=np.float64)
+        std = np.nan_to_num(np.asarray(std, dtype=np.float64))
+        self.weight = count.copy()
+        self.mean = np.nan_to_num(np.asarray(mean, dtype=np.float64))
+        self.m2 = std ** 2 * np.maximum(count - 1, 0)
+        self.rows_seen = int(count.max()) if count.size else 0
+
+    def variance(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.weight > 1, self.m2 / (self.weight - 1), np.nan)
+
+    def score_batch(self, values):
+        """Score a (rows, sensors) batch, then fold it into the running state"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[np.newaxis, :]
+        if values.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} sensor values per row, got {values.shape[1]}")
+
+        std = np.sqrt(self.variance())
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z_scores = np.abs((values - self.mean) / std)
+        z_scores[~np.isfinite(z_scores)] = 0.0
+
+        max_z = z_scores.max(axis=1)
+        max_sensor = z_scores.argmax(axis=1)
+        warmed_up = self.rows_seen >= self.warmup
+        flags = (max_z > self.z_score_threshold) if warmed_up else np.zeros(len(values), dtype=bool)
+        severity = np.zeros(len(values), dtype=np.int64)
+        if warmed_up:
+            major, critical = severity_bands(self.z_score_threshold)
+            severity[max_z > self.z_score_threshold] = 1
+            severity[max_z > major] = 2
+            severity[max_z > critical] = 3
+            severity[~flags] = 0
+
+        update_rows = values if self.update_on_anomaly else values[~flags]
+        self._merge(update_rows)
+        self.rows_seen += len(values)
+        self.anomalies_seen += int(flags.sum())
+
+        return {
+            'anomalies': flags,
+            'maxZScores': max_z,
+            'maxSensors': [self.feature_names[i] for i in max_sensor],
+            'severity': SEVERITY_LEVELS[severity]
+        }
+
+    def _merge(self, values):
+        if len(values) == 0:
+            return
+        present = ~np.isnan(values)
+        n = len(values)
+        if self.decay:
+            # Row i of the batch is followed by n-1-i newer rows
+            row_weights = self.decay ** np.arange(n - 1, -1, -1, dtype=np.float64)
+            history_factor = self.decay ** n
+        else:
+            row_weights = np.ones(n)
+            history_factor = 1.0
+
+        w = np.where(present, row_weights[:, np.newaxis], 0.0)
+        batch_weight = w.sum(axis=0)
+        filled = np.where(present, values, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            batch_mean = np.where(batch_weight > 0, (w * filled).sum(axis=0) / batch_weight, 0.0)
+        batch_m2 = (w * (filled - batch_mean) ** 2).sum(axis=0)
+
+        old_weight = self.weight * history_factor
+        old_m2 = self.m2 * history_factor
+        total = old_weight + batch_weight
+        safe_total = np.where(total > 0, total, 1.0)
+        delta = batch_mean - self.mean
+        self.mean = np.where(batch_weight > 0, self.mean + delta * batch_weight / safe_total, self.mean)
+        self.m2 = old_m2 + batch_m2 + delta ** 2 * old_weight * batch_weight / safe_total
+        self.weight = total
+
+    def to_state(self):
+        """JSON-serialisable snapshot of the detector"""
+        return {
+            'featureNames': self.feature_names,
+            'zScoreThreshold': self.z_score_threshold,
+            'decay': self.decay,
+            'warmup': self.warmup,
+            'updateOnAnomaly': self.update_on_anomaly,
+            'weight': self.weight.tolist(),
+            'mean': self.mean.tolist(),
+            'm2': self.m2.tolist(),
+            'rowsSeen': self.rows_seen,
+            'anomaliesSeen': self.anomalies_seen
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        detector = cls(
+            state['featureNames'],
+            z_score_threshold=state['zScoreThreshold'],
+            decay=state['decay'],
+            warmup=state['warmup'],
+            update_on_anomaly=state['updateOnAnomaly']
+        )
+        detector.weight = np.array(state['weight'], dtype=np.float64)
+        detector.mean = np.array(state['mean'], dtype=np.float64)
+        detector.m2 = np.array(state['m2'], dtype=np.float64)
+        detector.rows_seen = state['rowsSeen']
+        detector.anomalies_seen = state['anomaliesSeen']
+        return detector
+
+    def summary(self):
+        std = np.sqrt(self.variance())
+        return {
+            'rowsSeen': self.rows_seen,
+            'anomaliesSeen': self.anomalies_seen,
+            'warmedUp': self.rows_seen >= self.warmup,
+            'decay': self.decay,
+            'zScoreThreshold': self.z_score_threshold,
+            'sensors': {
+                name: {
+                    'mean': float(self.mean[i]),
+                    'std': float(std[i]) if np.isfinite(std[i]) else None
+                }
+                for i, name in enumerate(self.feature_names)
+            }
+        }
+
+
+class OnlineDetectorStore:
+    """Named online detectors whose state is persisted to ``state_dir``.
+
+    The state file is the shared copy: several threads or worker processes
+    may serve one stream. ``lock`` serialises updates across all of them,
+    ``get`` reloads a detector whenever another process rewrote (or
+    deleted) its file, and ``save`` writes it back after every update. Extra
+    per-stream arrays (e.g. rolling-feature history) live next to it.
+
+    Only the ``max_cached`` most recently used detectors stay in memory, and
+    none idle for more than ``idle_seconds``; a dropped detector (with its
+    lock and file stamp) is saved first if it has unsaved rows and is simply
+    reloaded from its file on the next access.
+    """
+
+    def __init__(self, state_dir, max_cached=MAX_CACHED_STREAMS, idle_seconds=STREAM_IDLE_SECONDS):
+        self.state_dir = state_dir
+        self.max_cached = max_cached
+        self.idle_seconds = idle_seconds
+        # Least recently used first; every stream in it has an entry in _stamps, _saved_rows and _used
+        self._detectors = OrderedDict()
+        self._stamps = {}
+        self._saved_rows = {}
+        self._used = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _path(self, stream_id):
+        return os.path.join(self.state_dir, f'{stream_id}.json')
+
+    def _arrays_path(self, stream_id, name):
+        return os.path.join(self.state_dir, f'{stream_id}.{name}.npz')
+
+    def _lock_path(self, stream_id):
+        return os.path.join(self.state_dir, f'{stream_id}.lock')
+
+    @contextmanager
+    def lock(self, stream_id):
+        """Serialise updates to one stream across threads and processes"""
+        with self._lock:
+            thread_lock = self._locks.setdefault(stream_id, threading.Lock())
+        with thread_lock, file_lock(self._lock_path(stream_id)):
+            yield
+
+    def get(self, stream_id):
+        """Detector for ``stream_id`` as last saved by any process, or None"""
+        path = self._path(stream_id)
+        stamp = file_stamp(path)
+        with self._lock:
+            if stamp is None:
+                self._forget(stream_id)
+                return None
+            if stream_id in self._detectors and self._stamps.get(stream_id) == stamp:
+                self._touch(stream_id)
+                return self._detectors[stream_id]
+        try:
+            with open(path) as f:
+                detector = OnlineZScoreDetector.from_state(json.load(f))
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._detectors[stream_id] = detector
+            self._stamps[stream_id] = stamp
+            self._saved_rows[stream_id] = detector.rows_seen
+            self._touch(stream_id)
+        self._evict()
+        return detector
+
+    def create(self, stream_id, detector):
+        with self._lock:
+            self._detectors[stream_id] = detector
+            self._touch(stream_id)
+        self.save(stream_id)
+        self._evict()
+        return detector
+
+    def remove(self, stream_id):
+        with self._lock:
+            existed = stream_id in self._detectors
+            self._forget(stream_id)
+        for path in [self._path(stream_id)] + [os.path.join(self.state_dir, name)
+                                               for name in os.listdir(self.state_dir)
+                                               if name.startswith(f'{stream_id}.') and name.endswith('.npz')]:
+            try:
+                os.remove(path)
+                existed = True
+            except FileNotFoundError:
+                pass
+        return existed
+
+    def save(self, stream_id):
+        """Write a stream's state atomically"""
+        with self._lock:
+            detector = self._detectors.get(stream_id)
+        if detector is None:
+            return
+        path = self._path(stream_id)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(detector.to_state(), f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._detectors.get(stream_id) is detector:
+                self._stamps[stream_id] = file_stamp(path)
+                self._saved_rows[stream_id] = detector.rows_seen
+
+    def _touch(self, stream_id):
+        """Mark a cached stream as just used (call under the store lock)"""
+        self._detectors.move_to_end(stream_id)
+        self._used[stream_id] = time.time()
+
+    def _forget(self, stream_id):
+        """Drop everything cached for a stream (call under the store lock)"""
+        self._detectors.pop(stream_id, None)
+        self._stamps.pop(stream_id, None)
+        self._saved_rows.pop(stream_id, None)
+        self._used.pop(stream_id, None)
+        self._locks.pop(stream_id, None)
+
+    def _evict(self):
+        """Drop the least recently used detectors beyond ``max_cached`` and idle ones"""
+        now = time.time()
+        with self._lock:
+            victims = []
+            for stream_id in self._detectors:
+                if (len(self._detectors) - len(victims) <= self.max_cached
+                        and now - self._used[stream_id] <= self.idle_seconds):
+                    break
+                victims.append(stream_id)
+            locks = [(stream_id, self._locks.get(stream_id)) for stream_id in victims]
+        for stream_id, thread_lock in locks:
+            # Streams being updated right now (here or by another process) are left for a later pass
+            if thread_lock is not None and not thread_lock.acquire(blocking=False):
+                continue
+            try:
+                with file_lock(self._lock_path(stream_id), blocking=False):
+                    with self._lock:
+                        detector = self._detectors.get(stream_id)
+                        unsaved = detector is not None and detector.rows_seen != self._saved_rows.get(stream_id)
+                    if unsaved:
+                        self.save(stream_id)
+                    with self._lock:
+                        self._forget(stream_id)
+            except BlockingIOError:
+                continue
+            finally:
+                if thread_lock is not None:
+                    thread_lock.release()
+
+    def read_arrays(self, stream_id, name):
+        """Arrays saved with ``write_arrays`` (a dict), or None"""
+        try:
+            with np.load(self._arrays_path(stream_id, name), allow_pickle=False) as saved:
+                return {key: saved[key] for key in saved.files}
+        except FileNotFoundError:
+            return None
+
+    def write_arrays(self, stream_id, name, arrays):
+        """Persist a dict of arrays with the stream (call while holding its ``lock``)"""
+        path = self._arrays_path(stream_id, name)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
@@ -0,0 +1,165 @@
+import time
+import logging
+import warnings
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tokens treated as missing values; pass as ``na_values`` when parsing CSV files
+NA_VALUES = ['na', 'NA', 'NaN', 'nan', '']
+
+
+def to_float_matrix(df, columns):
+    """Coerce ``columns`` of ``df`` into a new column-major float64 matrix.
+
+    Numeric columns are converted in a single batch; only columns that are
+    still text (e.g. 'na' tokens not handled at parse time) go through
+    ``pd.to_numeric`` one by one, with unparseable values becoming NaN.
+    """
+    values = np.empty((len(df), len(columns)), dtype=np.float64, order='F')
+    numeric, text = [], []
+    for i, col in enumerate(columns):
+        dtype = df[col].dtype
+        if pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+            numeric.append(i)
+        else:
+            text.append(i)
+
+    if len(numeric) == len(columns):
+        values[:] = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    elif numeric:
+        values[:, numeric] = df[[columns[i] for i in numeric]].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    for i in text:
+        values[:, i] = pd.to_numeric(df[columns[i]], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return values
+
+
+def impute_median(values):
+    """Fill NaNs in place with per-column medians (0.0 for all-NaN columns).
+
+    Medians are only computed, in one ``nanmedian`` call, for the columns that
+    actually contain missing values.
+    """
+    missing = np.isnan(values)
+    columns = np.flatnonzero(missing.any(axis=0))
+    if columns.size == 0:
+        return
+    medians = np.zeros(values.shape[1])
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        if columns.size == values.shape[1]:
+            medians[:] = np.nanmedian(values, axis=0)
+        else:
+            medians[columns] = np.nanmedian(values[:, columns], axis=0)
+    medians[np.isnan(medians)] = 0.0
+    np.copyto(values, medians[np.newaxis, :], where=missing)
+
+
+def scale_model_inputs(scaler, values, fill_missing=True):
+    """Model inputs for raw sensor rows: missing values filled with the
+    scaler's training means (when ``fill_missing``), then scaled"""
+    values = np.array(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if fill_missing and missing.any():
+        np.copyto(values, np.broadcast_to(scaler.mean_, values.shape), where=missing)
+    scaler_columns = getattr(scaler, 'feature_names_in_', None)
+    if scaler_columns is not None:
+        values = pd.DataFrame(values, columns=scaler_columns, copy=False)
+    return scaler.transform(values)
+
+
+def stratified_subsample(labels, max_rows, random_state=42):
+    """Sorted positions of at most ``max_rows`` rows, drawn class by class.
+
+    The budget is split evenly across classes; classes smaller than their
+    share keep all their rows and the remainder goes to the larger classes,
+    so minority classes are never thinned out before the majority.
+    """
+    labels = np.asarray(labels)
+    if len(labels) <= max_rows:
+        return np.arange(len(labels))
+    classes, codes, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    if max_rows < len(classes):
+        raise ValueError(f"Row budget {max_rows} is smaller than the number of classes ({len(classes)})")
+
+    quotas = np.zeros(len(classes), dtype=np.int64)
+    remaining = max_rows
+    order = np.argsort(counts)
+    for i, k in enumerate(order):
+        quotas[k] = min(counts[k], remaining // (len(order) - i))
+        remaining -= quotas[k]
+
+    rng = np.random.default_rng(random_state)
+    positions = [rng.choice(np.flatnonzero(codes == k), quotas[k], replace=False) for k in range(len(classes))]
+    return np.sort(np.concatenate(positions))
+
+
+def preprocess_data(df, impute=True):
+    """Preprocess the data to handle missing values and non-numeric data.
+
+    Sensor columns are coerced into a single float matrix, missing values are
+    imputed with one ``nanmedian`` pass and rows without a target are dropped.
+    With ``impute=False`` missing values stay NaN, for models that handle them.
+    Per-step timings (ms) are logged and stored in ``attrs['preprocessTimings']``.
+    """
+    try:
+        timings = {}
+        start = step = time.perf_counter()
+
+        # Check if dataframe is empty
+        if df.empty:
+            raise ValueError("DataFrame is empty")
+
+        feature_cols = [col for col in df.columns if col != 'class']
+
+        # Coerce all sensor columns into one float matrix
+        values = to_float_matrix(df, feature_cols)
+        timings['coerce'] = (time.perf_counter() - step) * 1000
+        step = time.perf_counter()
+
+        # Fill missing values with column medians, in place
+        if impute:
+            impute_median(values)
+            timings['impute'] = (time.perf_counter() - step) * 1000
+            step = time.perf_counter()
+
+        # Remove rows with missing target values
+        keep = None
+        if 'class' in df.columns:
+            target = df['class']
+            if target.dtype == object:
+                target = target.where(~target.isin(NA_VALUES))
+            keep = target.notna().to_numpy()
+            if keep.all():
+                keep = None
+        index = df.index
+        if keep is not None:
+            index = index[keep]
+            values = values[keep]
+
+        # Wrap the matrix as a single float block (no copy) and restore column order
+        df_clean = pd.DataFrame(values, index=index, columns=feature_cols, copy=False)
+        if 'class' in df.columns:
+            target = target if keep is None else target[keep]
+            df_clean.insert(df.columns.get_loc('class'), 'class', target)
+        timings['assemble'] = (time.perf_counter() - step) * 1000
+
+        # Final validation
+        if df_clean.empty:
+            raise ValueError("No valid data remaining after preprocessing")
+
+        if len(df_clean.columns) < 2:
+            raise ValueError("Insufficient features after preprocessing")
+
+        timings['total'] = (time.perf_counter() - start) * 1000
+        timings = {k: round(v, 3) for k, v in timings.items()}
+        df_clean.attrs['preprocessTimings'] = timings
+        logger.info(f"Data preprocessing completed. Shape: {df_clean.shape}. Timings (ms): {timings}")
+        return df_clean
+
+    except Exception as e:
+        logger.error(f"Error in data preprocessing: {str(e)}")
+        raise
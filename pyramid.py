@@ -0,0 +1,377 @@
+import numpy as np
+
+# Finest pyramid level: buckets of 2**BASE_LEVEL rows
+BASE_LEVEL = 6
+# Rows reduced at a time while building the finest level (a multiple of its bucket size)
+BLOCK_ROWS = 1 << 20
+# LTTB chooses among the extremes of this many buckets per output point
+LTTB_OVERSAMPLING = 4
+DOWNSAMPLING_METHODS = ('lttb', 'minmax')
+# |x - mean| > Z_SCORE_THRESHOLD * std marks a value as anomalous in the rollups
+Z_SCORE_THRESHOLD = 3.0
+
+# Per bucket: extremes and their rows, and the count, sum and sum of squares of
+# the present values (centered on the column mean) and of the anomalous ones
+PYRAMID_DTYPE = np.dtype([
+    ('min', np.float64),
+    ('max', np.float64),
+    ('argmin', np.int64),
+    ('argmax', np.int64),
+    ('count', np.int64),
+    ('sum', np.float64),
+    ('sumsq', np.float64),
+    ('anomalies', np.int64)
+])
+
+
+def level_sizes(rows, base_level=BASE_LEVEL):
+    """Bucket counts of the pyramid levels, finest level first"""
+    sizes = []
+    size = 1 << base_level
+    while rows:
+        count = -(-rows // size)
+        sizes.append(count)
+        if count == 1:
+            break
+        size <<= 1
+    return sizes
+
+
+def _empty_records(count):
+    records = np.zeros(count, dtype=PYRAMID_DTYPE)
+    records['min'] = records['max'] = np.nan
+    records['argmin'] = records['argmax'] = -1
+    return records
+
+
+def _anomalous(values, mean, std, threshold):
+    """Values further than ``threshold`` standard deviations from the mean (never NaNs)"""
+    if mean is None or not std:
+        return np.zeros(values.shape, dtype=bool)
+    with np.errstate(invalid='ignore'):
+        return np.abs(values - mean) > threshold * std
+
+
+def _reduce_rows(values, offset, size, mean, std, threshold):
+    """Records of consecutive ``size``-row buckets of ``values`` starting at row ``offset``,
+    and the anomaly flags of the rows"""
+    buckets = -(-len(values) // size)
+    blocks = np.full(buckets * size, np.nan)
+    blocks[:len(values)] = values
+    blocks = blocks.reshape(buckets, size)
+    missing = np.isnan(blocks)
+    centered = np.where(missing, 0.0, blocks - (mean or 0.0))
+    anomalous = _anomalous(blocks, mean, std, threshold)
+    bucket = np.arange(buckets)
+    # All-NaN buckets pick their first row and keep a NaN value
+    lowest = np.where(missing, np.inf, blocks).argmin(axis=1)
+    highest = np.where(missing, -np.inf, blocks).argmax(axis=1)
+
+    records = np.empty(buckets, dtype=PYRAMID_DTYPE)
+    records['min'] = blocks[bucket, lowest]
+    records['max'] = blocks[bucket, highest]
+    records['argmin'] = offset + bucket * size + lowest
+    records['argmax'] = offset + bucket * size + highest
+    records['count'] = size - missing.sum(axis=1)
+    records['sum'] = centered.sum(axis=1)
+    records['sumsq'] = (centered ** 2).sum(axis=1)
+    records['anomalies'] = anomalous.sum(axis=1)
+    return records, anomalous.ravel()[:len(values)]
+
+
+def _merge_pairs(records):
+    """Next coarser level: every two neighbouring buckets combined into one"""
+    if len(records) % 2:
+        records = np.concatenate([records, _empty_records(1)])
+    left, right = records[0::2], records[1::2]
+    merged = np.empty(len(left), dtype=PYRAMID_DTYPE)
+    use_right = (right['min'] < left['min']) | np.isnan(left['min'])
+    merged['min'] = np.where(use_right, right['min'], left['min'])
+    merged['argmin'] = np.where(use_right, right['argmin'], left['argmin'])
+    use_right = (right['max'] > left['max']) | np.isnan(left['max'])
+    merged['max'] = np.where(use_right, right['max'], left['max'])
+    merged['argmax'] = np.where(use_right, right['argmax'], left['argmax'])
+    for field in ('count', 'sum', 'sumsq', 'anomalies'):
+        merged[field] = left[field] + right[field]
+    return merged
+
+
+def build_pyramid(values, mean=None, std=None, threshold=Z_SCORE_THRESHOLD, base_level=BASE_LEVEL,
+                  anomalous_rows=None):
+    """All pyramid levels of one column, concatenated finest first.
+
+    ``mean`` and ``std`` are the column's statistics over the whole dataset:
+    sums are taken of values centered on ``mean`` (so variances do not
+    suffer from cancellation) and values beyond ``threshold`` standard
+    deviations are counted as anomalies. Their row flags are OR-ed into
+    ``anomalous_rows`` when given. The finest level is reduced from the raw
+    values block by block; every coarser level halves the previous one. The
+    result takes about ``2 * rows / 2**base_level`` records.
+    """
+    size = 1 << base_level
+    block_rows = max(BLOCK_ROWS // size, 1) * size
+    blocks = []
+    for start in range(0, len(values), block_rows):
+        records, anomalous = _reduce_rows(values[start:start + block_rows], start, size, mean, std, threshold)
+        blocks.append(records)
+        if anomalous_rows is not None:
+            anomalous_rows[start:start + len(anomalous)] |= anomalous
+    level = np.concatenate(blocks)
+    levels = [level]
+    while len(level) > 1:
+        level = _merge_pairs(level)
+        levels.append(level)
+    return np.concatenate(levels)
+
+
+def build_count_pyramid(flags, base_level=BASE_LEVEL):
+    """Per-bucket counts of set ``flags`` at every pyramid level, concatenated finest first"""
+    size = 1 << base_level
+    level = np.bincount(np.flatnonzero(flags) >> base_level, minlength=-(-len(flags) // size))
+    levels = [level.astype(np.int64)]
+    while len(level) > 1:
+        level = np.add.reduceat(level, np.arange(0, len(level), 2))
+        levels.append(level)
+    return np.concatenate(levels)
+
+
+def _split_levels(records, rows, base_level):
+    levels = []
+    offset = 0
+    for count in level_sizes(rows, base_level):
+        levels.append(records[offset:offset + count])
+        offset += count
+    return levels
+
+
+def decompose(starts, ends, n_levels, base_level=BASE_LEVEL):
+    """Cover each row range [start, end) with the fewest aligned pyramid buckets.
+
+    Returns ``(level, bucket, window)`` arrays for the buckets (``level``
+    counted from the finest stored one) and ``(row, window)`` arrays for the
+    rows at the range edges that no whole finest bucket covers. A range needs
+    at most two buckets per level plus fewer than ``2 * 2**base_level`` rows.
+    """
+    size = 1 << base_level
+    top = base_level + n_levels - 1
+    levels, buckets, owners = [], [], []
+    rows, row_owners = [], []
+    for window, (start, end) in enumerate(zip(starts, ends)):
+        start, end = int(start), int(end)
+        if n_levels:
+            first = min(-(-start // size) * size, end)
+            last = max(end // size * size, first)
+        else:
+            first = last = end
+        for lo, hi in ((start, first), (last, end)):
+            rows.append(np.arange(lo, hi))
+            row_owners.append(np.full(hi - lo, window))
+        position = first
+        while position < last:
+            # Largest bucket aligned at ``position`` that ends within the range
+            level = min(top, (position & -position).bit_length() - 1) if position else top
+            while position + (1 << level) > last:
+                level -= 1
+            levels.append(level - base_level)
+            buckets.append(position >> level)
+            owners.append(window)
+            position += 1 << level
+    return ((np.array(levels, dtype=np.int64), np.array(buckets, dtype=np.int64), np.array(owners, dtype=np.int64)),
+            (np.concatenate(rows).astype(np.int64), np.concatenate(row_owners).astype(np.int64)))
+
+
+def _gather(levels, level, bucket, dtype):
+    """Records of the given (level, bucket) pieces, one fancy index per level"""
+    gathered = np.empty(len(level), dtype=dtype)
+    for k in np.unique(level):
+        mask = level == k
+        gathered[mask] = levels[k][bucket[mask]]
+    return gathered
+
+
+def lttb(x, y, points):
+    """Indices of ``points`` samples chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last samples are always kept; from each bucket in between
+    the sample forming the largest triangle with the previously kept sample
+    and the mean of the next bucket is selected.
+    """
+    n = len(x)
+    if points >= n:
+        return np.arange(n)
+    if points < 3:
+        return np.array([0, n - 1])[:points]
+
+    every = (n - 2) / (points - 2)
+    bounds = (np.arange(points - 1) * every).astype(np.int64) + 1
+    bounds[-1] = n - 1
+    next_bounds = np.append(bounds[1:], n)
+    # Mean of the bucket following each bucket (the last one is followed by the final sample)
+    x_sums = np.add.reduceat(x, bounds)
+    y_sums = np.add.reduceat(y, bounds)
+    counts = next_bounds - bounds
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(points - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        mean_x = x_sums[i + 1] / counts[i + 1]
+        mean_y = y_sums[i + 1] / counts[i + 1]
+        area = np.abs((x[previous] - mean_x) * (y[lo:hi] - y[previous])
+                      - (x[previous] - x[lo:hi]) * (mean_y - y[previous]))
+        previous = lo + int(area.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+class SensorPyramid:
+    """Multi-resolution rollup index of one sensor column.
+
+    Level ``k`` stores, for every bucket of ``2**k`` rows, the minimum and
+    maximum value and the rows where they occur, the count, sum and sum of
+    squares of the present values and the number of anomalous values (see
+    ``build_pyramid``). Window statistics combine the O(log n) aligned
+    buckets covering a range (``decompose``). A downsampling query reads
+    the coarsest level whose buckets are no wider than the requested output
+    buckets, plus at most two partial buckets of raw values at the range
+    edges, so its cost depends on the number of points rather than on the
+    size of the row range. Without stored ``records`` the raw values are
+    scanned instead.
+    """
+
+    def __init__(self, values, records=None, base_level=BASE_LEVEL, mean=None, std=None,
+                 threshold=Z_SCORE_THRESHOLD):
+        self.values = values
+        self.rows = len(values)
+        self.base_level = base_level
+        self.mean = mean
+        self.std = std
+        self.threshold = threshold
+        self.levels = _split_levels(records, self.rows, base_level) if records is not None else []
+
+    def window_stats(self, starts, ends):
+        """Count, missing, mean, std, min, max and anomalies of each row range [start, end).
+
+        Returns a dict of arrays with one entry per range; statistics of
+        ranges without present values are NaN.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        (level, bucket, owner), (rows, row_owner) = decompose(starts, ends, len(self.levels), self.base_level)
+        records = _gather(self.levels, level, bucket, PYRAMID_DTYPE)
+
+        values = np.asarray(self.values[rows], dtype=np.float64)
+        present = ~np.isnan(values)
+        centered = np.where(present, values - (self.mean or 0.0), 0.0)
+        anomalous = _anomalous(values, self.mean, self.std, self.threshold)
+
+        n = len(starts)
+        owners = np.concatenate([owner, row_owner])
+        count = np.bincount(owners, np.concatenate([records['count'], present]), minlength=n)
+        total = np.bincount(owners, np.concatenate([records['sum'], centered]), minlength=n)
+        squares = np.bincount(owners, np.concatenate([records['sumsq'], centered ** 2]), minlength=n)
+        anomalies = np.bincount(owners, np.concatenate([records['anomalies'], anomalous]), minlength=n)
+        minimum = np.full(n, np.inf)
+        maximum = np.full(n, -np.inf)
+        np.fmin.at(minimum, owners, np.concatenate([records['min'], values]))
+        np.fmax.at(maximum, owners, np.concatenate([records['max'], values]))
+
+        empty = count == 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (self.mean or 0.0) + total / count
+            variance = np.maximum(squares - total ** 2 / count, 0.0) / (count - 1)
+            std = np.where(count > 1, np.sqrt(variance), np.nan)
+        for array in (mean, minimum, maximum):
+            array[empty] = np.nan
+        return {
+            'count': count.astype(np.int64),
+            'missing': (ends - starts) - count.astype(np.int64),
+            'mean': mean,
+            'std': std,
+            'min': minimum,
+            'max': maximum,
+            'anomalies': anomalies.astype(np.int64)
+        }
+
+    def _raw(self, start, end):
+        return np.arange(start, end), np.asarray(self.values[start:end], dtype=np.float64)
+
+    def _candidates(self, start, end, width):
+        """Rows and values containing the extremes of every ``width``-row span of [start, end)"""
+        if not self.levels or width < 1 << self.base_level:
+            return self._raw(start, end)
+        level = min(int(np.log2(width)), self.base_level + len(self.levels) - 1)
+        size = 1 << level
+        first, last = -(-start // size), end // size
+        if first >= last:
+            return self._raw(start, end)
+        records = self.levels[level - self.base_level][first:last]
+        head_rows, head_values = self._raw(start, first * size)
+        tail_rows, tail_values = self._raw(last * size, end)
+        rows = np.concatenate([head_rows, records['argmin'], records['argmax'], tail_rows])
+        values = np.concatenate([head_values, records['min'], records['max'], tail_values])
+        return rows, values
+
+    def extremes(self, start, end, buckets):
+        """Rows and values of the minimum and maximum of ``buckets`` equal spans of [start, end).
+
+        Points are returned in row order; missing values are skipped.
+        """
+        rows, values = self._candidates(start, end, (end - start) / buckets)
+        present = ~np.isnan(values)
+        rows, values = rows[present], values[present]
+        if not len(rows):
+            return rows, values
+
+        group = (rows - start) * buckets // (end - start)
+        order = np.lexsort((values, group))
+        sorted_group = group[order]
+        first = np.flatnonzero(np.r_[True, sorted_group[1:] != sorted_group[:-1]])
+        last = np.r_[first[1:] - 1, len(order) - 1]
+        picked = order[np.concatenate([first, last])]
+        picked_rows, unique = np.unique(rows[picked], return_index=True)
+        return picked_rows, values[picked][unique]
+
+    def downsample(self, start=0, end=None, points=500, method='lttb'):
+        """At most ``points`` (row, value) samples of [start, end) preserving the series' shape.
+
+        ``minmax`` keeps the minimum and maximum of ``points / 2`` equal
+        buckets; ``lttb`` applies Largest-Triangle-Three-Buckets to the
+        extremes of ``LTTB_OVERSAMPLING * points`` buckets.
+        """
+        end = self.rows if end is None else end
+        if method not in DOWNSAMPLING_METHODS:
+            raise ValueError(f"Unknown downsampling method '{method}', expected one of {list(DOWNSAMPLING_METHODS)}")
+        if not 0 <= start < end <= self.rows:
+            raise ValueError(f"Row range must satisfy 0 <= start < end <= {self.rows}")
+        if points < 2:
+            raise ValueError("points must be at least 2")
+
+        if end - start <= points:
+            rows, values = self._raw(start, end)
+            present = ~np.isnan(values)
+            return rows[present], values[present]
+        if method == 'minmax':
+            return self.extremes(start, end, points // 2)
+        rows, values = self.extremes(start, end, points * LTTB_OVERSAMPLING)
+        keep = lttb(rows.astype(np.float64), values, points)
+        return rows[keep], values[keep]
+
+
+class CountPyramid:
+    """Rollup of per-row flags (e.g. rows with any anomalous sensor) for range counts"""
+
+    def __init__(self, flags, counts, base_level=BASE_LEVEL):
+        self.flags = flags
+        self.rows = len(flags)
+        self.base_level = base_level
+        self.levels = _split_levels(counts, self.rows, base_level)
+
+    def window_counts(self, starts, ends):
+        """Number of flagged rows in each row range [start, end)"""
+        (level, bucket, owner), (rows, row_owner) = decompose(starts, ends, len(self.levels), self.base_level)
+        counts = _gather(self.levels, level, bucket, np.int64)
+        owners = np.concatenate([owner, row_owner])
+        weights = np.concatenate([counts, np.asarray(self.flags[rows], dtype=np.int64)])
+        return np.bincount(owners, weights, minlength=len(starts)).astype(np.int64)
@@ -0,0 +1,177 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Statistics computed over each rolling window, in feature order
+ROLLING_STATISTICS = ('mean', 'std', 'slope', 'min', 'max')
+# Largest window / lag accepted
+MAX_WINDOW = 10000
+# Rows computed per block; bounds memory and the magnitude of the running sums
+BLOCK_ROWS = 8192
+
+
+def _sliding_extreme(values, window, combine, fill):
+    """``np.maximum`` (or ``np.minimum``) over the trailing ``window`` rows of every row, in O(rows).
+
+    van Herk / Gil-Werman: split the front-padded rows into blocks of
+    ``window``; each window spans the suffix of one block and the prefix of
+    the next, whose running extremes are two ``accumulate`` passes.
+    """
+    rows, sensors = values.shape
+    if window == 1:
+        return values.copy()
+    padded_rows = -(-(rows + window - 1) // window) * window
+    padded = np.full((padded_rows, sensors), fill)
+    padded[window - 1:window - 1 + rows] = values
+    blocks = padded.reshape(-1, window, sensors)
+    prefix = combine.accumulate(blocks, axis=1).reshape(padded_rows, sensors)
+    suffix = combine.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(padded_rows, sensors)
+    return combine(suffix[:rows], prefix[window - 1:window - 1 + rows])
+
+
+def _window_sums(cumulative, rows, window, first):
+    """Sums over the trailing ``window`` rows of rows ``first..`` from a zero-led cumulative sum"""
+    lower_start = first + 1 - window
+    if lower_start >= 0:
+        return cumulative[first + 1:] - cumulative[lower_start:rows + 1 - window]
+    # Windows reaching back before the first row start at the zero row
+    lower = cumulative[:max(rows + 1 - window, 0)]
+    lower = np.concatenate([np.zeros((rows - first - len(lower), cumulative.shape[1])), lower])
+    return cumulative[first + 1:] - lower
+
+
+def rolling_block(values, first, windows, lags):
+    """Rolling features of rows ``first..`` of ``values``, whose earlier rows are history.
+
+    Windows are trailing and include the row itself; near the start they
+    cover the rows available, and missing values are skipped (a window with
+    no values gives NaN statistics). Sums of values, squares, times and
+    time-weighted values are one ``cumsum`` each, so every window costs
+    O(1); ``std`` is the sample std and ``slope`` the least-squares change
+    per row (0 for windows with fewer than two values). Lags repeat the
+    oldest row available.
+    """
+    rows, sensors = values.shape
+    valid = ~np.isnan(values)
+    with warnings.catch_warnings():
+        # All-NaN sensors are centered on 0
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        center = np.nan_to_num(np.nanmean(values, axis=0))
+    x = np.where(valid, values - center, 0.0)
+    t = np.where(valid, np.arange(rows, dtype=np.float64)[:, np.newaxis] - rows / 2, 0.0)
+
+    def cumulative(a):
+        out = np.zeros((rows + 1, sensors))
+        np.cumsum(a, axis=0, out=out[1:])
+        return out
+
+    sums = {name: cumulative(a) for name, a in
+            (('n', valid.astype(np.float64)), ('x', x), ('xx', x * x), ('t', t), ('tt', t * t), ('tx', t * x))}
+    features = []
+    for window in windows:
+        n, sx, sxx, st, stt, stx = (_window_sums(sums[name], rows, window, first)
+                                    for name in ('n', 'x', 'xx', 't', 'tt', 'tx'))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = sx / n
+            variance = np.maximum(sxx - sx * mean, 0.0) / (n - 1)
+            time_spread = stt - st * st / n
+            slope = (stx - st * mean) / time_spread
+        several = n > 1
+        std = np.where(several, np.sqrt(variance), np.where(n > 0, 0.0, np.nan))
+        slope = np.where(several & (time_spread > 0), slope, np.where(n > 0, 0.0, np.nan))
+        empty = n == 0
+        maximum = _sliding_extreme(np.where(valid, values, -np.inf), window, np.maximum, -np.inf)[first:]
+        minimum = _sliding_extreme(np.where(valid, values, np.inf), window, np.minimum, np.inf)[first:]
+        maximum[empty] = np.nan
+        minimum[empty] = np.nan
+        features += [mean + center, std, slope, minimum, maximum]
+    for lag in lags:
+        features.append(values[np.maximum(np.arange(first, rows) - lag, 0)])
+    return np.concatenate(features, axis=1) if features else np.empty((rows - first, 0))
+
+
+class RollingFeatures:
+    """Rolling-window features of time-ordered sensor rows, for training and inference.
+
+    Every sensor gets the ``ROLLING_STATISTICS`` over each of ``windows``
+    rows and its value ``lags`` rows back; model inputs are the raw sensors
+    followed by these features (``feature_names``). ``transform`` computes a
+    whole series; ``update`` computes only the rows appended since the last
+    call, carrying the last rows needed by the longest window or lag.
+    """
+
+    def __init__(self, sensors, windows=(10,), lags=(1,)):
+        self.sensors = list(sensors)
+        self.windows = tuple(sorted({int(w) for w in windows}))
+        self.lags = tuple(sorted({int(k) for k in lags}))
+        if not self.windows and not self.lags:
+            raise ValueError('Rolling features need at least one window or lag')
+        if any(not 1 <= w <= MAX_WINDOW for w in self.windows + self.lags):
+            raise ValueError(f'Windows and lags must be between 1 and {MAX_WINDOW}')
+        self.history = np.empty((0, len(self.sensors)))
+        self.rows_seen = 0
+
+    @property
+    def memory(self):
+        """Past rows needed to compute a new row"""
+        return max(max(self.windows, default=1) - 1, max(self.lags, default=0))
+
+    @property
+    def feature_names(self):
+        names = list(self.sensors)
+        for window in self.windows:
+            names += [f'{sensor}_{statistic}_{window}' for statistic in ROLLING_STATISTICS for sensor in self.sensors]
+        names += [f'{sensor}_lag_{lag}' for lag in self.lags for sensor in self.sensors]
+        return names
+
+    def _compute(self, values, history):
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim != 2 or values.shape[1] != len(self.sensors):
+            raise ValueError(f"Expected rows with {len(self.sensors)} sensor values")
+        out = np.empty((len(values), len(self.feature_names)))
+        for start in range(0, len(values), BLOCK_ROWS):
+            block = values[start:start + BLOCK_ROWS]
+            series = np.concatenate([history, block])
+            first = len(history)
+            out[start:start + len(block), :len(self.sensors)] = block
+            out[start:start + len(block), len(self.sensors):] = rolling_block(series, first, self.windows, self.lags)
+            history = series[max(len(series) - self.memory, 0):] if self.memory else series[:0]
+        return out, history
+
+    def transform(self, values):
+        """Model inputs of a whole time-ordered (rows, sensors) series; the stream state is untouched"""
+        return self._compute(values, np.empty((0, len(self.sensors))))[0]
+
+    def update(self, values):
+        """Model inputs of rows appended to the stream, continuing its windows"""
+        out, self.history = self._compute(values, self.history)
+        self.rows_seen += len(out)
+        return out
+
+    def frame(self, df):
+        """Model inputs of a time-ordered frame holding (at least) the sensor columns"""
+        return pd.DataFrame(self.transform(df[self.sensors].to_numpy(dtype=np.float64)), index=df.index,
+                            columns=self.feature_names)
+
+    def config(self):
+        return {'sensors': self.sensors, 'windows': list(self.windows), 'lags': list(self.lags)}
+
+    @classmethod
+    def from_config(cls, config):
+        """Fresh (empty-history) engine from ``config()`` output"""
+        return cls(config['sensors'], config['windows'], config['lags'])
+
+    def state(self):
+        """Configuration and stream history as arrays (for ``np.savez``)"""
+        return {'sensors': np.array(self.sensors, dtype=str), 'windows': np.array(self.windows, dtype=np.int64),
+                'lags': np.array(self.lags, dtype=np.int64), 'history': self.history,
+                'rowsSeen': np.array(self.rows_seen)}
+
+    @classmethod
+    def from_state(cls, state):
+        """Engine continuing the stream saved by ``state()``"""
+        rolling = cls(state['sensors'].tolist(), state['windows'].tolist(), state['lags'].tolist())
+        rolling.history = np.asarray(state['history'], dtype=np.float64)
+        rolling.rows_seen = int(state['rowsSeen'])
+        return rolling
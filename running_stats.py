@@ -0,0 +1,201 @@
+import numpy as np
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+HISTOGRAM_BINS = 20
+# Upper bound on the rows x columns block of values processed at a time
+BLOCK_BYTES = 8 * 1024 * 1024
+
+# Relative accuracy of the quantile sketch: reported quantiles are within 1% of a true value
+SKETCH_ACCURACY = 0.01
+SKETCH_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+# Magnitudes below the smallest bucket count as zero; larger ones go to the largest bucket
+SKETCH_MIN_MAGNITUDE = 1e-9
+SKETCH_MAX_MAGNITUDE = 1e15
+_LOG_GAMMA = np.log(SKETCH_GAMMA)
+_MIN_INDEX = int(np.ceil(np.log(SKETCH_MIN_MAGNITUDE) / _LOG_GAMMA))
+_MAX_INDEX = int(np.ceil(np.log(SKETCH_MAX_MAGNITUDE) / _LOG_GAMMA))
+# Buckets per sign; a column's sketch is [negatives, most negative first | zero | positives ascending]
+_MAGNITUDE_BUCKETS = _MAX_INDEX - _MIN_INDEX + 1
+SKETCH_BUCKETS = 2 * _MAGNITUDE_BUCKETS + 1
+
+
+def _bucket_values():
+    """Value each sketch position stands for, in ascending order"""
+    magnitude = 2 * SKETCH_GAMMA ** np.arange(_MIN_INDEX, _MAX_INDEX + 1, dtype=np.float64) / (SKETCH_GAMMA + 1)
+    return np.concatenate([-magnitude[::-1], [0.0], magnitude])
+
+
+def _number(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+class RunningStats:
+    """Per-column statistics merged batch by batch, holding one batch at a time.
+
+    Count, mean and the 2nd-4th central moments are combined with the
+    pairwise update of Chan et al. / Pebay, so mean, std, skewness and
+    kurtosis match a single pass over all rows; min, max and NA counts are
+    exact too. Quantiles come from a logarithmic sketch (DDSketch): each
+    value is counted in the bucket of ``ceil(log_gamma |v|)``, so quantiles
+    are within ``SKETCH_ACCURACY`` relative error. Memory is
+    ``SKETCH_BUCKETS`` counts per column whatever the number of rows, and
+    batches are processed in blocks of at most ``BLOCK_BYTES``. Equal-width
+    histograms need the final min and max, so ``count_histograms`` takes a
+    second, blocked pass over the stored columns.
+    """
+
+    def __init__(self, n_columns):
+        self.count = np.zeros(n_columns, dtype=np.int64)
+        self.mean = np.zeros(n_columns, dtype=np.float64)
+        self.m2 = np.zeros(n_columns, dtype=np.float64)
+        self.m3 = np.zeros(n_columns, dtype=np.float64)
+        self.m4 = np.zeros(n_columns, dtype=np.float64)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+        self.na_count = np.zeros(n_columns, dtype=np.int64)
+        self.sketch = np.zeros((n_columns, SKETCH_BUCKETS), dtype=np.int64)
+        self.histogram = None
+        self.bin_width = None
+
+    def _block_rows(self):
+        return max(1, BLOCK_BYTES // (8 * max(len(self.count), 1)))
+
+    def update(self, values):
+        """Merge a (rows, columns) float batch; NaNs are counted, not used"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[np.newaxis, :]
+        block_rows = self._block_rows()
+        for start in range(0, len(values), block_rows):
+            self._merge(values[start:start + block_rows])
+
+    def _merge(self, values):
+        present = ~np.isnan(values)
+        batch_count = present.sum(axis=0)
+        self.na_count += len(values) - batch_count
+        if not batch_count.any():
+            return
+
+        safe_count = np.maximum(batch_count, 1)
+        batch_mean = np.where(present, values, 0.0).sum(axis=0) / safe_count
+        centered = np.where(present, values - batch_mean, 0.0)
+        squared = centered * centered
+        batch_m2 = squared.sum(axis=0)
+        batch_m3 = (squared * centered).sum(axis=0)
+        batch_m4 = (squared * squared).sum(axis=0)
+        del centered, squared
+
+        n_a = self.count.astype(np.float64)
+        n_b = batch_count.astype(np.float64)
+        n = n_a + n_b
+        safe_n = np.maximum(n, 1.0)
+        delta = batch_mean - self.mean
+        delta_n = delta / safe_n
+        m2 = self.m2 + batch_m2 + delta * delta_n * n_a * n_b
+        m3 = (self.m3 + batch_m3 + delta * delta_n ** 2 * n_a * n_b * (n_a - n_b)
+              + 3 * delta_n * (n_a * batch_m2 - n_b * self.m2))
+        m4 = (self.m4 + batch_m4 + delta * delta_n ** 3 * n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b)
+              + 6 * delta_n ** 2 * (n_a * n_a * batch_m2 + n_b * n_b * self.m2)
+              + 4 * delta_n * (n_a * batch_m3 - n_b * self.m3))
+        self.mean = self.mean + delta_n * n_b
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        self.count += batch_count
+
+        self.min = np.fmin(self.min, np.where(present, values, np.inf).min(axis=0))
+        self.max = np.fmax(self.max, np.where(present, values, -np.inf).max(axis=0))
+        self._update_sketch(values, present)
+
+    def _update_sketch(self, values, present):
+        # float32 logarithms are ample for 1% buckets and about twice as fast
+        magnitude = np.abs(values).astype(np.float32)
+        tiny = magnitude < SKETCH_MIN_MAGNITUDE
+        with np.errstate(invalid='ignore'):
+            index = np.log(np.maximum(magnitude, np.float32(SKETCH_MIN_MAGNITUDE)))
+            index /= np.float32(_LOG_GAMMA)
+            offset = np.clip(np.ceil(index, out=index), _MIN_INDEX, _MAX_INDEX).astype(np.int64, casting='unsafe')
+        offset -= _MIN_INDEX
+        position = np.where(values > 0, _MAGNITUDE_BUCKETS + 1 + offset, _MAGNITUDE_BUCKETS - 1 - offset)
+        position[tiny] = _MAGNITUDE_BUCKETS
+        position += np.arange(values.shape[1]) * SKETCH_BUCKETS
+        if not present.all():
+            position = position[present]
+        self.sketch += np.bincount(position.ravel(), minlength=self.sketch.size).reshape(self.sketch.shape)
+
+    def variance(self, ddof=1):
+        """Per-column variance (NaN where fewer than ``ddof + 1`` values)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+
+    def std(self, ddof=1):
+        return np.sqrt(self.variance(ddof))
+
+    def quantiles(self, quantiles=QUANTILES):
+        """(len(quantiles), columns) quantiles with linear interpolation between ranks, from the sketch"""
+        bucket_values = _bucket_values()
+        out = np.full((len(quantiles), len(self.count)), np.nan)
+        for j in np.flatnonzero(self.count):
+            cumulative = np.cumsum(self.sketch[j])
+            ranks = np.asarray(quantiles) * (self.count[j] - 1)
+            lower = np.floor(ranks)
+            low_values = bucket_values[np.searchsorted(cumulative, lower, side='right')]
+            high_values = bucket_values[np.searchsorted(cumulative, np.minimum(lower + 1, self.count[j] - 1),
+                                                        side='right')]
+            out[:, j] = np.clip(low_values + (high_values - low_values) * (ranks - lower), self.min[j], self.max[j])
+        return out
+
+    def count_histograms(self, columns, bins=HISTOGRAM_BINS):
+        """Count every column in ``bins`` equal-width bins between its min and max.
+
+        ``columns`` are the full columns (e.g. memory-mapped files), read in
+        blocks of rows; all histograms of a block come from one ``bincount``
+        over column-offset bin indices.
+        """
+        n_columns = len(columns)
+        rows = len(columns[0]) if n_columns else 0
+        width = np.where(self.max > self.min, (self.max - self.min) / bins, 1.0)
+        offsets = np.arange(n_columns) * bins
+        histogram = np.zeros(n_columns * bins, dtype=np.int64)
+        block_rows = self._block_rows()
+        block = np.empty((block_rows, n_columns))
+        for start in range(0, rows, block_rows):
+            values = block[:min(block_rows, rows - start)]
+            for j, column in enumerate(columns):
+                values[:, j] = column[start:start + len(values)]
+            present = ~np.isnan(values)
+            with np.errstate(invalid='ignore'):
+                index = np.clip(((values - self.min) / width).astype(np.int64, casting='unsafe'), 0, bins - 1)
+            histogram += np.bincount((index + offsets)[present], minlength=histogram.size)
+        self.histogram = histogram.reshape(n_columns, bins)
+        self.bin_width = np.where(self.max > self.min, width, 0.0)
+
+    def to_dict(self, names, quantiles=QUANTILES):
+        """Per-column statistics keyed by column name, for JSON storage with the dataset"""
+        std = self.std()
+        count = np.maximum(self.count, 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            population_var = self.m2 / count
+            skewness = np.where(population_var > 0, (self.m3 / count) / population_var ** 1.5, np.nan)
+            kurtosis = np.where(population_var > 0, (self.m4 / count) / population_var ** 2 - 3.0, np.nan)
+        quantile_values = self.quantiles(quantiles)
+        stats = {}
+        for i, name in enumerate(names):
+            has_values = self.count[i] > 0
+            stats[name] = {
+                'count': int(self.count[i]),
+                'missing': int(self.na_count[i]),
+                'mean': _number(self.mean[i]) if has_values else None,
+                'std': _number(std[i]),
+                'min': _number(self.min[i]) if has_values else None,
+                'max': _number(self.max[i]) if has_values else None,
+                'skewness': _number(skewness[i]),
+                'kurtosis': _number(kurtosis[i]),
+                'quantiles': {f'p{round(q * 100):02d}': _number(v) for q, v in zip(quantiles, quantile_values[:, i])}
+            }
+            if self.histogram is not None:
+                stats[name]['histogram'] = {
+                    'start': _number(self.min[i]) if has_values else None,
+                    'binWidth': _number(self.bin_width[i]) if has_values else None,
+                    'counts': self.histogram[i].tolist()
+                }
+        return stats
@@ -3,6 +3,7 @@ let uploadedFile = null;
 let isProcessing = false;
 let charts = {};
 let visualizationData = null;
+let datasetId = null;
 
 // Feature importance data
 const defaultFeatures = [
@@ -72,6 +73,7 @@ function handleFileSelect(e) {
 async function handleFileUpload(file) {
     if (file.type === 'text/csv' || file.name.endsWith('.csv')) {
         uploadedFile = file;
+        datasetId = null;
         showFileInfo(file);
         enableActionButtons();
         showStatus('success', `File "${file.name}" uploaded successfully`);
@@ -104,12 +106,26 @@ async function uploadFileToBackend(file) {
         throw new Error(errorData.error || 'Failed to upload file');
     }
 
-    return await response.json();
+    const result = await response.json();
+    datasetId = result.datasetId;
+    return result;
+}
+
+async function ensureDatasetUploaded() {
+    if (!datasetId) {
+        await uploadFileToBackend(uploadedFile);
+    }
+    return datasetId;
+}
+
+function apiUrl(path, params = {}) {
+    const query = new URLSearchParams({ dataset_id: datasetId, ...params });
+    return `http://localhost:5000${path}?${query}`;
 }
 
 async function fetchVisualizationData() {
     try {
-        const response = await fetch('http://localhost:5000/api/visualization-data');
+        const response = await fetch(apiUrl('/api/visualization-data'));
         if (!response.ok) {
             const errorData = await response.json();
             throw new Error(errorData.error || 'Failed to fetch visualization data');
@@ -224,22 +240,11 @@ async function detectAnomalies() {
     showStatus('info', 'Detecting anomalies using Z-Score analysis...');
 
     try {
-        // First upload the file
-        const uploadFormData = new FormData();
-        uploadFormData.append('file', uploadedFile);
-
-        const uploadResponse = await fetch('http://localhost:5000/api/upload', {
-            method: 'POST',
-            body: uploadFormData,
-        });
-
-        if (!uploadResponse.ok) {
-            const errorData = await uploadResponse.json();
-            throw new Error(errorData.error || 'Failed to upload file');
-        }
+        // Make sure the file has been uploaded and we have its dataset ID
+        await ensureDatasetUploaded();
 
         // Then detect anomalies
-        const response = await fetch('http://localhost:5000/api/detect-anomalies', {
+        const response = await fetch(apiUrl('/api/detect-anomalies', { mode: 'compact', limit: 100 }), {
             method: 'POST',
         });
 
@@ -267,22 +272,11 @@ async function classifyFaults() {
     showStatus('info', 'Classifying faults using Random Forest...');
 
     try {
-        // First upload the file
-        const uploadFormData = new FormData();
-        uploadFormData.append('file', uploadedFile);
-
-        const uploadResponse = await fetch('http://localhost:5000/api/upload', {
-            method: 'POST',
-            body: uploadFormData,
-        });
-
-        if (!uploadResponse.ok) {
-            const errorData = await uploadResponse.json();
-            throw new Error(errorData.error || 'Failed to upload file');
-        }
+        // Make sure the file has been uploaded and we have its dataset ID
+        await ensureDatasetUploaded();
 
         // Then classify faults
-        const response = await fetch('http://localhost:5000/api/classify-faults', {
+        const response = await fetch(apiUrl('/api/classify-faults'), {
             method: 'POST',
         });
 
@@ -310,22 +304,11 @@ async function identifyRootCause() {
     showStatus('info', 'Identifying root cause sensors using feature importance...');
 
     try {
-        // First upload the file
-        const uploadFormData = new FormData();
-        uploadFormData.append('file', uploadedFile);
-
-        const uploadResponse = await fetch('http://localhost:5000/api/upload', {
-            method: 'POST',
-            body: uploadFormData,
-        });
-
-        if (!uploadResponse.ok) {
-            const errorData = await uploadResponse.json();
-            throw new Error(errorData.error || 'Failed to upload file');
-        }
+        // Make sure the file has been uploaded and we have its dataset ID
+        await ensureDatasetUploaded();
 
         // Then classify faults (needed for feature importance)
-        const classifyResponse = await fetch('http://localhost:5000/api/classify-faults', {
+        const classifyResponse = await fetch(apiUrl('/api/classify-faults'), {
             method: 'POST',
         });
 
@@ -335,7 +318,7 @@ async function identifyRootCause() {
         }
 
         // Then get root cause analysis
-        const response = await fetch('http://localhost:5000/api/root-cause', {
+        const response = await fetch(apiUrl('/api/root-cause'), {
             method: 'POST',
         });
 
@@ -686,13 +669,13 @@ function initializeCorrelationChart() {
     let labels = ['aa_000', 'ag_005', 'ab_001', 'ac_002', 'ad_003', 'ae_004', 'af_005', 'ag_006'];
     let data = [0.78, 0.65, 0.72, 0.58, 0.45, 0.52, 0.39, 0.33];
     
-    if (visualizationData && visualizationData.correlations) {
-        const correlationEntries = Object.entries(visualizationData.correlations)
-            .sort(([,a], [,b]) => Math.abs(b) - Math.abs(a))
-            .slice(0, 10); // Top 10 correlations
+    if (visualizationData && visualizationData.correlationRatio) {
+        const correlationEntries = Object.entries(visualizationData.correlationRatio)
+            .sort(([,a], [,b]) => b - a)
+            .slice(0, 10); // Top 10 sensors
         
         labels = correlationEntries.map(([sensor]) => sensor);
-        data = correlationEntries.map(([, corr]) => Math.abs(corr));
+        data = correlationEntries.map(([, ratio]) => ratio);
     }
     
     charts.correlationChart = new Chart(ctx, {
@@ -700,7 +683,7 @@ function initializeCorrelationChart() {
         data: {
             labels: labels,
             datasets: [{
-                label: 'Correlation with Target',
+                label: 'Correlation Ratio (η) with Class',
                 data: data,
                 backgroundColor: '#8B5CF6',
                 borderColor: '#7C3AED',
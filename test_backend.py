@@ -48,6 +48,7 @@ def test_backend():
         if response.status_code == 200:
             print("✅ File upload successful")
             print(f"   Response: {response.json()}")
+            params = {'dataset_id': response.json()['datasetId']}
         else:
             print(f"❌ File upload failed: {response.status_code}")
             print(f"   Error: {response.text}")
@@ -59,7 +60,7 @@ def test_backend():
     # Test 4: Get visualization data
     print("\n4. Testing visualization data...")
     try:
-        response = requests.get(f"{base_url}/api/visualization-data")
+        response = requests.get(f"{base_url}/api/visualization-data", params=params)
         if response.status_code == 200:
             data = response.json()
             print("✅ Visualization data retrieved")
@@ -77,7 +78,7 @@ def test_backend():
     # Test 5: Anomaly detection
     print("\n5. Testing anomaly detection...")
     try:
-        response = requests.post(f"{base_url}/api/detect-anomalies")
+        response = requests.post(f"{base_url}/api/detect-anomalies", params=params)
         if response.status_code == 200:
             data = response.json()
             print("✅ Anomaly detection successful")
@@ -95,7 +96,7 @@ def test_backend():
     # Test 6: Fault classification
     print("\n6. Testing fault classification...")
     try:
-        response = requests.post(f"{base_url}/api/classify-faults")
+        response = requests.post(f"{base_url}/api/classify-faults", params=params)
         if response.status_code == 200:
             data = response.json()
             print("✅ Fault classification successful")
@@ -114,7 +115,7 @@ def test_backend():
     # Test 7: Root cause analysis
     print("\n7. Testing root cause analysis...")
     try:
-        response = requests.post(f"{base_url}/api/root-cause")
+        response = requests.post(f"{base_url}/api/root-cause", params=params)
         if response.status_code == 200:
             data = response.json()
             print("✅ Root cause analysis successful")
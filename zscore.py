@@ -0,0 +1,13 @@
+import numpy as np
+
+
+def compute_z_scores(values):
+    """Absolute Z-scores of every row of a (rows, sensors) matrix against its column mean and std"""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.abs((values - values.mean(axis=0)) / values.std(axis=0, ddof=1))
+
+
+def severity_bands(threshold):
+    """Major and critical bounds for an anomaly threshold: 3.5 and 5.0 at the default z-score threshold of 3"""
+    return threshold * 7 / 6, threshold * 5 / 3